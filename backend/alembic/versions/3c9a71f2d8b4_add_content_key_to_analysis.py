@@ -0,0 +1,30 @@
+"""add_content_key_to_analysis
+
+Revision ID: 3c9a71f2d8b4
+Revises: e510c587332a
+Create Date: 2026-10-17 09:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9a71f2d8b4'
+down_revision: Union[str, Sequence[str], None] = 'e510c587332a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analyses', sa.Column('content_key', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_analyses_content_key'), 'analyses', ['content_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_analyses_content_key'), table_name='analyses')
+    op.drop_column('analyses', 'content_key')
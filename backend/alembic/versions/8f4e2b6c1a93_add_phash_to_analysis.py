@@ -0,0 +1,28 @@
+"""add_phash_to_analysis
+
+Revision ID: 8f4e2b6c1a93
+Revises: 3c9a71f2d8b4
+Create Date: 2026-10-17 10:04:18.223961
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f4e2b6c1a93'
+down_revision: Union[str, Sequence[str], None] = '3c9a71f2d8b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analyses', sa.Column('phash', sa.String(length=16), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('analyses', 'phash')
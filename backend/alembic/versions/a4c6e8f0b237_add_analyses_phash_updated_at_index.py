@@ -0,0 +1,42 @@
+"""add_analyses_phash_updated_at_index
+
+Revision ID: a4c6e8f0b237
+Revises: f3b7c9d1e245
+Create Date: 2026-10-17 18:41:52.730419
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c6e8f0b237'
+down_revision: Union[str, Sequence[str], None] = 'f3b7c9d1e245'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so writes to analyses are not blocked meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_analyses_phash_updated_at_id',
+            'analyses',
+            ['updated_at', 'id'],
+            unique=False,
+            postgresql_where=sa.text('phash IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_analyses_phash_updated_at_id',
+            table_name='analyses',
+            postgresql_concurrently=True,
+        )
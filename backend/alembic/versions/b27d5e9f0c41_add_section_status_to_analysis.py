@@ -0,0 +1,29 @@
+"""add_section_status_to_analysis
+
+Revision ID: b27d5e9f0c41
+Revises: 8f4e2b6c1a93
+Create Date: 2026-10-17 11:37:52.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b27d5e9f0c41'
+down_revision: Union[str, Sequence[str], None] = '8f4e2b6c1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analyses', sa.Column('section_status', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('analyses', 'section_status')
@@ -0,0 +1,51 @@
+"""add_analysis_llm_calls
+
+Revision ID: c5a1d7e3f926
+Revises: b27d5e9f0c41
+Create Date: 2026-10-17 14:05:21.318640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a1d7e3f926'
+down_revision: Union[str, Sequence[str], None] = 'b27d5e9f0c41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'analysis_llm_calls',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('analysis_id', sa.UUID(), nullable=True),
+        sa.Column('user_id', sa.UUID(), nullable=True),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('model', sa.String(length=100), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('prompt_tokens', sa.Integer(), nullable=False),
+        sa.Column('candidate_tokens', sa.Integer(), nullable=False),
+        sa.Column('cached_tokens', sa.Integer(), nullable=False),
+        sa.Column('retries', sa.Integer(), nullable=False),
+        sa.Column('hedged', sa.Boolean(), nullable=False),
+        sa.Column('latency_ms', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['analysis_id'], ['analyses.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_analysis_llm_calls_analysis_id'), 'analysis_llm_calls', ['analysis_id'], unique=False)
+    op.create_index(op.f('ix_analysis_llm_calls_user_id'), 'analysis_llm_calls', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_analysis_llm_calls_user_id'), table_name='analysis_llm_calls')
+    op.drop_index(op.f('ix_analysis_llm_calls_analysis_id'), table_name='analysis_llm_calls')
+    op.drop_table('analysis_llm_calls')
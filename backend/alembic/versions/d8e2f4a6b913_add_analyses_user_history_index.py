@@ -0,0 +1,42 @@
+"""add_analyses_user_history_index
+
+Revision ID: d8e2f4a6b913
+Revises: c5a1d7e3f926
+Create Date: 2026-10-17 16:42:08.527193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8e2f4a6b913'
+down_revision: Union[str, Sequence[str], None] = 'c5a1d7e3f926'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so writes to analyses are not blocked meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_analyses_user_created_at_id',
+            'analyses',
+            ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_include=['status', 'image_url'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_analyses_user_created_at_id',
+            table_name='analyses',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,64 @@
+"""add_unique_section_analysis_id
+
+Revision ID: f3b7c9d1e245
+Revises: d8e2f4a6b913
+Create Date: 2026-10-17 18:05:31.214876
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b7c9d1e245'
+down_revision: Union[str, Sequence[str], None] = 'd8e2f4a6b913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SECTION_TABLES = [
+    'analysis_stories',
+    'analysis_brand_themes',
+    'analysis_tastes',
+    'analysis_action_plans',
+    'analysis_marketplaces',
+    'analysis_packagings',
+    'analysis_personas',
+    'analysis_pricings',
+    'analysis_seo',
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Duplicates from racing section writes: keep the oldest row
+    for table in SECTION_TABLES:
+        op.execute(sa.text(
+            f'DELETE FROM {table} a USING {table} b '
+            f'WHERE a.analysis_id = b.analysis_id '
+            f'AND (a.created_at, a.id) > (b.created_at, b.id)'
+        ))
+
+    # Built concurrently so section writes are not blocked meanwhile
+    with op.get_context().autocommit_block():
+        for table in SECTION_TABLES:
+            op.create_index(
+                f'ix_{table}_analysis_id',
+                table,
+                ['analysis_id'],
+                unique=True,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table in SECTION_TABLES:
+            op.drop_index(
+                f'ix_{table}_analysis_id',
+                table_name=table,
+                postgresql_concurrently=True,
+            )
@@ -23,15 +23,105 @@ class Settings(BaseSettings):
     GEMINI_VISION_MODEL: str = "gemini-2.5-flash-lite"
     GEMINI_LLM_MODEL: str = "gemini-2.5-flash-lite"
 
+    # LLM provider: gemini | fake (offline, for load tests) | replay (cassettes)
+    LLM_PROVIDER: str = "gemini"
+    LLM_RECORD_CASSETTES: bool = False
+    LLM_CASSETTE_DIR: str = "/tmp/aisthesis-cassettes"
+    LLM_FAKE_SEED: int = 0
+    LLM_FAKE_LATENCY_MEDIAN: float = 2.0  # seconds
+    LLM_FAKE_LATENCY_SIGMA: float = 0.5  # log-normal spread
+    LLM_FAKE_ERROR_RATE: float = 0.0
+    LLM_FAKE_RATE_LIMIT_RATE: float = 0.0
+
+    # Cluster-wide Gemini budget (Redis governor), per model
+    GEMINI_GOVERNOR_ENABLED: bool = True
+    GEMINI_RPM: int = 1000
+    GEMINI_TPM: int = 1_000_000
+    GEMINI_MAX_CONCURRENCY: int = 40
+    # Per-model overrides: "model=rpm:tpm:concurrency,model2=..."
+    GEMINI_MODEL_LIMITS_STR: str = ""
+    GEMINI_OUTPUT_TOKEN_ESTIMATE: int = 1024
+    GEMINI_GOVERNOR_MAX_WAIT: int = 120  # seconds
+    GEMINI_LEASE_TTL: int = 180  # seconds; frees slots of crashed workers
+    GEMINI_RATE_LIMIT_RETRIES: int = 3
+    GEMINI_BACKOFF_BASE: float = 2.0  # seconds
+
+    # Deadlines: per call (overridable per section, "vision" or "combined":
+    # "action_plan=90,seo=45") and for a whole analysis across all its calls
+    GEMINI_CALL_TIMEOUT: float = 60.0  # seconds
+    GEMINI_SECTION_TIMEOUTS_STR: str = ""
+    ANALYSIS_TIME_BUDGET: float = 300.0  # seconds
+    # Duplicate a call still running past the p95 latency of its kind
+    GEMINI_HEDGE_ENABLED: bool = False
+    GEMINI_HEDGE_MIN_SAMPLES: int = 20
+
+    # Constrained decoding: response_schema from the pydantic models, and an
+    # output token cap per call kind (kind=tokens overrides of the section caps)
+    GEMINI_RESPONSE_SCHEMA_ENABLED: bool = True
+    GEMINI_MAX_OUTPUT_TOKENS: int = 1024  # vision and kinds without a cap
+    GEMINI_SECTION_MAX_OUTPUT_TOKENS_STR: str = ""
+
+    # Circuit breaker per Gemini model: local (per process) | redis (shared)
+    GEMINI_BREAKER_ENABLED: bool = True
+    GEMINI_BREAKER_BACKEND: str = "local"
+    GEMINI_BREAKER_WINDOW: float = 60.0  # seconds of outcomes considered
+    GEMINI_BREAKER_MIN_CALLS: int = 10
+    GEMINI_BREAKER_FAILURE_RATE: float = 0.5
+    GEMINI_BREAKER_SLOW_CALL: float = 45.0  # seconds
+    GEMINI_BREAKER_SLOW_RATE: float = 0.8
+    GEMINI_BREAKER_OPEN_SECONDS: float = 30.0
+    GEMINI_BREAKER_HALF_OPEN_CALLS: int = 3
+
+    # Ask for all sections in one Gemini call; invalid ones fall back to
+    # individual calls
+    ANALYSIS_COMBINED_MODE: bool = False
+
+    # Characters of context + vision text per prompt (~4 per token); the
+    # user context is trimmed to fit, vision is kept whole. 0 = no limit
+    PROMPT_TEXT_BUDGET: int = 4000
+
+    # Shared image/context/vision prefix for section calls: gemini | local | none
+    GEMINI_CONTEXT_CACHE: str = "none"
+    GEMINI_CONTEXT_CACHE_TTL: int = 900  # seconds
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS: int = 1024  # provider minimum
+
+    # Gemini response cache keyed by prompt fingerprint: redis | disk | none
+    LLM_CACHE_BACKEND: str = "redis"
+    LLM_CACHE_TTL: int = 7 * 24 * 60 * 60  # seconds
+    LLM_CACHE_MAX_ENTRIES: int = 20000
+    LLM_CACHE_DIR: str = "/tmp/aisthesis-llm-cache"
+
     # Redis Configuration
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
+    REDIS_MAX_CONNECTIONS: int = 20
+    REDIS_CONN_TIMEOUT: int = 5  # seconds
+    REDIS_CONN_RETRIES: int = 3
+    REDIS_CONN_RETRY_DELAY: int = 1  # seconds
+    REDIS_RETRY_BACKOFF: float = 10.0  # seconds between attempts after a failure
+
+    # ARQ worker: concurrent jobs per worker process (one Gemini call each)
+    WORKER_MAX_JOBS: int = 10
 
     # Stored as comma-separated strings in env
     ALLOWED_ORIGINS_STR: str = ""
     ALLOWED_EXTENSIONS_STR: str = "jpg,jpeg,png,webp"
+    # Users allowed to read deployment-wide metrics (none by default)
+    METRICS_ADMIN_EMAILS_STR: str = ""
 
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+
+    # Image normalization (applied to every upload before storage/Gemini)
+    IMAGE_MAX_EDGE: int = 1536
+    IMAGE_OUTPUT_FORMAT: str = "webp"  # webp | jpeg
+    IMAGE_OUTPUT_QUALITY: int = 85
+
+    # Reuse the vision result of a near-duplicate photo within this many
+    # differing dHash bits (out of 64); -1 disables reuse
+    VISION_REUSE_MAX_DISTANCE: int = 6
+    # Only analyses updated this recently are loaded into the lookup index
+    VISION_INDEX_LOOKBACK_DAYS: int = 90
 
     ENVIRONMENT: str = "development"
 
@@ -55,5 +145,48 @@ class Settings(BaseSettings):
             ext.strip() for ext in self.ALLOWED_EXTENSIONS_STR.split(",") if ext.strip()
         ]
 
+    @computed_field
+    @property
+    def METRICS_ADMIN_EMAILS(self) -> list[str]:
+        return [
+            email.strip().lower()
+            for email in self.METRICS_ADMIN_EMAILS_STR.split(",")
+            if email.strip()
+        ]
+
+    @computed_field
+    @property
+    def GEMINI_MODEL_LIMITS(self) -> dict[str, tuple[int, int, int]]:
+        limits = {}
+        for item in self.GEMINI_MODEL_LIMITS_STR.split(","):
+            if "=" not in item:
+                continue
+            model, values = item.split("=", 1)
+            rpm, tpm, concurrency = (int(v) for v in values.split(":"))
+            limits[model.strip()] = (rpm, tpm, concurrency)
+        return limits
+
+    @computed_field
+    @property
+    def GEMINI_SECTION_TIMEOUTS(self) -> dict[str, float]:
+        timeouts = {}
+        for item in self.GEMINI_SECTION_TIMEOUTS_STR.split(","):
+            if "=" not in item:
+                continue
+            kind, seconds = item.split("=", 1)
+            timeouts[kind.strip()] = float(seconds)
+        return timeouts
+
+    @computed_field
+    @property
+    def GEMINI_SECTION_MAX_OUTPUT_TOKENS(self) -> dict[str, int]:
+        caps = {}
+        for item in self.GEMINI_SECTION_MAX_OUTPUT_TOKENS_STR.split(","):
+            if "=" not in item:
+                continue
+            kind, tokens = item.split("=", 1)
+            caps[kind.strip()] = int(tokens)
+        return caps
+
 
 settings = Settings()
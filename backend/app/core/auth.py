@@ -4,19 +4,26 @@ from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import logging
+import time
+from uuid import UUID
 
 from app.config import settings
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_db
 from app.models.user import User
 
 logger = logging.getLogger(__name__)
 
 oauth_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-async def get_current_user(
-    token: str = Depends(oauth_scheme),
-    db: AsyncSession = Depends(get_db)
-) -> User:
+# Seconds a user id seen in the database is trusted without a new lookup
+USER_EXISTS_TTL = 60
+# Entries kept before the cache is emptied
+USER_EXISTS_MAX = 10000
+
+# user_id -> monotonic expiry
+_known_users: dict[UUID, float] = {}
+
+def _token_subject(token: str) -> str:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id = payload.get("sub")
@@ -27,6 +34,44 @@ async def get_current_user(
     except JWTError as e:
         logger.warning(f"JWT decode error: {e}")
         raise HTTPException(status_code=401, detail="Invalid token")
+    return user_id
+
+
+async def get_current_user_id(token: str = Depends(oauth_scheme)) -> UUID:
+    """
+    User id from the token, without loading the user.
+
+    For hot read paths that only compare ownership; the token's signature
+    and expiry are checked, and that the user still exists, through a
+    per-process cache (USER_EXISTS_TTL) so most requests skip the lookup.
+    """
+    try:
+        user_id = UUID(_token_subject(token))
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    now = time.monotonic()
+    if _known_users.get(user_id, 0.0) > now:
+        return user_id
+
+    async with AsyncSessionLocal() as db:
+        found = await db.scalar(select(User.id).where(User.id == user_id))
+    if found is None:
+        _known_users.pop(user_id, None)
+        logger.warning(f"User {user_id} not found in database")
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if len(_known_users) >= USER_EXISTS_MAX:
+        _known_users.clear()
+    _known_users[user_id] = now + USER_EXISTS_TTL
+    return user_id
+
+
+async def get_current_user(
+    token: str = Depends(oauth_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    user_id = _token_subject(token)
 
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
@@ -36,3 +81,10 @@ async def get_current_user(
         raise HTTPException(status_code=404, detail="User not found")
 
     return user
+
+
+async def get_metrics_admin(user: User = Depends(get_current_user)) -> User:
+    """Current user, if allowed to read deployment-wide metrics."""
+    if user.email.lower() not in settings.METRICS_ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
+    return user
@@ -0,0 +1,106 @@
+"""
+Application-scoped ARQ/Redis connection pool.
+
+The pool is opened once in the app lifespan and shared by the analysis
+router (job enqueue) and the health check. If Redis was unreachable at
+startup, the next caller retries creating it; dropped connections inside
+the pool are re-established by redis-py on their next use.
+
+A failed attempt is remembered for REDIS_RETRY_BACKOFF seconds: callers in
+that window get RedisUnavailableError at once instead of repeating the
+connection retries, and later attempts connect once without retrying. So
+the best-effort users (events, caches, usage) fail fast without Redis.
+"""
+import asyncio
+import dataclasses
+import logging
+import time
+
+from arq import create_pool
+from arq.connections import ArqRedis, RedisSettings
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_pool: ArqRedis | None = None
+_lock = asyncio.Lock()
+
+# Monotonic time before which no new connection attempt is made
+_unavailable_until = 0.0
+_last_error: Exception | None = None
+
+
+class RedisUnavailableError(RedisConnectionError):
+    """Raised without connecting while a recent pool creation failure is cached."""
+
+
+def build_redis_settings() -> RedisSettings:
+    """ARQ Redis settings shared by the API process and the worker."""
+    return RedisSettings(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        conn_timeout=settings.REDIS_CONN_TIMEOUT,
+        conn_retries=settings.REDIS_CONN_RETRIES,
+        conn_retry_delay=settings.REDIS_CONN_RETRY_DELAY,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        retry_on_timeout=True,
+    )
+
+
+async def get_redis_pool() -> ArqRedis:
+    """
+    Return the shared ARQ pool, creating it on first use.
+
+    Raises:
+        RedisUnavailableError: Within REDIS_RETRY_BACKOFF of a failed attempt
+        redis.exceptions.ConnectionError: If Redis cannot be reached
+    """
+    global _pool, _unavailable_until, _last_error
+
+    if _pool is not None:
+        return _pool
+    if time.monotonic() < _unavailable_until:
+        raise RedisUnavailableError(f"Redis unavailable: {_last_error}")
+
+    async with _lock:
+        if _pool is not None:
+            return _pool
+        if time.monotonic() < _unavailable_until:
+            raise RedisUnavailableError(f"Redis unavailable: {_last_error}")
+
+        redis_settings = build_redis_settings()
+        if _last_error is not None:
+            # Already failed once: a single attempt, the backoff paces retries
+            redis_settings = dataclasses.replace(redis_settings, conn_retries=0)
+        try:
+            _pool = await create_pool(redis_settings)
+        except Exception as e:
+            _last_error = e
+            _unavailable_until = time.monotonic() + settings.REDIS_RETRY_BACKOFF
+            raise
+        _last_error = None
+        logger.info(
+            f"Redis pool opened: {settings.REDIS_HOST}:{settings.REDIS_PORT} "
+            f"(max_connections={settings.REDIS_MAX_CONNECTIONS})"
+        )
+    return _pool
+
+
+async def init_redis_pool() -> None:
+    """Open the pool at startup; failures are logged and retried lazily."""
+    try:
+        await get_redis_pool()
+    except Exception as e:
+        logger.warning(f"Redis unavailable at startup, will retry on use: {e}")
+
+
+async def close_redis_pool() -> None:
+    """Close the shared pool (app shutdown)."""
+    global _pool
+
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+        logger.info("Redis pool closed")
@@ -1,6 +1,7 @@
 import logging
 import sys
 import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import Depends, FastAPI, Request
@@ -11,10 +12,13 @@ from fastapi.staticfiles import StaticFiles
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
+from app.core.queue import close_redis_pool, get_redis_pool, init_redis_pool
 from app.database import get_db
 from app.middleware import RateLimitMiddleware
 from app.routers.analysis_router import router as analysis_router
 from app.routers.auth_router import router as auth_router
+from app.routers.metrics_router import router as metrics_router
+from app.services.events import event_hub
 
 # Configure logging
 logging.basicConfig(
@@ -25,6 +29,41 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+
+async def validate_config():
+    """Validate required configuration on startup."""
+    errors = []
+
+    if not settings.GOOGLE_API_KEY:
+        errors.append("GOOGLE_API_KEY must be set")
+
+    if not settings.DATABASE_URL:
+        errors.append("DATABASE_URL must be set")
+
+    if errors:
+        error_msg = "Configuration validation failed: " + ", ".join(errors)
+        logger.error(error_msg)
+        raise RuntimeError(error_msg)
+
+    logger.info("Configuration validation passed")
+    logger.info(f"Environment: {settings.ENVIRONMENT}")
+    logger.info(f"CORS origins: {settings.ALLOWED_ORIGINS}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await validate_config()
+
+    # One Redis/ARQ pool for the whole process (router + health check)
+    if settings.ENVIRONMENT == "production":
+        await init_redis_pool()
+
+    yield
+
+    await event_hub.close()
+    await close_redis_pool()
+
+
 app = FastAPI(
     title="Aisthesis API",
     description="API for Aisthesis",
@@ -34,6 +73,7 @@ app = FastAPI(
     openapi_url="/api/v1/openapi.json"
     if settings.ENVIRONMENT != "production"
     else None,
+    lifespan=lifespan,
 )
 
 # Use absolute path for Docker compatibility - matches volume mount at /app/uploads
@@ -108,27 +148,7 @@ async def add_security_headers(request: Request, call_next):
 
 app.include_router(auth_router, prefix="/api/v1")
 app.include_router(analysis_router, prefix="/api/v1")
-
-
-@app.on_event("startup")
-async def validate_config():
-    """Validate required configuration on startup."""
-    errors = []
-
-    if not settings.GOOGLE_API_KEY:
-        errors.append("GOOGLE_API_KEY must be set")
-
-    if not settings.DATABASE_URL:
-        errors.append("DATABASE_URL must be set")
-
-    if errors:
-        error_msg = "Configuration validation failed: " + ", ".join(errors)
-        logger.error(error_msg)
-        raise RuntimeError(error_msg)
-
-    logger.info("Configuration validation passed")
-    logger.info(f"Environment: {settings.ENVIRONMENT}")
-    logger.info(f"CORS origins: {settings.ALLOWED_ORIGINS}")
+app.include_router(metrics_router, prefix="/api/v1")
 
 
 @app.get("/api/v1/health")
@@ -149,14 +169,9 @@ async def health_check(db: AsyncSession = Depends(get_db)):
 
     # Check Redis
     try:
-        from app.routers.analysis_router import get_redis_pool
-
         redis = await get_redis_pool()
-        try:
-            await redis.ping()
-            checks["redis"] = "healthy"
-        finally:
-            await redis.close()
+        await redis.ping()
+        checks["redis"] = "healthy"
     except Exception as e:
         checks["redis"] = "unhealthy"
         checks["status"] = "unhealthy"
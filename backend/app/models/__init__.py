@@ -1,6 +1,7 @@
 from app.models.analysis.action_plan import AnalysisActionPlan
 from app.models.analysis.analysis import Analysis
 from app.models.analysis.brand_theme import AnalysisBrandTheme
+from app.models.analysis.llm_call import AnalysisLLMCall
 from app.models.analysis.marketplace import AnalysisMarketplace
 from app.models.analysis.packaging import AnalysisPackaging
 from app.models.analysis.persona import AnalysisPersona
@@ -26,4 +27,5 @@ __all__ = [
     "AnalysisPersona",
     "AnalysisPackaging",
     "AnalysisActionPlan",
+    "AnalysisLLMCall",
 ]
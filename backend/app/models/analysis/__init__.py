@@ -1,6 +1,7 @@
 from .action_plan import AnalysisActionPlan
 from .analysis import Analysis
 from .brand_theme import AnalysisBrandTheme
+from .llm_call import AnalysisLLMCall
 from .marketplace import AnalysisMarketplace
 from .packaging import AnalysisPackaging
 from .persona import AnalysisPersona
@@ -20,4 +21,5 @@ __all__ = [
     "AnalysisPersona",
     "AnalysisPackaging",
     "AnalysisActionPlan",
+    "AnalysisLLMCall",
 ]
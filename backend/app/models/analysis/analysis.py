@@ -2,7 +2,7 @@ import uuid
 from enum import Enum as PyEnum
 
 from app.models.base import Base, TimestampMixin
-from sqlalchemy import Column, ForeignKey, String, Text
+from sqlalchemy import Column, ForeignKey, Index, String, Text, text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 
@@ -17,6 +17,24 @@ class AnalysisStatus(str, PyEnum):
 
 class Analysis(Base, TimestampMixin):
     __tablename__ = "analyses"
+    __table_args__ = (
+        # History pages (GET /analysis): keyset on (created_at, id) per user,
+        # covering the list columns for index-only scans
+        Index(
+            "ix_analyses_user_created_at_id",
+            "user_id",
+            text("created_at DESC"),
+            text("id DESC"),
+            postgresql_include=["status", "image_url"],
+        ),
+        # Near-duplicate vision index top-ups (app.services.ai.vision_index)
+        Index(
+            "ix_analyses_phash_updated_at_id",
+            "updated_at",
+            "id",
+            postgresql_where=text("phash IS NOT NULL"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -34,9 +52,20 @@ class Analysis(Base, TimestampMixin):
     image_url = Column(String(500), nullable=False)
     image_filename = Column(String(255), nullable=False)
 
+    # SHA-256 of normalized image + context + model names, used to reuse
+    # completed analyses for repeat uploads
+    content_key = Column(String(64), nullable=True, index=True)
+
+    # 64-bit dHash of the normalized image (hex), used to reuse the vision
+    # result of near-duplicate photos
+    phash = Column(String(16), nullable=True)
+
     # Vision analysis (JSONB untuk fleksibilitas)
     vision_result = Column(JSONB, nullable=True)
 
+    # Per-section status, e.g. {"story": "COMPLETED", "seo": "FAILED"}
+    section_status = Column(JSONB, nullable=True)
+
     # Relationships
     user = relationship("User", back_populates="analyses")
     story = relationship(
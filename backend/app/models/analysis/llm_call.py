@@ -0,0 +1,33 @@
+import uuid
+
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.models.base import Base, TimestampMixin
+
+
+class AnalysisLLMCall(Base, TimestampMixin):
+    """Token and latency accounting of one LLM call (vision or a section)."""
+
+    __tablename__ = "analysis_llm_calls"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    analysis_id = Column(
+        UUID(as_uuid=True), ForeignKey("analyses.id", ondelete="CASCADE"), nullable=True, index=True
+    )
+    user_id = Column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True
+    )
+
+    # Section name, "vision" or "combined"
+    kind = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    # ok | error | cached (served from the response cache)
+    status = Column(String(20), nullable=False)
+
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    candidate_tokens = Column(Integer, nullable=False, default=0)
+    cached_tokens = Column(Integer, nullable=False, default=0)
+    retries = Column(Integer, nullable=False, default=0)
+    hedged = Column(Boolean, nullable=False, default=False)
+    latency_ms = Column(Integer, nullable=False)
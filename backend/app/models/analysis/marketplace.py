@@ -10,8 +10,13 @@ class AnalysisMarketplace(Base, TimestampMixin):
     __tablename__ = "analysis_marketplaces"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    # One row per analysis; section writes insert ON CONFLICT DO NOTHING
     analysis_id = Column(
-        UUID(as_uuid=True), ForeignKey("analyses.id", ondelete="CASCADE"), nullable=False
+        UUID(as_uuid=True),
+        ForeignKey("analyses.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+        index=True,
     )
 
     shopee_desc = Column(Text, nullable=True)
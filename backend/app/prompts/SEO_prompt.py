@@ -1,18 +1,3 @@
-import google.generativeai as genai
-from google.api_core import exceptions as google_exceptions
-from pydantic import ValidationError
-
-from app.config import settings
-from app.schemas.analysis_seo import AnalysisSEOResponse
-from .exceptions import (
-    GeminiAPIError,
-    GeminiRateLimitError,
-    GeminiValidationError,
-)
-
-genai.configure(api_key=settings.GOOGLE_API_KEY)
-
-
 SEO_SYSTEM_PROMPT = """
 You are an SEO strategist for Indonesian online marketplaces and social media.
 
@@ -33,21 +18,3 @@ Guidelines:
 
 The response MUST be valid JSON only.
 """
-
-async def generate_seo(images, context=None):
-    model = genai.GenerativeModel(
-        model_name=settings.GEMINI_LLM_MODEL,
-        system_instruction=SEO_SYSTEM_PROMPT,
-    )
-
-    parts = [*images, "Generate SEO keywords and hashtags."]
-
-    response = await model.generate_content_async(
-        contents=parts,
-        generation_config=genai.GenerationConfig(
-            response_mime_type="application/json",
-            response_schema=AnalysisSEOResponse,
-        )
-    )
-
-    return AnalysisSEOResponse.model_validate_json(response.text)
@@ -1,27 +1,30 @@
 """
 Modular prompt modules for Gemini AI analysis.
 
-Each module handles a specific analysis type with system prompts
-and async generation functions.
+Each module holds the system prompt of one analysis type; the calls
+themselves go through the LLM provider (see app.services.ai).
 """
 
-# Import all system prompts and generators
-from .story_prompt import STORY_SYSTEM_PROMPT, generate_story
-from .brand_prompt import BRAND_THEME_SYSTEM_PROMPT, generate_brand_theme
-from .taste_prompt import TASTE_SYSTEM_PROMPT, generate_taste_profile
-from .SEO_prompt import SEO_SYSTEM_PROMPT, generate_seo
-from .marketplace_prompt import MARKETPLACE_SYSTEM_PROMPT, generate_marketplace
-from .packaging_prompt import PACKAGING_SYSTEM_PROMPT, generate_packaging
-from .persona_prompt import PERSONA_SYSTEM_PROMPT, generate_persona
-from .pricing_prompt import PRICING_SYSTEM_PROMPT, generate_pricing
-from .action_plan_prompt import ACTION_PLAN_SYSTEM_PROMPT, generate_action_plan
-from .vision_prompt import VISION_SYSTEM_PROMPT, generate_vision
+# Import all system prompts
+from .story_prompt import STORY_SYSTEM_PROMPT
+from .brand_prompt import BRAND_THEME_SYSTEM_PROMPT
+from .taste_prompt import TASTE_SYSTEM_PROMPT
+from .SEO_prompt import SEO_SYSTEM_PROMPT
+from .marketplace_prompt import MARKETPLACE_SYSTEM_PROMPT
+from .packaging_prompt import PACKAGING_SYSTEM_PROMPT
+from .persona_prompt import PERSONA_SYSTEM_PROMPT
+from .pricing_prompt import PRICING_SYSTEM_PROMPT
+from .action_plan_prompt import ACTION_PLAN_SYSTEM_PROMPT
+from .vision_prompt import VISION_SYSTEM_PROMPT
+from .combined_prompt import COMBINED_SYSTEM_PROMPT
 
 # Import exceptions
 from .exceptions import (
+    CircuitOpenError,
     GeminiAPIError,
     GeminiError,
     GeminiRateLimitError,
+    GeminiTimeoutError,
     GeminiValidationError,
 )
 
@@ -37,20 +40,12 @@ __all__ = [
     "PRICING_SYSTEM_PROMPT",
     "ACTION_PLAN_SYSTEM_PROMPT",
     "VISION_SYSTEM_PROMPT",
-    # Generator functions
-    "generate_story",
-    "generate_brand_theme",
-    "generate_taste_profile",
-    "generate_seo",
-    "generate_marketplace",
-    "generate_packaging",
-    "generate_persona",
-    "generate_pricing",
-    "generate_action_plan",
-    "generate_vision",
+    "COMBINED_SYSTEM_PROMPT",
     # Exceptions
     "GeminiError",
     "GeminiAPIError",
     "GeminiValidationError",
     "GeminiRateLimitError",
+    "GeminiTimeoutError",
+    "CircuitOpenError",
 ]
@@ -1,12 +1,3 @@
-import google.generativeai as genai
-from google.api_core import exceptions as google_exceptions
-from pydantic import ValidationError
-
-from app.config import settings
-from app.schemas.analysis_branding import AnalysisBrandThemeResponse
-from .exceptions import GeminiAPIError, GeminiRateLimitError, GeminiValidationError
-
-
 BRAND_THEME_SYSTEM_PROMPT = """
 You are a professional brand identity strategist for Indonesian UMKM businesses.
 
@@ -31,25 +22,4 @@ Rules:
 1. No abstract or poetic descriptions.
 2. Colors must be logically derived from the product image.
 3. Response MUST be JSON with no additional text.
-""" 
-
-
-async def generate_brand_theme(images, context=None):
-    model = genai.GenerativeModel(
-        model_name=settings.GEMINI_LLM_MODEL,
-        system_instruction=BRAND_THEME_SYSTEM_PROMPT,
-    )
-
-    items = [*images]
-    text = "Analyze brand theme." + (f"\nContext: {context}" if context else "")
-    items.append(text)
-
-    response = await model.generate_content_async(
-        contents=items,
-        generation_config=genai.GenerationConfig(
-            response_mime_type="application/json",
-            response_schema=AnalysisBrandThemeResponse,
-        )
-    )
-
-    return AnalysisBrandThemeResponse.model_validate_json(response.text)
+"""
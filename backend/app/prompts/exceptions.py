@@ -28,3 +28,23 @@ class GeminiRateLimitError(GeminiError):
     """Raised when Gemini API rate limit is exceeded."""
 
     pass
+
+
+class GeminiTimeoutError(GeminiError):
+    """Raised when a Gemini call or the analysis time budget runs out."""
+
+    pass
+
+
+class CircuitOpenError(GeminiError):
+    """Raised without calling Gemini while its circuit breaker is open."""
+
+    def __init__(self, message: str, retry_after: float):
+        # Both in args: exceptions unpickle and copy as cls(*args) (ARQ results)
+        super(GeminiError, self).__init__(message, retry_after)
+        self.message = message
+        self.original_error = None
+        self.retry_after = retry_after
+
+    def __str__(self) -> str:
+        return self.message
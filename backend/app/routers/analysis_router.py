@@ -1,28 +1,39 @@
 import asyncio
+import json
 import logging
 import os
-from io import BytesIO
 from pathlib import Path
-from uuid import UUID, uuid4
+from uuid import UUID
 
-from arq import create_pool
-from arq.connections import RedisSettings
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from PIL import Image
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, UploadFile
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from app.config import settings
-from app.core.auth import get_current_user
+from app.core.auth import get_current_user, get_current_user_id
+from app.core.queue import get_redis_pool
 from app.database import AsyncSessionLocal, get_db
 from app.models.analysis.analysis import Analysis, AnalysisStatus
 from app.schemas.analysis import (
     AnalysisCreateData,
     AnalysisCreateResponse,
     AnalysisData,
+    AnalysisListItem,
+    AnalysisListPage,
+    AnalysisListResponse,
     AnalysisResponse,
+    AnalysisStatusData,
+    AnalysisStatusEnum,
+    AnalysisStatusResponse,
 )
+from app.services import document_cache, events, status_cache
+from app.services.ai.image_payload import load_image_payload
+from app.services.analysis_service import AnalysisService
+from app.services.events import event_hub
+from app.services.sections import SECTIONS
+from app.utils.image import normalize_image
+from app.utils.upload import UnsupportedImageError, UploadTooLargeError, spool_upload
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +49,22 @@ else:
 
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Seconds between SSE keep-alive comments (proxies drop idle streams)
+SSE_HEARTBEAT_INTERVAL = 15
+
+TERMINAL_STATUSES = {AnalysisStatus.COMPLETED.value, AnalysisStatus.FAILED.value}
+
+# Upper bound for GET /analysis/{id}/status?wait=
+MAX_STATUS_WAIT = 60
+
+
+def _touch_upload(filename: str) -> None:
+    """Refresh a shared upload's mtime so retention cleanup keeps it."""
+    try:
+        os.utime(UPLOAD_DIR / filename)
+    except OSError as e:
+        logger.warning(f"Could not touch shared upload {filename}: {e}")
+
 
 # Background task processor for development mode
 async def process_bg_task(analysis_id: UUID, save_path: Path, context: str | None):
@@ -52,16 +79,10 @@ async def process_bg_task(analysis_id: UUID, save_path: Path, context: str | Non
 
             a.status = AnalysisStatus.PROCESSING.value
             await bg.commit()
+            await events.publish(analysis_id, "status", {"status": AnalysisStatus.PROCESSING.value})
 
-            # Gemini inline_data
-            with open(save_path, "rb") as f:
-                img_bytes = f.read()
-
-            gemini_image = {
-                "inline_data": {"mime_type": "image/png", "data": img_bytes}
-            }
-
-            from app.services.analysis_service import AnalysisService
+            # Encoded once, shared by all ten Gemini calls
+            gemini_image = await asyncio.to_thread(load_image_payload, save_path)
 
             # Run full pipeline
             await AnalysisService.analyze_product(
@@ -81,6 +102,9 @@ async def process_bg_task(analysis_id: UUID, save_path: Path, context: str | Non
                 a2.status = AnalysisStatus.FAILED.value
                 a2.error = str(e)
                 await bg2.commit()
+            await events.publish(
+                analysis_id, "status", {"status": AnalysisStatus.FAILED.value, "error": str(e)}
+            )
 
 
 # -------------------------------------------------------------
@@ -94,41 +118,83 @@ async def create_analysis(
     user=Depends(get_current_user),
 ):
     analysis = None
+    spooled = None
 
     try:
         # Validate file MIME
         if not file.content_type.startswith("image/"):
             raise HTTPException(400, "File must be an image")
 
-        image_bytes = await file.read()
+        # Validate extension
+        ext = file.filename.split(".")[-1].lower()
+        if ext not in settings.ALLOWED_EXTENSIONS:
+            raise HTTPException(400, f"Extension .{ext} not allowed")
 
-        # Validate size
-        if len(image_bytes) > settings.MAX_UPLOAD_SIZE:
+        # Reject early when the multipart parser already knows the size
+        if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
             raise HTTPException(413, "File size too large")
 
-        # Validate image content
+        # Stream to disk in chunks: size limit, hashing and format sniffing
+        # all happen without holding the whole image in memory
         try:
-            img = Image.open(BytesIO(image_bytes))
-            img.verify()
-        except:
+            spooled = await spool_upload(
+                file,
+                UPLOAD_DIR,
+                max_size=settings.MAX_UPLOAD_SIZE,
+                chunk_size=settings.UPLOAD_CHUNK_SIZE,
+            )
+        except UploadTooLargeError:
+            raise HTTPException(413, "File size too large")
+        except UnsupportedImageError:
             raise HTTPException(400, "Invalid image format")
 
-        # Validate extension
-        ext = file.filename.split(".")[-1].lower()
-        if ext not in settings.ALLOWED_EXTENSIONS:
-            raise HTTPException(400, f"Extension .{ext} not allowed")
+        # Normalize: single decode, EXIF orientation, downscale, compact encode
+        try:
+            normalized = await asyncio.to_thread(
+                normalize_image,
+                spooled.path,
+                UPLOAD_DIR,
+                max_edge=settings.IMAGE_MAX_EDGE,
+                output_format=settings.IMAGE_OUTPUT_FORMAT,
+                quality=settings.IMAGE_OUTPUT_QUALITY,
+            )
+        except Exception as e:
+            logger.warning(f"Image normalization failed: {e}")
+            raise HTTPException(400, "Invalid image format")
+        finally:
+            spooled.discard()
 
-        # Save locally
-        new_filename = f"{uuid4()}.png"
-        save_path = UPLOAD_DIR / new_filename
-        img = Image.open(BytesIO(image_bytes))
-        img.save(save_path)
+        new_filename = normalized.filename
+        save_path = normalized.path
+
+        # --------------------------------------------------
+        # Reuse a completed analysis of identical inputs (same user only)
+        # --------------------------------------------------
+        content_key = AnalysisService.content_key(normalized.sha256, context)
+        existing = await AnalysisService.find_completed_by_content_key(db, content_key, user.id)
+        if existing:
+            save_path.unlink(missing_ok=True)
+            _touch_upload(existing.image_filename)
+
+            analysis = AnalysisService.clone_completed(db, existing, user.id)
+            await db.commit()
+            await db.refresh(analysis)
+
+            logger.info(
+                f"✓ Reused analysis {existing.id} for {analysis.id} (content key hit)"
+            )
+            return AnalysisCreateResponse(
+                data=AnalysisCreateData(id=analysis.id, status=analysis.status)
+            )
 
         # Create DB record
         analysis = Analysis(
             user_id=user.id,
             image_url=f"/uploads/{new_filename}",
             image_filename=new_filename,
+            content_key=content_key,
+            phash=normalized.phash,
+            section_status={s.name: AnalysisStatus.PENDING.value for s in SECTIONS},
             status=AnalysisStatus.PENDING.value,
         )
         db.add(analysis)
@@ -144,21 +210,12 @@ async def create_analysis(
         if settings.ENVIRONMENT == "production":
             # Production: Use Redis queue with ARQ worker
             try:
-                from arq import create_pool
-                from arq.connections import RedisSettings
-                
-                redis_settings = RedisSettings(
-                    host=settings.REDIS_HOST,
-                    port=settings.REDIS_PORT,
-                )
-                
-                redis = await create_pool(redis_settings)
+                redis = await get_redis_pool()
                 await redis.enqueue_job(
                     "process_analysis",
                     str(analysis_id),
                     context,
                 )
-                await redis.close()
                 logger.info(f"✓ Enqueued analysis {analysis_id} to Redis queue")
                 
             except Exception as e:
@@ -176,49 +233,253 @@ async def create_analysis(
         )
 
     except HTTPException:
+        if spooled:
+            spooled.discard()
         if analysis:
             await db.rollback()
         raise
 
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
+        if spooled:
+            spooled.discard()
         if analysis:
             await db.rollback()
         raise HTTPException(500, "Internal Server Error")
 
 
+# -------------------------------------------------------------
+# GET /analysis — History of the user's analyses (keyset pages)
+# -------------------------------------------------------------
+@router.get("", response_model=AnalysisListResponse)
+async def list_analyses(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    status: AnalysisStatusEnum | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id),
+):
+    try:
+        rows, next_cursor = await AnalysisService.list_page(
+            db, user_id, limit, cursor, status.value if status else None
+        )
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+
+    return AnalysisListResponse(
+        data=AnalysisListPage(
+            items=[AnalysisListItem.model_validate(row) for row in rows],
+            next_cursor=next_cursor,
+        )
+    )
+
+
 # -------------------------------------------------------------
 # GET /analysis/{id} — Get analysis status/results
 # -------------------------------------------------------------
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 asks for)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
 @router.get("/{analysis_id}", response_model=AnalysisResponse)
 async def get_analysis(
     analysis_id: UUID,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id),
+):
+    """
+    Full analysis. COMPLETED ones are served from document_cache (no
+    database access); every response carries an ETag, and a matching
+    If-None-Match gets 304 Not Modified.
+    """
+    cached = await document_cache.get(analysis_id)
+    if cached is not None:
+        if cached["user_id"] != user_id:
+            raise HTTPException(404, "Analysis not found")
+        body, etag = cached["body"], cached["etag"]
+    else:
+        # Analysis and all nine sections in a single statement
+        document = await AnalysisService.fetch_document(db, analysis_id)
+
+        if not document:
+            raise HTTPException(404, "Analysis not found")
+
+        if document["user_id"] != user_id:
+            raise HTTPException(404, "Analysis not found")
+
+        body = AnalysisService.render_document(document)
+        etag = document_cache.etag(body)
+        if document["status"] == AnalysisStatus.COMPLETED.value:
+            await document_cache.put(analysis_id, user_id, body, etag)
+
+    # Clients may keep a copy but must revalidate it
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _read_status(db: AsyncSession, analysis_id: UUID) -> dict | None:
+    """
+    Status fields from the Redis status key, else from the analyses row only.
+
+    A non-terminal cached state with no write for status_cache.STALE_AFTER
+    seconds is re-read from the row and the cache repaired, so a lost
+    event cannot leave a client polling a finished analysis forever.
+    """
+    state = await status_cache.get(analysis_id)
+    if state is not None and not status_cache.stale(state, TERMINAL_STATUSES):
+        return state
+
+    row = (
+        await db.execute(
+            select(
+                Analysis.user_id,
+                Analysis.status,
+                Analysis.error,
+                Analysis.section_status,
+            ).where(Analysis.id == analysis_id)
+        )
+    ).one_or_none()
+    if row is None:
+        return None
+
+    await status_cache.fill(
+        analysis_id,
+        row.user_id,
+        row.status,
+        row.error,
+        row.section_status,
+        replace=state is not None,
+    )
+    return row._asdict()
+
+
+# -------------------------------------------------------------
+# GET /analysis/{id}/status — Lightweight status (optional long-poll)
+# -------------------------------------------------------------
+@router.get("/{analysis_id}/status", response_model=AnalysisStatusResponse)
+async def get_analysis_status(
+    analysis_id: UUID,
+    wait: float = Query(
+        0,
+        ge=0,
+        le=MAX_STATUS_WAIT,
+        description="Seconds to block until the status or a section status changes",
+    ),
     db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user),
 ):
-    stmt = (
-        select(Analysis)
-        .where(Analysis.id == analysis_id)
-        .options(
-            selectinload(Analysis.story),
-            selectinload(Analysis.taste),
-            selectinload(Analysis.pricing),
-            selectinload(Analysis.brand_theme),
-            selectinload(Analysis.seo),
-            selectinload(Analysis.marketplace),
-            selectinload(Analysis.persona),
-            selectinload(Analysis.packaging),
-            selectinload(Analysis.action_plan),
+    # Subscribe before reading so a change in between still wakes us
+    queue = await event_hub.subscribe(analysis_id) if wait else None
+    try:
+        state = await _read_status(db, analysis_id)
+        if state is None or state["user_id"] != user.id:
+            raise HTTPException(404, "Analysis not found")
+
+        if queue is not None and state["status"] not in TERMINAL_STATUSES:
+            # Don't hold a pooled DB connection while waiting
+            await db.close()
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + wait
+            changed = False
+            while not changed:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(queue.get(), remaining)
+                except TimeoutError:
+                    break
+                changed = message is None or message["event"] in ("status", "section")
+
+            if changed:
+                state = await _read_status(db, analysis_id) or state
+    finally:
+        if queue is not None:
+            event_hub.unsubscribe(analysis_id, queue)
+
+    return AnalysisStatusResponse(
+        data=AnalysisStatusData(
+            id=analysis_id,
+            status=state["status"],
+            error=state["error"],
+            section_status=state["section_status"],
         )
     )
 
-    result = await db.execute(stmt)
-    analysis = result.scalar_one_or_none()
 
-    if not analysis:
-        raise HTTPException(404, "Analysis not found")
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
-    if analysis.user_id != user.id:
+
+# -------------------------------------------------------------
+# GET /analysis/{id}/events — Stream progress (Server-Sent Events)
+# -------------------------------------------------------------
+@router.get("/{analysis_id}/events")
+async def stream_analysis_events(
+    analysis_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Stream status transitions and finished sections as they land.
+
+    The first frame is a "snapshot" with everything stored so far; it is
+    read after subscribing, so nothing published in between is lost
+    (duplicates are possible and harmless). The stream ends after a
+    terminal status.
+    """
+    owner = await db.scalar(select(Analysis.user_id).where(Analysis.id == analysis_id))
+    if owner is None or owner != user.id:
         raise HTTPException(404, "Analysis not found")
 
-    return AnalysisResponse(data=AnalysisData.model_validate(analysis))
+    queue = await event_hub.subscribe(analysis_id)
+    try:
+        document = await AnalysisService.fetch_document(db, analysis_id)
+        snapshot = AnalysisData.model_validate(document).model_dump(mode="json")
+    except Exception:
+        event_hub.unsubscribe(analysis_id, queue)
+        raise
+    finally:
+        # Don't hold a pooled DB connection for the lifetime of the stream
+        await db.close()
+
+    async def stream():
+        try:
+            yield _sse("snapshot", snapshot)
+            if snapshot["status"] in TERMINAL_STATUSES:
+                return
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_INTERVAL)
+                except TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if message is None:
+                    # Dropped for falling behind; the client reconnects
+                    return
+                yield _sse(message["event"], message["data"])
+                if message["event"] == "status" and message["data"].get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            event_hub.unsubscribe(analysis_id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,89 @@
+import logging
+from uuid import UUID
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth import get_current_user, get_metrics_admin
+from app.database import get_db
+from app.models.analysis.llm_call import AnalysisLLMCall
+from app.schemas.metrics import (
+    LLMCacheStats,
+    LLMCacheStatsResponse,
+    LLMUsageGroup,
+    LLMUsageStatsResponse,
+    LLMUsageTotals,
+    LLMUsageTotalsResponse,
+)
+from app.services.ai import usage
+from app.services.ai.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+# -------------------------------------------------------------
+# GET /metrics/llm-cache — Gemini response cache counters (metrics admins)
+# -------------------------------------------------------------
+@router.get("/llm-cache", response_model=LLMCacheStatsResponse)
+async def get_llm_cache_stats(user=Depends(get_metrics_admin)):
+    stats = await response_cache.stats()
+    return LLMCacheStatsResponse(data=LLMCacheStats(**stats))
+
+
+# -------------------------------------------------------------
+# GET /metrics/llm-usage — Live token/latency counters per section and model
+# (metrics admins; empty while Redis is unreachable)
+# -------------------------------------------------------------
+@router.get("/llm-usage", response_model=LLMUsageStatsResponse)
+async def get_llm_usage_stats(user=Depends(get_metrics_admin)):
+    groups = await usage.stats()
+    return LLMUsageStatsResponse(data=[LLMUsageGroup(**g) for g in groups])
+
+
+# -------------------------------------------------------------
+# GET /metrics/llm-usage/me — Stored totals of the current user's calls
+# -------------------------------------------------------------
+@router.get("/llm-usage/me", response_model=LLMUsageTotalsResponse)
+async def get_my_llm_usage(
+    analysis_id: UUID | None = None,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    call = AnalysisLLMCall
+    stmt = (
+        select(
+            call.kind,
+            call.model,
+            func.count().label("calls"),
+            func.count().filter(call.status == "error").label("errors"),
+            func.count().filter(call.status == "cached").label("cached"),
+            func.coalesce(func.sum(call.retries), 0).label("retries"),
+            func.coalesce(func.sum(call.prompt_tokens), 0).label("prompt_tokens"),
+            func.coalesce(func.sum(call.candidate_tokens), 0).label("candidate_tokens"),
+            func.coalesce(func.sum(call.cached_tokens), 0).label("cached_tokens"),
+            func.avg(call.latency_ms).label("avg_latency_ms"),
+            func.percentile_cont(0.95).within_group(call.latency_ms).label("p95_latency_ms"),
+        )
+        .where(call.user_id == user.id)
+        .group_by(call.kind, call.model)
+        .order_by(call.kind, call.model)
+    )
+    if analysis_id is not None:
+        stmt = stmt.where(call.analysis_id == analysis_id)
+
+    rows = (await db.execute(stmt)).all()
+    return LLMUsageTotalsResponse(
+        data=[
+            LLMUsageTotals(
+                **{
+                    **row._asdict(),
+                    "avg_latency_ms": round(float(row.avg_latency_ms), 1),
+                    "p95_latency_ms": round(float(row.p95_latency_ms), 1),
+                }
+            )
+            for row in rows
+        ]
+    )
@@ -50,6 +50,7 @@ class AnalysisStatusData(BaseModel):
     id: UUID
     status: AnalysisStatusEnum
     error: str | None = None
+    section_status: dict[str, AnalysisStatusEnum] | None = None
 
     class Config:
         from_attributes = True
@@ -65,6 +66,7 @@ class AnalysisData(AnalysisBase):
     id: UUID
     status: AnalysisStatusEnum
     error: str | None = None
+    section_status: dict[str, AnalysisStatusEnum] | None = None
     created_at: datetime
     updated_at: datetime
 
@@ -95,3 +97,15 @@ class AnalysisListItem(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class AnalysisListPage(BaseModel):
+    """One page of a user's analyses, newest first."""
+    items: list[AnalysisListItem]
+    # Opaque; pass as ?cursor= for the next page (None on the last page)
+    next_cursor: str | None = None
+
+
+class AnalysisListResponse(DataResponse[AnalysisListPage]):
+    """Wrapped response for GET /analysis."""
+    pass
@@ -0,0 +1,62 @@
+from pydantic import BaseModel
+
+from . import DataResponse
+
+
+class LLMCacheStats(BaseModel):
+    """Counters of the Gemini response cache."""
+    backend: str
+    # False when the backend could not be read (counters are then zero)
+    available: bool = True
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    hit_rate: float = 0.0
+
+
+class LLMCacheStatsResponse(DataResponse[LLMCacheStats]):
+    """Wrapped response for GET /metrics/llm-cache."""
+    pass
+
+
+class LLMUsageGroup(BaseModel):
+    """Live LLM call counters of one (kind, model), across all users."""
+    kind: str
+    model: str
+    calls: int = 0
+    errors: int = 0
+    cached: int = 0
+    retries: int = 0
+    hedged: int = 0
+    prompt_tokens: int = 0
+    candidate_tokens: int = 0
+    cached_tokens: int = 0
+    avg_seconds: float = 0.0
+    # Cumulative call counts per latency upper bound in seconds ("+Inf" = all)
+    latency_histogram: dict[str, int] = {}
+
+
+class LLMUsageStatsResponse(DataResponse[list[LLMUsageGroup]]):
+    """Wrapped response for GET /metrics/llm-usage."""
+    pass
+
+
+class LLMUsageTotals(BaseModel):
+    """Stored LLM call totals of one (kind, model) for the current user."""
+    kind: str
+    model: str
+    calls: int
+    errors: int
+    cached: int
+    retries: int
+    prompt_tokens: int
+    candidate_tokens: int
+    cached_tokens: int
+    avg_latency_ms: float
+    p95_latency_ms: float
+
+
+class LLMUsageTotalsResponse(DataResponse[list[LLMUsageTotals]]):
+    """Wrapped response for GET /metrics/llm-usage/me."""
+    pass
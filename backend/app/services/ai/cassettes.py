@@ -0,0 +1,85 @@
+"""
+Record/replay of LLM responses as cassette files.
+
+A cassette is one JSON file per request in LLM_CASSETTE_DIR, named by the
+request fingerprint (the same one the response cache uses), so a recorded
+run can be replayed offline and byte-for-byte.
+"""
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+from pathlib import Path
+
+from app.config import settings
+from app.prompts.exceptions import GeminiAPIError
+from app.services.ai.llm_provider import LLMProvider, LLMRequest, LLMResponse
+from app.services.ai.response_cache import fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def cassette_key(request: LLMRequest) -> str:
+    contents = request.contents
+    if request.cached_prefix is not None:
+        contents = [{"parts": [{"text": f"prefix:{request.cached_prefix.digest}"}]}, *contents]
+    return fingerprint(request.model, request.schema.__name__, request.system_instruction, contents)
+
+
+def _path(key: str) -> Path:
+    return Path(settings.LLM_CASSETTE_DIR) / f"{key}.json"
+
+
+def _write(key: str, request: LLMRequest, response: LLMResponse) -> None:
+    path = _path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".part")
+    tmp.write_text(
+        json.dumps(
+            {
+                "model": request.model,
+                "schema": request.schema.__name__,
+                **dataclasses.asdict(response),
+            }
+        ),
+        encoding="utf-8",
+    )
+    os.replace(tmp, path)
+
+
+def _read(key: str) -> LLMResponse | None:
+    try:
+        data = json.loads(_path(key).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    fields = {f.name for f in dataclasses.fields(LLMResponse)}
+    return LLMResponse(**{k: v for k, v in data.items() if k in fields})
+
+
+class RecordingProvider:
+    """Wraps a provider and writes every successful response to a cassette."""
+
+    def __init__(self, inner: LLMProvider) -> None:
+        self.inner = inner
+
+    async def generate(self, request: LLMRequest) -> LLMResponse:
+        response = await self.inner.generate(request)
+        try:
+            await asyncio.to_thread(_write, cassette_key(request), request, response)
+        except OSError as e:
+            logger.warning(f"Failed to record cassette: {e}")
+        return response
+
+
+class ReplayProvider:
+    """Answers from recorded cassettes; a request never recorded is an error."""
+
+    async def generate(self, request: LLMRequest) -> LLMResponse:
+        key = cassette_key(request)
+        response = await asyncio.to_thread(_read, key)
+        if response is None:
+            raise GeminiAPIError(
+                f"No cassette for schema={request.schema.__name__} (key {key[:12]})"
+            )
+        return response
@@ -0,0 +1,257 @@
+"""
+Circuit breaker around Gemini calls, one per model.
+
+closed:    calls pass; outcomes are kept over a rolling GEMINI_BREAKER_WINDOW.
+           Once there are GEMINI_BREAKER_MIN_CALLS outcomes and the share
+           of failures (or of calls slower than GEMINI_BREAKER_SLOW_CALL)
+           reaches its threshold, the breaker opens.
+open:      calls fail fast with CircuitOpenError for GEMINI_BREAKER_OPEN_SECONDS.
+half-open: up to GEMINI_BREAKER_HALF_OPEN_CALLS probe calls are let through;
+           all succeeding closes the breaker, any failure reopens it.
+
+Admission and outcomes are separate: ``guard`` wraps the whole call
+(deadline, governor wait, retries) and only decides whether it may start,
+while ``measure`` wraps the provider request itself inside the governor
+lease. Only measured requests count, so waiting for a slot, an exhausted
+time budget or our own 429 backoff never opens the breaker.
+
+With GEMINI_BREAKER_BACKEND=redis, opening also sets a shared key, so
+every process (API and workers) stops calling until it expires. Each
+process then probes on its own. The key is read at most once per
+SHARED_POLL_INTERVAL, not on every call. Redis errors fall back to local
+state.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TypeVar
+
+from app.config import settings
+from app.core.queue import get_redis_pool
+from app.prompts.exceptions import CircuitOpenError
+from app.services.ai.governor import is_rate_limit
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Seconds between reads of the shared open flag
+SHARED_POLL_INTERVAL = 1.0
+
+
+@dataclass
+class _Admission:
+    """One admitted call; set once a provider request has been measured."""
+
+    measured: bool = False
+
+
+# The admission of the call running in this context (copied into hedges)
+_admission: ContextVar[_Admission | None] = ContextVar("breaker_admission", default=None)
+
+
+class CircuitBreaker:
+    """Breaker state of one model in this process."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.state = CLOSED
+        self._opened_until = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        # (timestamp, failed, slow)
+        self._outcomes: deque[tuple[float, bool, bool]] = deque()
+        # Monotonic time the shared flag expires, and when it was last read
+        self._shared_until = 0.0
+        self._shared_checked = float("-inf")
+
+    @property
+    def _redis_key(self) -> str:
+        return f"gemini:breaker:{self.name}:open"
+
+    async def _shared_open_for(self) -> float:
+        """Seconds left on the cluster-wide open flag (0 when not set)."""
+        if settings.GEMINI_BREAKER_BACKEND != "redis":
+            return 0.0
+        now = time.monotonic()
+        if now - self._shared_checked >= SHARED_POLL_INTERVAL:
+            self._shared_checked = now
+            try:
+                redis = await get_redis_pool()
+                ttl_ms = await redis.pttl(self._redis_key)
+                self._shared_until = now + max(ttl_ms, 0) / 1000
+            except Exception as e:
+                logger.warning(f"Circuit breaker state unavailable in Redis: {e}")
+                self._shared_until = 0.0
+        return max(self._shared_until - now, 0.0)
+
+    async def _share_open(self) -> None:
+        if settings.GEMINI_BREAKER_BACKEND != "redis":
+            return
+        try:
+            redis = await get_redis_pool()
+            await redis.set(
+                self._redis_key, "1", px=int(settings.GEMINI_BREAKER_OPEN_SECONDS * 1000)
+            )
+            self._shared_until = time.monotonic() + settings.GEMINI_BREAKER_OPEN_SECONDS
+            self._shared_checked = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Failed to share open circuit for {self.name}: {e}")
+
+    async def _open(self) -> None:
+        self.state = OPEN
+        self._opened_until = time.monotonic() + settings.GEMINI_BREAKER_OPEN_SECONDS
+        self._outcomes.clear()
+        logger.error(
+            f"Circuit for {self.name} opened for {settings.GEMINI_BREAKER_OPEN_SECONDS:g}s"
+        )
+        await self._share_open()
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self._outcomes.clear()
+        logger.info(f"Circuit for {self.name} closed")
+
+    async def before_call(self) -> None:
+        """
+        Admit a call or fail fast.
+
+        Raises:
+            CircuitOpenError: While open, or when half-open probes are taken
+        """
+        shared = await self._shared_open_for()
+        if shared > 0:
+            raise CircuitOpenError(f"Circuit for {self.name} is open", retry_after=shared)
+
+        if self.state == OPEN:
+            left = self._opened_until - time.monotonic()
+            if left > 0:
+                raise CircuitOpenError(f"Circuit for {self.name} is open", retry_after=left)
+            self.state = HALF_OPEN
+            self._probes = 0
+            self._probe_successes = 0
+            logger.info(f"Circuit for {self.name} half-open, probing")
+
+        if self.state == HALF_OPEN:
+            if self._probes >= settings.GEMINI_BREAKER_HALF_OPEN_CALLS:
+                raise CircuitOpenError(
+                    f"Circuit for {self.name} is half-open, probes in flight",
+                    retry_after=settings.GEMINI_BREAKER_OPEN_SECONDS,
+                )
+            self._probes += 1
+
+    async def record(self, failed: bool, seconds: float) -> None:
+        """Feed one call outcome back into the state machine."""
+        slow = seconds >= settings.GEMINI_BREAKER_SLOW_CALL
+
+        if self.state == HALF_OPEN:
+            if failed or slow:
+                await self._open()
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= settings.GEMINI_BREAKER_HALF_OPEN_CALLS:
+                self._close()
+            return
+
+        if self.state == OPEN:
+            # Call admitted before the breaker opened
+            return
+
+        now = time.monotonic()
+        self._outcomes.append((now, failed, slow))
+        while self._outcomes and self._outcomes[0][0] < now - settings.GEMINI_BREAKER_WINDOW:
+            self._outcomes.popleft()
+
+        calls = len(self._outcomes)
+        if calls < settings.GEMINI_BREAKER_MIN_CALLS:
+            return
+        failures = sum(1 for _, f, _ in self._outcomes if f)
+        slow_calls = sum(1 for _, _, s in self._outcomes if s)
+        if (
+            failures / calls >= settings.GEMINI_BREAKER_FAILURE_RATE
+            or slow_calls / calls >= settings.GEMINI_BREAKER_SLOW_RATE
+        ):
+            await self._open()
+
+    def _release_probe(self) -> None:
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+    async def guard(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Admit fn() (the whole call, governor wait included) or fail fast.
+
+        Outcomes are fed back by ``measure`` around the provider request
+        inside fn; if fn ends before any request was measured (budget
+        exhausted, cancelled while waiting for a slot), a half-open probe
+        slot is given back instead.
+
+        Raises:
+            CircuitOpenError: If the breaker does not admit the call
+        """
+        if not settings.GEMINI_BREAKER_ENABLED:
+            return await fn()
+
+        await self.before_call()
+        admission = _Admission()
+        token = _admission.set(admission)
+        try:
+            return await fn()
+        finally:
+            _admission.reset(token)
+            if not admission.measured:
+                self._release_probe()
+
+    async def measure(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run one provider request and record its outcome and latency.
+
+        Rate-limit errors are left to the governor and not recorded. A
+        request cancelled (deadline, losing hedge) counts only if it had
+        already run past GEMINI_BREAKER_SLOW_CALL.
+        """
+        if not settings.GEMINI_BREAKER_ENABLED:
+            return await fn()
+
+        admission = _admission.get()
+        started = time.monotonic()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            elapsed = time.monotonic() - started
+            if elapsed >= settings.GEMINI_BREAKER_SLOW_CALL:
+                self._mark(admission)
+                await self.record(False, elapsed)
+            raise
+        except Exception as e:
+            if not is_rate_limit(e):
+                self._mark(admission)
+                await self.record(True, time.monotonic() - started)
+            raise
+        self._mark(admission)
+        await self.record(False, time.monotonic() - started)
+        return result
+
+    @staticmethod
+    def _mark(admission: _Admission | None) -> None:
+        if admission is not None:
+            admission.measured = True
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(model: str) -> CircuitBreaker:
+    """The process-wide breaker of a model."""
+    breaker = _breakers.get(model)
+    if breaker is None:
+        breaker = _breakers[model] = CircuitBreaker(model)
+    return breaker
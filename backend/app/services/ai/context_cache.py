@@ -0,0 +1,180 @@
+"""
+Shared-prefix (context) caching for the per-section Gemini calls.
+
+All nine section prompts share the same image, context and vision block
+and differ only in the system prompt and instruction. The shared prefix is
+registered once per analysis and each section call references it instead
+of re-sending the image.
+
+Providers:
+    gemini: Gemini cached content; the handle is a server-side resource, so
+            worker section jobs on any node can use it by name
+    local:  in-process stand-in that re-inlines the prefix; same interface,
+            no network, for tests and local runs
+    none:   disabled (default)
+
+Gemini cached content carries its own system instruction, so with a cached
+prefix the section system prompt travels as the first text of the user turn.
+"""
+import asyncio
+import datetime
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+import google.generativeai as genai
+
+from app.config import settings
+from app.services.ai.governor import estimate_input_tokens
+from app.services.ai.model_registry import get_model
+from app.services.ai.response_cache import fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachedPrefix:
+    """Handle of a registered prefix (serializable: just strings)."""
+
+    name: str
+    model: str
+    digest: str  # fingerprint of the prefix contents, for response cache keys
+
+
+class ContextCacheProvider(Protocol):
+    # True when a handle created in one process is usable in another
+    shared: bool
+
+    async def create(self, model: str, contents: list[Any], ttl: int) -> CachedPrefix:
+        ...
+
+    async def release(self, prefix: CachedPrefix) -> None:
+        ...
+
+    def bind(self, prefix: CachedPrefix, contents: list[Any]) -> tuple[Any, list[Any]]:
+        """Return (model, contents) to call generate_content_async with."""
+        ...
+
+
+def _merge(prefix: list[Any], suffix: list[Any]) -> list[Any]:
+    """Join prefix and suffix parts into one user turn."""
+    parts = [p for message in prefix for p in message["parts"]]
+    parts += [p for message in suffix for p in message["parts"]]
+    return [{"role": "user", "parts": parts}]
+
+
+class GeminiContextCacheProvider:
+    """Gemini cached content (google.generativeai.caching)."""
+
+    shared = True
+
+    async def create(self, model: str, contents: list[Any], ttl: int) -> CachedPrefix:
+        cached = await asyncio.to_thread(
+            genai.caching.CachedContent.create,
+            model=model,
+            contents=contents,
+            ttl=datetime.timedelta(seconds=ttl),
+        )
+        return CachedPrefix(
+            name=cached.name,
+            model=model,
+            digest=fingerprint(model, "prefix", None, contents),
+        )
+
+    async def release(self, prefix: CachedPrefix) -> None:
+        await asyncio.to_thread(genai.caching.CachedContent(prefix.name).delete)
+
+    def bind(self, prefix: CachedPrefix, contents: list[Any]) -> tuple[Any, list[Any]]:
+        cached = genai.caching.CachedContent(prefix.name)
+        return genai.GenerativeModel.from_cached_content(cached), contents
+
+
+class LocalContextCacheProvider:
+    """In-process stand-in: keeps the prefix and re-inlines it on each call."""
+
+    shared = False
+
+    def __init__(self) -> None:
+        self._prefixes: dict[str, list[Any]] = {}
+
+    async def create(self, model: str, contents: list[Any], ttl: int) -> CachedPrefix:
+        name = f"local/{uuid.uuid4().hex}"
+        self._prefixes[name] = contents
+        return CachedPrefix(
+            name=name,
+            model=model,
+            digest=fingerprint(model, "prefix", None, contents),
+        )
+
+    async def release(self, prefix: CachedPrefix) -> None:
+        self._prefixes.pop(prefix.name, None)
+
+    def bind(self, prefix: CachedPrefix, contents: list[Any]) -> tuple[Any, list[Any]]:
+        try:
+            shared = self._prefixes[prefix.name]
+        except KeyError:
+            raise LookupError(f"Unknown or released prefix {prefix.name}")
+        return get_model(prefix.model), _merge(shared, contents)
+
+
+_PROVIDERS = {
+    "gemini": GeminiContextCacheProvider,
+    "local": LocalContextCacheProvider,
+}
+
+
+class ContextCache:
+    """Front for the configured provider; failures disable caching per call."""
+
+    def __init__(self) -> None:
+        factory = _PROVIDERS.get(settings.GEMINI_CONTEXT_CACHE.lower())
+        self.provider: ContextCacheProvider | None = factory() if factory else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.provider is not None
+
+    async def register(
+        self, model: str, contents: list[Any], cross_process: bool = False
+    ) -> CachedPrefix | None:
+        """
+        Register a shared prefix; None when disabled, too small or on error.
+
+        Providers enforce a minimum cacheable size, so small prefixes are
+        not worth a round trip and are sent inline as before. The size is
+        estimated from the text length and the image's tile count (see
+        estimate_input_tokens): a normalized upload at IMAGE_MAX_EDGE is
+        four tiles (~1000 tokens) and clears the default minimum together
+        with the context and vision text, while a small image with little
+        text stays inline. With
+        cross_process, only providers whose handles work in other processes
+        (worker section jobs) are used.
+        """
+        if self.provider is None or (cross_process and not self.provider.shared):
+            return None
+        if estimate_input_tokens(contents) < settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS:
+            return None
+        try:
+            prefix = await self.provider.create(model, contents, settings.GEMINI_CONTEXT_CACHE_TTL)
+            logger.info(f"Registered context prefix {prefix.name}")
+            return prefix
+        except Exception as e:
+            logger.warning(f"Context cache registration failed, sending inline: {e}")
+            return None
+
+    async def release(self, prefix: CachedPrefix | None) -> None:
+        if prefix is None or self.provider is None:
+            return
+        try:
+            await self.provider.release(prefix)
+            logger.info(f"Released context prefix {prefix.name}")
+        except Exception as e:
+            # Expires on its own after GEMINI_CONTEXT_CACHE_TTL
+            logger.warning(f"Context cache release failed for {prefix.name}: {e}")
+
+    def bind(self, prefix: CachedPrefix, contents: list[Any]) -> tuple[Any, list[Any]]:
+        return self.provider.bind(prefix, contents)
+
+
+context_cache = ContextCache()
@@ -0,0 +1,132 @@
+"""
+Per-call deadlines, the analysis time budget, and hedged requests.
+
+Every Gemini call runs under a deadline: its own timeout (per section, see
+GEMINI_SECTION_TIMEOUTS_STR) capped by what is left of the analysis budget.
+The budget is an absolute wall-clock time held in a context variable, so
+it reaches every call made inside ``analysis_deadline`` (including tasks
+spawned there) and can be handed to worker jobs as a plain float.
+
+With GEMINI_HEDGE_ENABLED, a call still running after the p95 latency of
+its kind gets a duplicate request; the first response wins and the other
+is cancelled. Latencies are tracked per process over a rolling window.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.config import settings
+from app.prompts.exceptions import GeminiTimeoutError
+from app.services.ai.usage import note_hedge
+
+logger = logging.getLogger(__name__)
+
+# Epoch seconds by which the current analysis must be done
+_deadline: ContextVar[float | None] = ContextVar("analysis_deadline", default=None)
+
+
+@contextmanager
+def analysis_deadline(deadline: float | None) -> Iterator[None]:
+    """Run the block under an absolute deadline (the earlier one wins)."""
+    current = _deadline.get()
+    if deadline is not None and current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline if deadline is not None else current)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def new_deadline() -> float:
+    """Absolute deadline for an analysis starting now."""
+    return time.time() + settings.ANALYSIS_TIME_BUDGET
+
+
+def remaining() -> float | None:
+    """Seconds left in the current analysis budget (None if unbounded)."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.time()
+
+
+def call_timeout(kind: str) -> float:
+    """Timeout for one call of this kind (a section name, "vision", "combined")."""
+    return settings.GEMINI_SECTION_TIMEOUTS.get(kind, settings.GEMINI_CALL_TIMEOUT)
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per call kind."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, kind: str, seconds: float) -> None:
+        self._samples[kind].append(seconds)
+
+    def p95(self, kind: str) -> float | None:
+        samples = self._samples.get(kind)
+        if not samples or len(samples) < settings.GEMINI_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+latency = LatencyTracker()
+
+
+async def hedged[T](fn: Callable[[], Awaitable[T]], delay: float | None) -> T:
+    """
+    Await fn(); if it has not finished after delay seconds, start a second
+    fn() and return whichever succeeds first, cancelling the other.
+    """
+    tasks = {asyncio.ensure_future(fn())}
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                logger.info(f"Hedging Gemini call after {delay:.1f}s")
+                note_hedge()
+                tasks.add(asyncio.ensure_future(fn()))
+
+        error: BaseException | None = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_call[T](kind: str, fn: Callable[[], Awaitable[T]]) -> T:
+    """
+    Run one Gemini call of this kind under its deadline, hedged if enabled.
+
+    Raises:
+        GeminiTimeoutError: If the call or the analysis budget runs out
+    """
+    timeout = call_timeout(kind)
+    left = remaining()
+    if left is not None:
+        if left <= 0:
+            raise GeminiTimeoutError(f"Analysis time budget exhausted before {kind} call")
+        timeout = min(timeout, left)
+
+    delay = latency.p95(kind) if settings.GEMINI_HEDGE_ENABLED else None
+    started = time.monotonic()
+    try:
+        async with asyncio.timeout(timeout):
+            result = await hedged(fn, delay)
+    except TimeoutError:
+        raise GeminiTimeoutError(f"Gemini {kind} call exceeded its {timeout:g}s deadline")
+
+    latency.record(kind, time.monotonic() - started)
+    return result
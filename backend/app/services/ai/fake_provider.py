@@ -0,0 +1,98 @@
+"""
+Deterministic in-process LLM provider for load tests and offline runs.
+
+Responses are schema-valid JSON built from the request's pydantic model;
+their content is seeded by the request fingerprint, so the same prompt
+always gets the same answer. Latency is log-normal around
+LLM_FAKE_LATENCY_MEDIAN, and errors and 429s are injected at the
+configured rates as the google.api_core exceptions Gemini raises, so the
+governor, retries and circuit breaker react as they would in production.
+Latency and fault injection draw from one generator seeded with
+LLM_FAKE_SEED, so a run is reproducible.
+"""
+import asyncio
+import json
+import random
+import types
+import typing
+from enum import Enum
+from typing import Any
+
+from google.api_core import exceptions as google_exceptions
+from pydantic import BaseModel
+
+from app.config import settings
+from app.services.ai.governor import CHARS_PER_TOKEN, estimate_input_tokens
+from app.services.ai.llm_provider import LLMRequest, LLMResponse
+from app.services.ai.response_cache import fingerprint
+
+_WORDS = (
+    "artisan", "fresh", "local", "premium", "crafted", "natural", "bold",
+    "warm", "classic", "vibrant", "smooth", "golden", "organic", "rich",
+)
+
+
+def _fake_value(annotation: Any, name: str, rng: random.Random) -> Any:
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+
+    if origin in (typing.Union, types.UnionType):
+        options = [a for a in args if a is not type(None)]
+        return _fake_value(options[0], name, rng) if options else None
+    if origin is typing.Literal:
+        return rng.choice(args)
+    if origin in (list, set, tuple):
+        return [_fake_value(args[0] if args else str, name, rng) for _ in range(rng.randint(2, 4))]
+    if origin is dict or annotation is dict:
+        from app.services.sections import SECTIONS_BY_NAME
+
+        # Combined responses carry each section under its name
+        section = SECTIONS_BY_NAME.get(name)
+        return fake_instance(section.schema, rng) if section else {}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return fake_instance(annotation, rng)
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return rng.choice(list(annotation)).value
+    if annotation is bool:
+        return rng.random() < 0.5
+    if annotation is int:
+        return rng.randint(1, 100)
+    if annotation is float:
+        return round(rng.uniform(1_000, 100_000), 2)
+    if annotation is Any:
+        return {}
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 12)))
+
+
+def fake_instance(schema: type[BaseModel], rng: random.Random) -> dict[str, Any]:
+    """A dict that validates against schema, filling every field."""
+    return {
+        name: _fake_value(field.annotation, name, rng)
+        for name, field in schema.model_fields.items()
+    }
+
+
+class FakeProvider:
+    def __init__(self) -> None:
+        self._rng = random.Random(settings.LLM_FAKE_SEED)
+
+    async def generate(self, request: LLMRequest) -> LLMResponse:
+        latency = self._rng.lognormvariate(0, settings.LLM_FAKE_LATENCY_SIGMA)
+        roll = self._rng.random()
+        await asyncio.sleep(settings.LLM_FAKE_LATENCY_MEDIAN * latency)
+
+        if roll < settings.LLM_FAKE_RATE_LIMIT_RATE:
+            raise google_exceptions.ResourceExhausted("Injected 429 (fake provider)")
+        if roll < settings.LLM_FAKE_RATE_LIMIT_RATE + settings.LLM_FAKE_ERROR_RATE:
+            raise google_exceptions.InternalServerError("Injected error (fake provider)")
+
+        key = fingerprint(
+            request.model, request.schema.__name__, request.system_instruction, request.contents
+        )
+        content_rng = random.Random(key)
+        text = json.dumps(fake_instance(request.schema, content_rng))
+        return LLMResponse(
+            text=text,
+            prompt_tokens=estimate_input_tokens(request.contents, request.system_instruction),
+            candidate_tokens=len(text) // CHARS_PER_TOKEN,
+        )
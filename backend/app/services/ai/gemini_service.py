@@ -1,9 +1,18 @@
 import logging
 
 import google.generativeai as genai
+from pydantic import ValidationError
 
 from app.config import settings
-from app.prompts.exceptions import GeminiAPIError
+from app.prompts.exceptions import GeminiAPIError, GeminiError
+from app.services.ai.circuit_breaker import breaker_for
+from app.services.ai.context_cache import CachedPrefix
+from app.services.ai.deadlines import run_call
+from app.services.ai.governor import governor
+from app.services.ai.llm_provider import LLMRequest, get_provider
+from app.services.ai.response_cache import fingerprint, response_cache
+from app.services.ai.response_schemas import max_output_tokens
+from app.services.ai.usage import track_call
 
 logger = logging.getLogger(__name__)
 
@@ -12,79 +21,122 @@ genai.configure(api_key=settings.GOOGLE_API_KEY)
 
 class GeminiService:
     @staticmethod
-    async def generate(prompt: list, schema):
+    async def generate(
+        prompt: list,
+        schema,
+        system_instruction: str | None = None,
+        cached_prefix: CachedPrefix | None = None,
+        kind: str | None = None,
+    ):
         """
         Generate content using Gemini API.
 
         Args:
-            prompt: A list containing message dicts in format:
+            prompt: Message contents. Without system_instruction, the first text
+                   part of the first message is taken as the system prompt:
                    [{"role": "user", "parts": [{"text": "system prompt"}, image_data, {"text": "user text"}]}]
             schema: Pydantic model for response validation
+            system_instruction: System prompt, when prompt comes from
+                   PromptBuilder.build_contents()
+            cached_prefix: Registered shared prefix (image, context, vision);
+                   prompt is then only the section suffix from
+                   PromptBuilder.build_suffix()
+            kind: Call kind for deadlines and latency tracking (section name);
+                   defaults to the schema name
         """
-        # Extract system instruction from the first text part
-        system_instruction = None
-        contents = []
-
-        try:
-            if prompt and len(prompt) > 0:
-                first_message = prompt[0]
-                if isinstance(first_message, dict) and "parts" in first_message:
-                    parts = first_message["parts"]
-                    # First text part is the system instruction
-                    if parts and isinstance(parts[0], dict) and "text" in parts[0]:
-                        system_instruction = parts[0]["text"]
-                        # Remove system instruction from parts for contents
-                        remaining_parts = parts[1:] if len(parts) > 1 else []
-                        contents = [{"role": "user", "parts": remaining_parts}]
-                    else:
-                        contents = prompt
-                else:
-                    contents = prompt
-
-            logger.debug(
-                f"Creating Gemini model with model={settings.GEMINI_LLM_MODEL}"
-            )
-
-            model = genai.GenerativeModel(
-                settings.GEMINI_LLM_MODEL,
-                system_instruction=system_instruction,
-            )
-
-            logger.debug(f"Calling Gemini API for schema={schema.__name__}")
-
-            # Don't pass response_schema to avoid issues with default values
-            # Instead, just request JSON and validate with Pydantic afterwards
-            response = await model.generate_content_async(
-                contents=contents,
-                generation_config=genai.GenerationConfig(
-                    response_mime_type="application/json",
-                ),
-            )
-
-            if not response.text:
+        contents = prompt
+        kind = kind or schema.__name__
+
+        # Tokens, wall time and retries of the call, by kind/model/user
+        async with track_call(kind, settings.GEMINI_LLM_MODEL) as usage:
+            try:
+                if system_instruction is None and cached_prefix is None and prompt:
+                    # Legacy format: extract system instruction from the first text part
+                    first_message = prompt[0]
+                    if isinstance(first_message, dict) and "parts" in first_message:
+                        parts = first_message["parts"]
+                        if parts and isinstance(parts[0], dict) and "text" in parts[0]:
+                            system_instruction = parts[0]["text"]
+                            contents = [{"role": "user", "parts": parts[1:]}]
+
+                # Identical prompts (retries, re-runs, repeat uploads) cost no call
+                cache_key = None
+                if response_cache.enabled:
+                    keyed = contents
+                    if cached_prefix is not None:
+                        keyed = [{"parts": [{"text": f"prefix:{cached_prefix.digest}"}]}, *contents]
+                    cache_key = fingerprint(
+                        settings.GEMINI_LLM_MODEL, schema.__name__, system_instruction, keyed
+                    )
+                    cached = await response_cache.get(cache_key)
+                    if cached is not None:
+                        try:
+                            result = schema.model_validate_json(cached)
+                            logger.debug(f"LLM cache hit for schema={schema.__name__}")
+                            usage.status = "cached"
+                            return result
+                        except ValidationError:
+                            logger.warning(f"Discarding invalid cached response for schema={schema.__name__}")
+
+                request = LLMRequest(
+                    model=settings.GEMINI_LLM_MODEL,
+                    contents=contents,
+                    schema=schema,
+                    system_instruction=system_instruction,
+                    cached_prefix=cached_prefix,
+                    max_output_tokens=max_output_tokens(kind),
+                )
+                provider = get_provider()
+
+                logger.debug(f"Calling Gemini API for schema={schema.__name__}")
+
+                # Output is constrained to the schema's precomputed response_schema
+                # and capped per kind; still validated with Pydantic afterwards.
+                # Acquire a cluster-wide slot; 429s are backed off and retried.
+                # The whole call runs under its deadline and may be hedged; an
+                # open circuit fails fast with CircuitOpenError. Only the request
+                # itself (inside the slot) counts towards the breaker
+                breaker = breaker_for(settings.GEMINI_LLM_MODEL)
+                response = await breaker.guard(
+                    lambda: run_call(
+                        kind,
+                        lambda: governor.call(
+                            settings.GEMINI_LLM_MODEL,
+                            contents,
+                            lambda: breaker.measure(lambda: provider.generate(request)),
+                            system_instruction=system_instruction,
+                        ),
+                    )
+                )
+
+                usage.add_response(response)
+                if not response.text:
+                    logger.error(
+                        f"Empty response from Gemini API for schema={schema.__name__}"
+                    )
+                    raise GeminiAPIError("Empty response from Gemini API")
+
+                logger.debug(
+                    f"Gemini API response received, length={len(response.text)} chars"
+                )
+
+                # Validate response with Pydantic schema
+                result = schema.model_validate_json(response.text)
+                logger.debug(
+                    f"Successfully validated response for schema={schema.__name__}"
+                )
+
+                if cache_key is not None:
+                    await response_cache.set(cache_key, response.text)
+
+                return result
+
+            except GeminiError:
+                raise
+            except Exception as e:
                 logger.error(
-                    f"Empty response from Gemini API for schema={schema.__name__}"
+                    f"LLM generation failed for schema={schema.__name__ if schema else 'unknown'}: {type(e).__name__}: {str(e)}"
+                )
+                raise GeminiAPIError(
+                    f"LLM generation failed: {type(e).__name__}: {str(e)}", original_error=e
                 )
-                raise GeminiAPIError("Empty response from Gemini API")
-
-            logger.debug(
-                f"Gemini API response received, length={len(response.text)} chars"
-            )
-
-            # Validate response with Pydantic schema
-            result = schema.model_validate_json(response.text)
-            logger.debug(
-                f"Successfully validated response for schema={schema.__name__}"
-            )
-
-            return result
-
-        except GeminiAPIError:
-            raise
-        except Exception as e:
-            logger.error(
-                f"LLM generation failed for schema={schema.__name__ if schema else 'unknown'}: {type(e).__name__}: {str(e)}"
-            )
-            raise GeminiAPIError(
-                f"LLM generation failed: {type(e).__name__}: {str(e)}", original_error=e
-            )
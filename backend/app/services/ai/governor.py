@@ -0,0 +1,299 @@
+"""
+Cluster-wide Gemini rate and concurrency governor backed by Redis.
+
+Every Gemini call (vision and sections, from the API process and every
+worker) acquires a slot first. A slot needs one request and the estimated
+tokens from per-model token buckets (RPM / TPM) plus a free lease in a
+per-model concurrency set; all three are checked and taken atomically in a
+single Lua script, so the budget holds across processes.
+
+A 429 from Gemini drains the model's request bucket for everyone and the
+call is retried with jittered exponential backoff. If Redis is unreachable
+the governor fails open for a short cooldown rather than blocking calls.
+"""
+import asyncio
+import io
+import logging
+import math
+import random
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from google.api_core import exceptions as google_exceptions
+from PIL import Image
+
+from app.config import settings
+from app.core.queue import get_redis_pool
+from app.prompts.exceptions import GeminiRateLimitError
+from app.services.ai.usage import note_retry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Rough token costs used to debit the TPM bucket before the call
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 258
+
+# Gemini bills an image with both sides up to IMAGE_SMALL_EDGE px as one
+# IMAGE_TOKENS unit, and a larger one as IMAGE_TOKENS per IMAGE_TILE_EDGE tile
+IMAGE_SMALL_EDGE = 384
+IMAGE_TILE_EDGE = 768
+
+# Skip the governor for this long after Redis errors
+FAIL_OPEN_COOLDOWN = 30.0
+
+# Poll interval while all concurrency leases are taken (ms)
+_CONCURRENCY_POLL_MS = 100
+
+_ACQUIRE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local max_conc = tonumber(ARGV[3])
+local cost = math.min(tonumber(ARGV[4]), tpm)
+local lease_ttl = tonumber(ARGV[6])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if redis.call('ZCARD', KEYS[2]) >= max_conc then
+  return tonumber(ARGV[7])
+end
+
+local b = redis.call('HMGET', KEYS[1], 'req', 'tok', 'ts')
+local req = tonumber(b[1]) or rpm
+local tok = tonumber(b[2]) or tpm
+local ts = tonumber(b[3]) or now
+local elapsed = math.max(0, now - ts) / 60000
+req = math.min(rpm, req + elapsed * rpm)
+tok = math.min(tpm, tok + elapsed * tpm)
+
+local wait = 0
+if req < 1 then wait = math.max(wait, (1 - req) / rpm * 60000) end
+if tok < cost then wait = math.max(wait, (cost - tok) / tpm * 60000) end
+
+if wait == 0 then
+  req = req - 1
+  tok = tok - cost
+  redis.call('ZADD', KEYS[2], now + lease_ttl, ARGV[5])
+  redis.call('PEXPIRE', KEYS[2], lease_ttl)
+end
+redis.call('HSET', KEYS[1], 'req', tostring(req), 'tok', tostring(tok), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], 120000)
+return math.ceil(wait)
+"""
+
+_PENALIZE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('HSET', KEYS[1], 'req', '0', 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], 120000)
+return 0
+"""
+
+
+@dataclass(frozen=True)
+class ModelLimits:
+    """Budget of one Gemini model, shared by the whole cluster."""
+
+    rpm: int
+    tpm: int
+    concurrency: int
+
+
+def limits_for(model: str) -> ModelLimits:
+    """Per-model limits from GEMINI_MODEL_LIMITS_STR, else the defaults."""
+    override = settings.GEMINI_MODEL_LIMITS.get(model)
+    if override:
+        return ModelLimits(*override)
+    return ModelLimits(
+        settings.GEMINI_RPM, settings.GEMINI_TPM, settings.GEMINI_MAX_CONCURRENCY
+    )
+
+
+def _inline_bytes(part: Any) -> bytes | None:
+    """Image bytes of a protobuf Part or an inline-data dict, if present."""
+    if isinstance(part, dict):
+        data = part.get("inline_data", part).get("data")
+    else:
+        data = getattr(getattr(part, "inline_data", None), "data", None)
+    return data if isinstance(data, bytes) and data else None
+
+
+def image_tokens(part: Any) -> int:
+    """Estimate the tokens of one image part from its pixel size (header only)."""
+    data = _inline_bytes(part)
+    if data is None:
+        return IMAGE_TOKENS
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+    except Exception:
+        return IMAGE_TOKENS
+
+    if max(width, height) <= IMAGE_SMALL_EDGE:
+        return IMAGE_TOKENS
+    tiles = math.ceil(width / IMAGE_TILE_EDGE) * math.ceil(height / IMAGE_TILE_EDGE)
+    return IMAGE_TOKENS * tiles
+
+
+def estimate_input_tokens(contents: Any, system_instruction: str | None = None) -> int:
+    """Estimate the input tokens of a prompt built by PromptBuilder."""
+    tokens = len(system_instruction) // CHARS_PER_TOKEN if system_instruction else 0
+    for message in contents or []:
+        for part in message.get("parts", []) if isinstance(message, dict) else []:
+            if isinstance(part, dict) and "text" in part:
+                tokens += len(part["text"]) // CHARS_PER_TOKEN
+            else:
+                tokens += image_tokens(part)
+    return tokens
+
+
+def estimate_tokens(contents: Any, system_instruction: str | None = None) -> int:
+    """Estimate input + output tokens of a prompt built by PromptBuilder."""
+    return estimate_input_tokens(contents, system_instruction) + settings.GEMINI_OUTPUT_TOKEN_ESTIMATE
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    return isinstance(error, (google_exceptions.ResourceExhausted, GeminiRateLimitError))
+
+
+class GeminiGovernor:
+    """Acquire/release cluster-wide Gemini slots around each call."""
+
+    def __init__(self) -> None:
+        self._disabled_until = 0.0
+        self._acquire_script = None
+        self._penalize_script = None
+
+    async def _redis(self):
+        if time.monotonic() < self._disabled_until:
+            return None
+        try:
+            redis = await get_redis_pool()
+            if self._acquire_script is None:
+                self._acquire_script = redis.register_script(_ACQUIRE_LUA)
+                self._penalize_script = redis.register_script(_PENALIZE_LUA)
+            return redis
+        except Exception as e:
+            self._fail_open(e)
+            return None
+
+    def _fail_open(self, error: Exception) -> None:
+        logger.warning(
+            f"Gemini governor unavailable, failing open for {FAIL_OPEN_COOLDOWN:.0f}s: {error}"
+        )
+        self._disabled_until = time.monotonic() + FAIL_OPEN_COOLDOWN
+
+    @staticmethod
+    def _keys(model: str) -> list[str]:
+        return [f"gemini:governor:{model}:bucket", f"gemini:governor:{model}:leases"]
+
+    async def acquire(self, model: str, tokens: int) -> str | None:
+        """
+        Block until a slot is available and return its lease id.
+
+        Returns None when the governor is disabled or failing open.
+
+        Raises:
+            GeminiRateLimitError: If no slot frees up within GEMINI_GOVERNOR_MAX_WAIT
+        """
+        if not settings.GEMINI_GOVERNOR_ENABLED or await self._redis() is None:
+            return None
+
+        limits = limits_for(model)
+        lease = uuid.uuid4().hex
+        deadline = time.monotonic() + settings.GEMINI_GOVERNOR_MAX_WAIT
+
+        while True:
+            try:
+                wait_ms = await self._acquire_script(
+                    keys=self._keys(model),
+                    args=[
+                        limits.rpm,
+                        limits.tpm,
+                        limits.concurrency,
+                        tokens,
+                        lease,
+                        settings.GEMINI_LEASE_TTL * 1000,
+                        _CONCURRENCY_POLL_MS,
+                    ],
+                )
+            except Exception as e:
+                self._fail_open(e)
+                return None
+
+            if not wait_ms:
+                return lease
+
+            delay = int(wait_ms) / 1000 * random.uniform(1.0, 1.25)
+            if time.monotonic() + delay > deadline:
+                raise GeminiRateLimitError(
+                    f"Gemini budget for {model} exhausted (waited {settings.GEMINI_GOVERNOR_MAX_WAIT}s)"
+                )
+            await asyncio.sleep(delay)
+
+    async def release(self, model: str, lease: str | None) -> None:
+        if lease is None:
+            return
+        try:
+            redis = await get_redis_pool()
+            await redis.zrem(self._keys(model)[1], lease)
+        except Exception as e:
+            # The lease expires on its own after GEMINI_LEASE_TTL
+            logger.warning(f"Failed to release Gemini lease for {model}: {e}")
+
+    async def penalize(self, model: str) -> None:
+        """Drain the model's request bucket after a 429 so every process backs off."""
+        if await self._redis() is None:
+            return
+        try:
+            await self._penalize_script(keys=self._keys(model)[:1])
+        except Exception as e:
+            self._fail_open(e)
+
+    async def call(
+        self,
+        model: str,
+        contents: Any,
+        fn: Callable[[], Awaitable[T]],
+        system_instruction: str | None = None,
+    ) -> T:
+        """
+        Run one Gemini request under the governor.
+
+        Rate-limit errors are fed back into the bucket and retried with
+        jittered exponential backoff, up to GEMINI_RATE_LIMIT_RETRIES times.
+
+        Raises:
+            GeminiRateLimitError: If the call is still rate limited after all retries
+        """
+        tokens = estimate_tokens(contents, system_instruction)
+
+        for attempt in range(settings.GEMINI_RATE_LIMIT_RETRIES + 1):
+            lease = await self.acquire(model, tokens)
+            try:
+                return await fn()
+            except Exception as e:
+                if not is_rate_limit(e):
+                    raise
+                error = e
+            finally:
+                await self.release(model, lease)
+
+            await self.penalize(model)
+            if attempt == settings.GEMINI_RATE_LIMIT_RETRIES:
+                break
+
+            delay = settings.GEMINI_BACKOFF_BASE * (2 ** attempt) * random.uniform(0.5, 1.5)
+            logger.warning(f"Gemini 429 for {model}, retry {attempt + 1} in {delay:.1f}s")
+            note_retry()
+            await asyncio.sleep(delay)
+
+        raise GeminiRateLimitError(f"Rate limit exceeded for {model}", error)
+
+
+governor = GeminiGovernor()
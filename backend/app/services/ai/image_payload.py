@@ -0,0 +1,49 @@
+"""
+Encode-once image payload shared by every Gemini call of an analysis.
+
+The vision call and the nine section calls all send the same image. An
+ImagePayload is built once per analysis and holds the raw bytes, their
+digest, a lazily computed base64 form and a ready-made protobuf Part, so
+the SDK never has to convert or copy the image from a dict again.
+"""
+import base64
+import hashlib
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+
+import google.generativeai as genai
+
+from app.utils.image import mime_type_for
+
+
+@dataclass(frozen=True)
+class ImagePayload:
+    """Immutable, pre-encoded image sent to Gemini."""
+
+    data: bytes
+    mime_type: str
+    sha256: str
+
+    @classmethod
+    def from_bytes(cls, data: bytes, mime_type: str) -> "ImagePayload":
+        return cls(data=data, mime_type=mime_type, sha256=hashlib.sha256(data).hexdigest())
+
+    @cached_property
+    def b64(self) -> str:
+        """Base64 form (REST transports / debugging)."""
+        return base64.b64encode(self.data).decode("ascii")
+
+    @cached_property
+    def part(self) -> genai.protos.Part:
+        """Gemini content part; built once and reused by every prompt."""
+        return genai.protos.Part(
+            inline_data=genai.protos.Blob(mime_type=self.mime_type, data=self.data)
+        )
+
+
+def load_image_payload(path: Path) -> ImagePayload:
+    """Read a stored upload into an ImagePayload (blocking; use a thread)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return ImagePayload.from_bytes(data, mime_type_for(path.name))
@@ -0,0 +1,106 @@
+"""
+LLM provider interface, selected with LLM_PROVIDER.
+
+GeminiService and VisionService build an LLMRequest and hand it to the
+configured provider; governor, deadlines, breaker and response cache sit
+around the provider call, so they behave the same for every provider.
+
+Providers:
+    gemini: google.generativeai (default)
+    fake:   in-process, no network; schema-valid JSON with configurable
+            latency, errors and 429s (see fake_provider)
+    replay: answers from cassette files recorded earlier (see cassettes)
+
+With LLM_RECORD_CASSETTES the configured provider's responses are also
+written to LLM_CASSETTE_DIR for later replay.
+"""
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from app.config import settings
+from app.services.ai.context_cache import CachedPrefix, context_cache
+from app.services.ai.model_registry import get_model
+from app.services.ai.response_schemas import generation_config
+
+
+@dataclass(frozen=True)
+class LLMRequest:
+    """One JSON generation call."""
+
+    model: str
+    contents: list[Any]
+    schema: type
+    system_instruction: str | None = None
+    cached_prefix: CachedPrefix | None = None
+    max_output_tokens: int | None = None
+
+
+@dataclass(frozen=True)
+class LLMResponse:
+    text: str
+    # Token usage reported by the provider (estimated by the fake)
+    prompt_tokens: int = 0
+    candidate_tokens: int = 0
+    cached_tokens: int = 0
+
+
+class LLMProvider(Protocol):
+    async def generate(self, request: LLMRequest) -> LLMResponse:
+        ...
+
+
+class GeminiProvider:
+    """Gemini through google.generativeai."""
+
+    async def generate(self, request: LLMRequest) -> LLMResponse:
+        if request.cached_prefix is not None:
+            # The shared prefix is referenced, not re-sent
+            model, contents = context_cache.bind(request.cached_prefix, request.contents)
+        else:
+            # Cached per (model, system instruction); built at worker startup
+            model = get_model(request.model, request.system_instruction)
+            contents = request.contents
+
+        response = await model.generate_content_async(
+            contents=contents,
+            # Schema-constrained JSON, capped; validated with pydantic afterwards
+            generation_config=generation_config(request.schema, request.max_output_tokens),
+        )
+        usage = response.usage_metadata
+        return LLMResponse(
+            text=response.text,
+            prompt_tokens=usage.prompt_token_count or 0,
+            candidate_tokens=usage.candidates_token_count or 0,
+            cached_tokens=usage.cached_content_token_count or 0,
+        )
+
+
+def _build_provider() -> LLMProvider:
+    name = settings.LLM_PROVIDER.lower()
+    if name == "fake":
+        from app.services.ai.fake_provider import FakeProvider
+
+        provider = FakeProvider()
+    elif name == "replay":
+        from app.services.ai.cassettes import ReplayProvider
+
+        provider = ReplayProvider()
+    else:
+        provider = GeminiProvider()
+
+    if settings.LLM_RECORD_CASSETTES and name != "replay":
+        from app.services.ai.cassettes import RecordingProvider
+
+        provider = RecordingProvider(provider)
+    return provider
+
+
+_provider: LLMProvider | None = None
+
+
+def get_provider() -> LLMProvider:
+    """The process-wide provider, built on first use."""
+    global _provider
+    if _provider is None:
+        _provider = _build_provider()
+    return _provider
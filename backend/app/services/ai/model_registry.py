@@ -0,0 +1,43 @@
+"""
+Registry of reusable GenerativeModel instances.
+
+A GenerativeModel is immutable once built, so one instance per
+(model name, system instruction) serves every call. The worker pre-builds
+the vision model and the nine section models at startup; anything else is
+built on first use and cached.
+"""
+import logging
+
+import google.generativeai as genai
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_models: dict[tuple[str, str | None], genai.GenerativeModel] = {}
+
+
+def get_model(model_name: str, system_instruction: str | None = None) -> genai.GenerativeModel:
+    """Return the cached model for this name and system instruction."""
+    key = (model_name, system_instruction)
+    model = _models.get(key)
+    if model is None:
+        logger.debug(f"Building GenerativeModel model={model_name}")
+        model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+        _models[key] = model
+    return model
+
+
+def warm_up() -> int:
+    """Build the vision model and every section model ahead of the first job."""
+    from app.prompts import VISION_SYSTEM_PROMPT
+    from app.services.sections import SECTIONS
+
+    genai.configure(api_key=settings.GOOGLE_API_KEY)
+
+    get_model(settings.GEMINI_VISION_MODEL, VISION_SYSTEM_PROMPT)
+    for section in SECTIONS:
+        get_model(settings.GEMINI_LLM_MODEL, section.prompt([]).system_prompt)
+
+    logger.info(f"Pre-built {len(_models)} Gemini model(s)")
+    return len(_models)
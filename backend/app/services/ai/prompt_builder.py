@@ -1,8 +1,12 @@
+import functools
+import json
 from typing import Any, Optional
 
+from app.config import settings
 from app.prompts import (
     ACTION_PLAN_SYSTEM_PROMPT,
     BRAND_THEME_SYSTEM_PROMPT,
+    COMBINED_SYSTEM_PROMPT,
     MARKETPLACE_SYSTEM_PROMPT,
     PACKAGING_SYSTEM_PROMPT,
     PERSONA_SYSTEM_PROMPT,
@@ -12,6 +16,78 @@ from app.prompts import (
     TASTE_SYSTEM_PROMPT,
     VISION_SYSTEM_PROMPT,
 )
+from app.services.ai.image_payload import ImagePayload
+
+# Appended where the context was cut to fit the prompt budget
+TRIM_MARKER = " …"
+
+
+def _drop_nulls(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _drop_nulls(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_drop_nulls(v) for v in value if v is not None]
+    return value
+
+
+def render_json(value: dict[str, Any] | str | None) -> str | None:
+    """Compact canonical JSON: sorted keys, no whitespace, null fields dropped."""
+    if value is None or isinstance(value, str):
+        return value or None
+    cleaned = _drop_nulls(value)
+    if not cleaned:
+        return None
+    return json.dumps(cleaned, ensure_ascii=False, separators=(",", ":"), sort_keys=True, default=str)
+
+
+def render_vision(vision: dict[str, Any] | str | None) -> str | None:
+    """
+    Vision result as compact canonical JSON. Render once per analysis and
+    pass the string to the builders, so every section prompt carries
+    identical text.
+    """
+    return render_json(vision)
+
+
+def fit_context(context: str, limit: int) -> str | None:
+    """Cut context to at most limit characters, at a word boundary."""
+    if len(context) <= limit:
+        return context
+    limit -= len(TRIM_MARKER)
+    if limit <= 0:
+        return None
+    cut = context[:limit]
+    if " " in cut and not context[limit].isspace():
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip() + TRIM_MARKER
+
+
+@functools.lru_cache(maxsize=256)
+def _shared_text(context: str | None, vision: str | None, budget: int) -> str:
+    """
+    Context and vision block shared by every section prompt of an analysis.
+
+    Vision is kept whole; context gets whatever is left of the budget
+    (characters, 0 = unlimited) and is trimmed from the end.
+    """
+    vision_block = f"Vision analysis:\n{vision}" if vision else ""
+    if context and budget > 0:
+        label = len("Additional context: \n\n") + len(vision_block)
+        context = fit_context(context, budget - label)
+
+    blocks = []
+    if context:
+        blocks.append(f"Additional context: {context}")
+    if vision_block:
+        blocks.append(vision_block)
+    return "\n\n".join(blocks)
+
+
+@functools.lru_cache(maxsize=64)
+def _suffix_text(system_prompt: str | None, instruction: str | None) -> str:
+    """Section-specific text: the same for every analysis, so built once."""
+    blocks = [t.strip() for t in (system_prompt, instruction) if t]
+    return "\n\n".join(blocks)
 
 
 class PromptBuilder:
@@ -33,8 +109,12 @@ class PromptBuilder:
         self.system_prompt: str | None = None
         self.images: list[Any] = []
         self.context: str | None = None
-        self.vision: dict[str, Any] | None = None
+        self.vision: str | None = None
         self.extra_instruction: str | None = None
+        # Stored output of the sections this one builds on (section-specific)
+        self.upstream: str | None = None
+        # Characters for context + vision; context is trimmed to fit
+        self.budget: int = settings.PROMPT_TEXT_BUDGET
 
     def system(self, prompt: str):
         self.system_prompt = prompt
@@ -49,48 +129,74 @@ class PromptBuilder:
             self.context = context
         return self
 
-    def with_vision(self, vision: Optional[dict[str, Any]]):
-        if vision:
-            self.vision = vision
+    def with_vision(self, vision: Optional[dict[str, Any] | str]):
+        """Vision result as a dict, or already rendered with render_vision()."""
+        self.vision = render_vision(vision)
+        return self
+
+    def with_upstream(self, results: Optional[dict[str, Any]]):
+        """Outputs of other sections, by section name."""
+        self.upstream = render_json(results)
+        return self
+
+    def _upstream_text(self) -> str | None:
+        if not self.upstream:
+            return None
+        return f"Results of related sections (build on these, stay consistent):\n{self.upstream}"
+
+    def with_budget(self, chars: int):
+        self.budget = chars
         return self
 
     def with_instruction(self, instruction: str):
         self.extra_instruction = instruction
         return self
 
-    def build(self) -> list[Any]:
-        if not self.system_prompt:
-            raise ValueError("system_prompt must be set before building the prompt.")
-
-        # Parts list
+    def build_contents(self) -> list[Any]:
+        """Build the user message only; the system prompt goes to the model."""
         parts = []
 
-        # System instruction
-        parts.append({"text": self.system_prompt})
-
-        # Images (inline_data dict)
+        # Images: ImagePayload parts are pre-encoded and shared by every prompt
         for img in self.images:
-            # img is already {"inline_data": {...}}
-            parts.append(img)
-
-        # User text
-        user_text = ""
+            parts.append(img.part if isinstance(img, ImagePayload) else img)
 
-        if self.extra_instruction:
-            user_text += self.extra_instruction + "\n\n"
+        # User text: instruction, related sections, then the shared context/vision block
+        blocks = [
+            self.extra_instruction,
+            self._upstream_text(),
+            _shared_text(self.context, self.vision, self.budget),
+        ]
+        parts.append({"text": "\n\n".join(b.strip() for b in blocks if b)})
 
-        if self.context:
-            user_text += f"Additional context: {self.context}\n\n"
+        return [{"role": "user", "parts": parts}]
 
-        if self.vision:
-            user_text += "Vision analysis:\n"
-            user_text += f"{self.vision}\n\n"
+    def build_prefix(self) -> list[Any]:
+        """Build the part shared by every section call: images, context, vision."""
+        parts = [img.part if isinstance(img, ImagePayload) else img for img in self.images]
 
-        parts.append({"text": user_text.strip() or ""})
+        shared_text = _shared_text(self.context, self.vision, self.budget)
+        if shared_text:
+            parts.append({"text": shared_text})
 
-        # Final format
         return [{"role": "user", "parts": parts}]
 
+    def build_suffix(self) -> list[Any]:
+        """Build the section-specific part sent after a cached prefix."""
+        text = _suffix_text(self.system_prompt, self.extra_instruction)
+        upstream = self._upstream_text()
+        if upstream:
+            text += "\n\n" + upstream
+        return [{"role": "user", "parts": [{"text": text}]}]
+
+    def build(self) -> list[Any]:
+        if not self.system_prompt:
+            raise ValueError("system_prompt must be set before building the prompt.")
+
+        # System instruction as the first part, followed by the user parts
+        contents = self.build_contents()
+        contents[0]["parts"].insert(0, {"text": self.system_prompt})
+        return contents
+
 
 class PromptFactory:
     @staticmethod
@@ -195,3 +301,25 @@ class PromptFactory:
     @staticmethod
     def vision(images):
         return PromptBuilder().system(VISION_SYSTEM_PROMPT).with_images(images)
+
+    @staticmethod
+    def combined(images, context=None, vision=None, sections=()):
+        """
+        One prompt asking for several sections as keys of a single JSON object.
+
+        Args:
+            sections: (key, PromptBuilder) pairs, e.g. from the other factories
+        """
+        keys = ", ".join(f'"{key}"' for key, _ in sections)
+        blocks = "\n\n".join(
+            f'### "{key}"\n{builder.system_prompt.strip()}\nTask: {builder.extra_instruction}'
+            for key, builder in sections
+        )
+        return (
+            PromptBuilder()
+            .system(COMBINED_SYSTEM_PROMPT.format(keys=keys, sections=blocks))
+            .with_images(images)
+            .with_context(context)
+            .with_vision(vision)
+            .with_instruction(f"Generate all sections ({keys}) as one JSON object.")
+        )
@@ -0,0 +1,237 @@
+"""
+Persistent cache of Gemini responses keyed by a prompt fingerprint.
+
+The fingerprint is a SHA-256 over the model name, response schema, system
+prompt and every content part, with images reduced to the digest of their
+bytes. Context and the vision result are part of the rendered text, and
+system prompts are the constants in app/prompts, so editing a prompt
+changes the key and old entries simply age out.
+
+Two backends: Redis (shared by the API and all workers) and a local disk
+directory. Both expire entries after LLM_CACHE_TTL and evict the least
+recently used ones beyond LLM_CACHE_MAX_ENTRIES. Cache errors never fail
+a call; they count as misses, and the cache is skipped for
+FAIL_OPEN_COOLDOWN seconds afterwards so a missing Redis adds no latency.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+import google.generativeai as genai
+
+from app.config import settings
+from app.core.queue import get_redis_pool
+
+logger = logging.getLogger(__name__)
+
+# Bump to invalidate every entry (e.g. when the request format changes)
+CACHE_VERSION = "1"
+
+# Skip the cache for this long after a backend error
+FAIL_OPEN_COOLDOWN = 30.0
+
+
+def _update_part(h: "hashlib._Hash", part: Any) -> None:
+    if isinstance(part, genai.protos.Part):
+        if part.inline_data.data:
+            h.update(b"img:" + part.inline_data.mime_type.encode())
+            h.update(hashlib.sha256(part.inline_data.data).digest())
+        else:
+            h.update(b"txt:" + part.text.encode("utf-8"))
+    elif isinstance(part, dict) and "text" in part:
+        h.update(b"txt:" + part["text"].encode("utf-8"))
+    elif isinstance(part, dict) and "inline_data" in part:
+        blob = part["inline_data"]
+        h.update(b"img:" + blob["mime_type"].encode())
+        h.update(hashlib.sha256(blob["data"]).digest())
+    elif isinstance(part, str):
+        h.update(b"txt:" + part.encode("utf-8"))
+    else:
+        h.update(b"obj:" + repr(part).encode("utf-8"))
+    h.update(b"\x00")
+
+
+def fingerprint(model: str, schema_name: str, system_instruction: str | None, contents: Any) -> str:
+    """Stable hash of everything that determines a Gemini response."""
+    h = hashlib.sha256()
+    for value in (CACHE_VERSION, model, schema_name, system_instruction or ""):
+        h.update(value.encode("utf-8"))
+        h.update(b"\x00")
+
+    for message in contents or []:
+        if isinstance(message, dict):
+            h.update(str(message.get("role", "")).encode())
+            for part in message.get("parts", []):
+                _update_part(h, part)
+        else:
+            _update_part(h, message)
+
+    return h.hexdigest()
+
+
+class RedisResponseCache:
+    """Redis backend; a sorted set of last-access times drives LRU eviction."""
+
+    PREFIX = "llm_cache"
+
+    def _key(self, key: str) -> str:
+        return f"{self.PREFIX}:entry:{key}"
+
+    async def get(self, key: str) -> str | None:
+        redis = await get_redis_pool()
+        value = await redis.get(self._key(key))
+        if value is None:
+            await redis.hincrby(f"{self.PREFIX}:stats", "misses", 1)
+            return None
+
+        await redis.zadd(f"{self.PREFIX}:lru", {key: time.time()})
+        await redis.hincrby(f"{self.PREFIX}:stats", "hits", 1)
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    async def set(self, key: str, value: str) -> None:
+        redis = await get_redis_pool()
+        lru = f"{self.PREFIX}:lru"
+        await redis.set(self._key(key), value, ex=settings.LLM_CACHE_TTL)
+        await redis.zadd(lru, {key: time.time()})
+
+        # Drop index entries whose value already expired, then trim to size
+        await redis.zremrangebyscore(lru, "-inf", time.time() - settings.LLM_CACHE_TTL)
+        overflow = await redis.zcard(lru) - settings.LLM_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            evicted = await redis.zpopmin(lru, overflow)
+            await redis.delete(*(self._key(k.decode() if isinstance(k, bytes) else k) for k, _ in evicted))
+            await redis.hincrby(f"{self.PREFIX}:stats", "evictions", len(evicted))
+
+    async def stats(self) -> dict[str, int]:
+        redis = await get_redis_pool()
+        raw = await redis.hgetall(f"{self.PREFIX}:stats")
+        stats = {
+            (k.decode() if isinstance(k, bytes) else k): int(v) for k, v in raw.items()
+        }
+        stats["entries"] = await redis.zcard(f"{self.PREFIX}:lru")
+        return stats
+
+
+class DiskResponseCache:
+    """Local directory backend; file mtime is the last-access time."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _get(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > settings.LLM_CACHE_TTL:
+                path.unlink(missing_ok=True)
+                return None
+            value = path.read_text(encoding="utf-8")
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+
+    def _set(self, key: str, value: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self._path(key).with_suffix(".part")
+        tmp.write_text(value, encoding="utf-8")
+        os.replace(tmp, self._path(key))
+
+        entries = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in entries[: max(0, len(entries) - settings.LLM_CACHE_MAX_ENTRIES)]:
+            path.unlink(missing_ok=True)
+            self.evictions += 1
+
+    async def get(self, key: str) -> str | None:
+        value = await asyncio.to_thread(self._get, key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        await asyncio.to_thread(self._set, key, value)
+
+    async def stats(self) -> dict[str, int]:
+        entries = await asyncio.to_thread(lambda: sum(1 for _ in self.directory.glob("*.json")))
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+        }
+
+
+class ResponseCache:
+    """Front for the configured backend; never raises into the caller."""
+
+    def __init__(self) -> None:
+        backend = settings.LLM_CACHE_BACKEND.lower()
+        if backend == "redis":
+            self._backend = RedisResponseCache()
+        elif backend == "disk":
+            self._backend = DiskResponseCache(Path(settings.LLM_CACHE_DIR))
+        else:
+            self._backend = None
+        self._disabled_until = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self._backend is not None
+
+    def _available(self) -> bool:
+        return self._backend is not None and time.monotonic() >= self._disabled_until
+
+    def _fail_open(self, action: str, error: Exception) -> None:
+        logger.warning(
+            f"LLM cache {action} failed, skipping the cache for {FAIL_OPEN_COOLDOWN:.0f}s: {error}"
+        )
+        self._disabled_until = time.monotonic() + FAIL_OPEN_COOLDOWN
+
+    async def get(self, key: str) -> str | None:
+        if not self._available():
+            return None
+        try:
+            return await self._backend.get(key)
+        except Exception as e:
+            self._fail_open("read", e)
+            return None
+
+    async def set(self, key: str, value: str) -> None:
+        if not self._available():
+            return
+        try:
+            await self._backend.set(key, value)
+        except Exception as e:
+            self._fail_open("write", e)
+
+    async def stats(self) -> dict[str, Any]:
+        """Backend counters; {"backend", "available": False} when unreachable."""
+        if self._backend is None:
+            return {"backend": "none"}
+        if not self._available():
+            return {"backend": settings.LLM_CACHE_BACKEND.lower(), "available": False}
+        try:
+            stats = await self._backend.stats()
+        except Exception as e:
+            logger.warning(f"LLM cache stats unavailable: {e}")
+            return {"backend": settings.LLM_CACHE_BACKEND.lower(), "available": False}
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        return {
+            "backend": settings.LLM_CACHE_BACKEND.lower(),
+            **stats,
+            "hit_rate": round(stats.get("hits", 0) / lookups, 4) if lookups else 0.0,
+        }
+
+
+response_cache = ResponseCache()
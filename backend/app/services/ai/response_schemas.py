@@ -0,0 +1,124 @@
+"""
+Gemini response schemas and output caps derived from the response models.
+
+Gemini's response_schema takes an OpenAPI subset: no $ref, anyOf, title or
+default, and every object needs explicit properties. Each model is
+converted once (cached) into that subset:
+
+- ``X | None`` becomes X with ``nullable``
+- $refs are inlined
+- free-form ``dict[str, Any]`` fields get properties from OBJECT_PROPERTIES,
+  or the section schema when the field is named after a section (combined
+  mode); any other free-form field is left out, so the model omits it
+
+The generation config for a (schema, output cap) pair is cached as well.
+Output caps come from the section registry and can be overridden per call
+kind with GEMINI_SECTION_MAX_OUTPUT_TOKENS_STR.
+"""
+import functools
+from typing import Any
+
+import google.generativeai as genai
+from pydantic import BaseModel
+
+from app.config import settings
+
+# Keys Gemini's Schema accepts
+_ALLOWED_KEYS = {"type", "description", "nullable", "enum", "items", "properties", "required"}
+
+# Properties of free-form object fields, by field name
+OBJECT_PROPERTIES: dict[str, tuple[str, ...]] = {
+    "demographics": ("age_range", "location", "gender", "lifestyle"),
+}
+
+
+def _resolve(node: dict[str, Any], defs: dict[str, Any]) -> dict[str, Any]:
+    if "$ref" in node:
+        return _resolve(defs[node["$ref"].split("/")[-1]], defs)
+    return node
+
+
+def _convert(node: dict[str, Any], defs: dict[str, Any], name: str | None = None) -> dict[str, Any] | None:
+    node = _resolve(node, defs)
+
+    if "anyOf" in node:
+        options = [o for o in node["anyOf"] if o.get("type") != "null"]
+        if len(options) != 1:
+            return None
+        converted = _convert(options[0], defs, name)
+        if converted is not None and len(options) < len(node["anyOf"]):
+            converted["nullable"] = True
+        return converted
+
+    if node.get("type") == "object" and not node.get("properties"):
+        from app.services.sections import SECTIONS_BY_NAME
+
+        if name in SECTIONS_BY_NAME:
+            return dict(response_schema(SECTIONS_BY_NAME[name].schema))
+        if name in OBJECT_PROPERTIES:
+            return {
+                "type": "OBJECT",
+                "properties": {key: {"type": "STRING", "nullable": True} for key in OBJECT_PROPERTIES[name]},
+            }
+        return None
+
+    converted = {k: v for k, v in node.items() if k in _ALLOWED_KEYS}
+    if "type" in converted:
+        converted["type"] = converted["type"].upper()
+    if "items" in node:
+        items = _convert(node["items"], defs)
+        if items is None:
+            return None
+        converted["items"] = items
+    if "properties" in node:
+        properties = {}
+        for key, value in node["properties"].items():
+            prop = _convert(value, defs, key)
+            if prop is not None:
+                properties[key] = prop
+        converted["properties"] = properties
+        if "required" in node:
+            converted["required"] = [k for k in node["required"] if k in properties]
+    return converted
+
+
+@functools.cache
+def response_schema(model: type[BaseModel]) -> dict[str, Any]:
+    """The Gemini response_schema dict of a pydantic model (computed once)."""
+    schema = model.model_json_schema()
+    return _convert(schema, schema.get("$defs", {}))
+
+
+def max_output_tokens(kind: str) -> int:
+    """Output token cap of a call kind (a section name, "vision", "combined")."""
+    from app.services.sections import SECTIONS, SECTIONS_BY_NAME
+
+    override = settings.GEMINI_SECTION_MAX_OUTPUT_TOKENS.get(kind)
+    if override:
+        return override
+    if kind in SECTIONS_BY_NAME:
+        return SECTIONS_BY_NAME[kind].max_output_tokens
+    if kind == "combined":
+        return sum(max_output_tokens(s.name) for s in SECTIONS)
+    return settings.GEMINI_MAX_OUTPUT_TOKENS
+
+
+@functools.cache
+def generation_config(model: type[BaseModel], max_output_tokens: int | None) -> genai.GenerationConfig:
+    """JSON generation config constrained to the model's schema and output cap."""
+    return genai.GenerationConfig(
+        response_mime_type="application/json",
+        response_schema=response_schema(model) if settings.GEMINI_RESPONSE_SCHEMA_ENABLED else None,
+        max_output_tokens=max_output_tokens,
+    )
+
+
+def warm_up() -> int:
+    """Convert the vision, section and combined schemas ahead of the first call."""
+    from app.schemas.vision import VisionResult
+    from app.services.sections import SECTIONS, CombinedSectionsResponse
+
+    models = [VisionResult, CombinedSectionsResponse, *(s.schema for s in SECTIONS)]
+    for model in models:
+        response_schema(model)
+    return len(models)
@@ -0,0 +1,212 @@
+"""
+Token and latency accounting of every LLM call.
+
+GeminiService and VisionService wrap each call in ``track_call``, which
+collects the provider's token counts, wall time, rate-limit retries and
+whether the call was hedged. On exit the call is:
+
+- added to Redis counters and a latency histogram per (kind, model),
+  where kind is the section name, "vision" or "combined"
+- stored as an AnalysisLLMCall row, tagged with the analysis and user set
+  by ``set_usage_tags`` for the current task
+
+Both are best effort; accounting never fails a call.
+"""
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+from app.core.queue import get_redis_pool
+from app.database import AsyncSessionLocal
+from app.models.analysis.llm_call import AnalysisLLMCall
+
+logger = logging.getLogger(__name__)
+
+# Histogram upper bounds in seconds (plus +Inf)
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60)
+
+PREFIX = "llm_usage"
+
+# Seconds to skip the Redis counters after an error (no Redis in dev mode)
+REDIS_COOLDOWN = 30
+
+_redis_disabled_until = 0.0
+
+
+@dataclass
+class CallUsage:
+    kind: str
+    model: str
+    status: str = "ok"
+    prompt_tokens: int = 0
+    candidate_tokens: int = 0
+    cached_tokens: int = 0
+    retries: int = 0
+    hedged: bool = False
+    seconds: float = 0.0
+
+    def add_response(self, response: Any) -> None:
+        """Take the token counts of an LLMResponse."""
+        self.prompt_tokens = response.prompt_tokens
+        self.candidate_tokens = response.candidate_tokens
+        self.cached_tokens = response.cached_tokens
+
+
+# (analysis_id, user_id) of the analysis the current task works on
+_tags: ContextVar[tuple[UUID | None, UUID | None]] = ContextVar(
+    "llm_usage_tags", default=(None, None)
+)
+_current: ContextVar[CallUsage | None] = ContextVar("llm_usage_call", default=None)
+
+
+def set_usage_tags(analysis_id: UUID | None, user_id: UUID | None) -> None:
+    """Tag the LLM calls of the current task (job or background task)."""
+    _tags.set((analysis_id, user_id))
+
+
+def note_retry() -> None:
+    call = _current.get()
+    if call is not None:
+        call.retries += 1
+
+
+def note_hedge() -> None:
+    call = _current.get()
+    if call is not None:
+        call.hedged = True
+
+
+def _bucket(seconds: float) -> str:
+    for bound in LATENCY_BUCKETS:
+        if seconds <= bound:
+            return f"le:{bound:g}"
+    return "le:+Inf"
+
+
+async def _count(call: CallUsage) -> None:
+    global _redis_disabled_until
+
+    if time.monotonic() < _redis_disabled_until:
+        return
+    try:
+        redis = await get_redis_pool()
+    except Exception:
+        _redis_disabled_until = time.monotonic() + REDIS_COOLDOWN
+        raise
+    key = f"{PREFIX}:{call.kind}:{call.model}"
+    pipe = redis.pipeline(transaction=False)
+    pipe.sadd(f"{PREFIX}:groups", f"{call.kind}|{call.model}")
+    pipe.hincrby(key, "calls", 1)
+    pipe.hincrby(key, call.status, 1)
+    pipe.hincrby(key, "retries", call.retries)
+    pipe.hincrby(key, "hedged", int(call.hedged))
+    pipe.hincrby(key, "prompt_tokens", call.prompt_tokens)
+    pipe.hincrby(key, "candidate_tokens", call.candidate_tokens)
+    pipe.hincrby(key, "cached_tokens", call.cached_tokens)
+    pipe.hincrbyfloat(key, "seconds_sum", call.seconds)
+    pipe.hincrby(key, _bucket(call.seconds), 1)
+    await pipe.execute()
+
+
+async def _persist(call: CallUsage) -> None:
+    analysis_id, user_id = _tags.get()
+    async with AsyncSessionLocal() as db:
+        db.add(
+            AnalysisLLMCall(
+                analysis_id=analysis_id,
+                user_id=user_id,
+                kind=call.kind,
+                model=call.model,
+                status=call.status,
+                prompt_tokens=call.prompt_tokens,
+                candidate_tokens=call.candidate_tokens,
+                cached_tokens=call.cached_tokens,
+                retries=call.retries,
+                hedged=call.hedged,
+                latency_ms=round(call.seconds * 1000),
+            )
+        )
+        await db.commit()
+
+
+@asynccontextmanager
+async def track_call(kind: str, model: str) -> AsyncIterator[CallUsage]:
+    """Account one LLM call; the body fills tokens (and status "cached")."""
+    call = CallUsage(kind=kind, model=model)
+    token = _current.set(call)
+    started = time.monotonic()
+    try:
+        yield call
+    except BaseException:
+        call.status = "error"
+        raise
+    finally:
+        _current.reset(token)
+        call.seconds = time.monotonic() - started
+        for record in (_count, _persist):
+            try:
+                await record(call)
+            except Exception as e:
+                logger.warning(f"LLM usage {record.__name__} failed for {kind}: {e}")
+
+
+async def stats() -> list[dict[str, Any]]:
+    """
+    Counters and cumulative latency histogram per (kind, model).
+
+    Empty while Redis is unreachable (same cooldown as the counters).
+    """
+    global _redis_disabled_until
+
+    if time.monotonic() < _redis_disabled_until:
+        return []
+    try:
+        redis = await get_redis_pool()
+        groups = sorted(
+            g.decode() if isinstance(g, bytes) else g
+            for g in await redis.smembers(f"{PREFIX}:groups")
+        )
+        raws = {}
+        for group in groups:
+            kind, model = group.split("|", 1)
+            raws[(kind, model)] = await redis.hgetall(f"{PREFIX}:{kind}:{model}")
+    except Exception as e:
+        _redis_disabled_until = time.monotonic() + REDIS_COOLDOWN
+        logger.warning(f"LLM usage stats unavailable: {e}")
+        return []
+
+    result = []
+    for (kind, model), raw in raws.items():
+        fields = {
+            (k.decode() if isinstance(k, bytes) else k): float(v) for k, v in raw.items()
+        }
+
+        cumulative = 0
+        histogram = {}
+        for bound in [f"{b:g}" for b in LATENCY_BUCKETS] + ["+Inf"]:
+            cumulative += int(fields.get(f"le:{bound}", 0))
+            histogram[bound] = cumulative
+
+        calls = int(fields.get("calls", 0))
+        result.append(
+            {
+                "kind": kind,
+                "model": model,
+                "calls": calls,
+                "errors": int(fields.get("error", 0)),
+                "cached": int(fields.get("cached", 0)),
+                "retries": int(fields.get("retries", 0)),
+                "hedged": int(fields.get("hedged", 0)),
+                "prompt_tokens": int(fields.get("prompt_tokens", 0)),
+                "candidate_tokens": int(fields.get("candidate_tokens", 0)),
+                "cached_tokens": int(fields.get("cached_tokens", 0)),
+                "avg_seconds": round(fields.get("seconds_sum", 0) / calls, 3) if calls else 0.0,
+                "latency_histogram": histogram,
+            }
+        )
+    return result
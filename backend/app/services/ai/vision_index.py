@@ -0,0 +1,127 @@
+"""
+Near-duplicate index of stored vision results.
+
+Keeps a process-local BK-tree of (phash -> analysis id) for every analysis
+that already has a vision_result. The tree is filled lazily from Postgres
+(only rows updated in the last VISION_INDEX_LOOKBACK_DAYS) and topped up
+incrementally on each lookup, so results written by other worker processes
+become visible without a full reload.
+
+Top-ups walk the partial (updated_at, id) index of rows with a phash in
+keyset order. Each one starts SYNC_OVERLAP before the last row seen, since
+updated_at is stamped before commit and a slower transaction can land
+behind the watermark; rows already in the tree are skipped.
+
+Lookups use their own session, so a failed query never aborts the
+caller's transaction.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import select, tuple_
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.analysis.analysis import Analysis
+from app.utils.phash import BKTree
+
+logger = logging.getLogger(__name__)
+
+# Re-read this far behind the watermark on every top-up
+SYNC_OVERLAP = timedelta(seconds=30)
+
+# Rows per sync query
+SYNC_BATCH = 1000
+
+
+class NearDuplicateIndex:
+    """BK-tree of analyses with a vision result, keyed by perceptual hash."""
+
+    def __init__(self) -> None:
+        self._tree = BKTree()
+        self._seen: set[UUID] = set()
+        self._watermark: datetime | None = None
+        self._lock = asyncio.Lock()
+
+    def add(self, analysis_id: UUID, phash: str) -> None:
+        """Register an analysis whose vision_result has just been stored."""
+        if analysis_id not in self._seen:
+            self._seen.add(analysis_id)
+            self._tree.add(phash, analysis_id)
+
+    async def _sync(self, db) -> None:
+        """Load analyses whose vision result appeared since the last sync."""
+        if self._watermark is None:
+            since = datetime.utcnow() - timedelta(days=settings.VISION_INDEX_LOOKBACK_DAYS)
+        else:
+            since = self._watermark - SYNC_OVERLAP
+
+        base = (
+            select(Analysis.id, Analysis.phash, Analysis.updated_at)
+            .where(
+                Analysis.phash.is_not(None),
+                Analysis.vision_result.is_not(None),
+                Analysis.updated_at >= since,
+            )
+            .order_by(Analysis.updated_at, Analysis.id)
+            .limit(SYNC_BATCH)
+        )
+
+        loaded = 0
+        stmt = base
+        while True:
+            rows = (await db.execute(stmt)).all()
+            for analysis_id, phash, updated_at in rows:
+                self.add(analysis_id, phash)
+                if self._watermark is None or updated_at > self._watermark:
+                    self._watermark = updated_at
+            loaded += len(rows)
+            if len(rows) < SYNC_BATCH:
+                break
+            # Next page after the last (updated_at, id) read
+            last_at, last_id = rows[-1][2], rows[-1][0]
+            stmt = base.where(tuple_(Analysis.updated_at, Analysis.id) > (last_at, last_id))
+
+        if self._watermark is None:
+            # Nothing yet: later syncs still only look back from now
+            self._watermark = since
+        if loaded:
+            logger.debug(f"Vision index synced {loaded} row(s), size={len(self._tree)}")
+
+    async def find(self, phash: str, max_distance: int) -> dict[str, Any] | None:
+        """
+        Return the vision_result of the closest stored near-duplicate.
+
+        Args:
+            phash: Perceptual hash of the image being analyzed
+            max_distance: Maximum Hamming distance accepted as a match
+
+        Returns:
+            The stored vision_result dict, or None when nothing is close enough
+        """
+        async with AsyncSessionLocal() as db:
+            async with self._lock:
+                await self._sync(db)
+                match = self._tree.nearest(phash, max_distance)
+
+            if match is None:
+                return None
+
+            distance, analysis_id = match
+            vision_result = await db.scalar(
+                select(Analysis.vision_result).where(Analysis.id == analysis_id)
+            )
+
+        if vision_result is None:
+            return None
+
+        logger.info(
+            f"Near-duplicate vision hit: analysis {analysis_id} at distance {distance}"
+        )
+        return vision_result
+
+
+vision_index = NearDuplicateIndex()
@@ -1,12 +1,18 @@
 import google.generativeai as genai
 import logging
-from typing import get_type_hints
 
 from app.config import settings
 from app.schemas.vision import VisionResult
 from app.prompts.vision_prompt import VISION_SYSTEM_PROMPT
 from app.services.ai.prompt_builder import PromptFactory
-from app.prompts.exceptions import GeminiAPIError
+from app.services.ai.vision_index import vision_index
+from app.prompts.exceptions import GeminiAPIError, GeminiError
+from app.services.ai.circuit_breaker import breaker_for
+from app.services.ai.deadlines import run_call
+from app.services.ai.governor import governor
+from app.services.ai.llm_provider import LLMRequest, get_provider
+from app.services.ai.response_schemas import max_output_tokens
+from app.services.ai.usage import track_call
 
 logger = logging.getLogger(__name__)
 
@@ -25,38 +31,31 @@ class VisionService:
             logger.info("✅ Gemini API configured")
 
     @staticmethod
-    def _convert_schema_for_gemini(pydantic_model):
-        """
-        Convert Pydantic model to Gemini-compatible schema.
-        Removes unsupported fields like 'default', 'title', etc.
-        """
-        schema = pydantic_model.model_json_schema()
-        
-        def clean_schema(obj):
-            """Recursively remove unsupported fields."""
-            if isinstance(obj, dict):
-                # Remove fields that Gemini doesn't support
-                unsupported_fields = ['default', 'title', 'examples', 'description']
-                cleaned = {k: v for k, v in obj.items() if k not in unsupported_fields}
-                
-                # Recursively clean nested objects
-                return {k: clean_schema(v) for k, v in cleaned.items()}
-            elif isinstance(obj, list):
-                return [clean_schema(item) for item in obj]
-            else:
-                return obj
-        
-        cleaned = clean_schema(schema)
-        logger.debug(f"Cleaned schema: {cleaned}")
-        return cleaned
+    async def find_reusable(phash: str | None) -> VisionResult | None:
+        """Stored vision result of a near-duplicate photo, if any."""
+        if not phash or settings.VISION_REUSE_MAX_DISTANCE < 0:
+            return None
+        try:
+            # The index queries in its own session
+            reused = await vision_index.find(phash, settings.VISION_REUSE_MAX_DISTANCE)
+            if reused is not None:
+                return VisionResult.model_validate(reused)
+        except Exception as e:
+            # The lookup is an optimization; fall through to Gemini
+            logger.warning(f"Near-duplicate vision lookup failed: {e}")
+        return None
 
     @staticmethod
-    async def analyze(images: list):
+    async def analyze(images: list, phash: str | None = None):
         """
         Analyze product images using Gemini Vision.
+
+        When the image's perceptual hash is given, the stored vision result
+        of a near-duplicate photo is reused and no Gemini call is made.
         
         Args:
-            images: List of uploaded Gemini File objects
+            images: List of ImagePayload objects
+            phash: Optional perceptual hash of the image
             
         Returns:
             VisionResult: Parsed vision analysis results
@@ -64,69 +63,76 @@ class VisionService:
         Raises:
             GeminiAPIError: If vision analysis fails
         """
-        try:
-            # Ensure API is configured
-            VisionService._ensure_configured()
-            
-            logger.info(f"🔄 Building vision prompt for {len(images)} image(s)")
-            prompt = PromptFactory.vision(images).build()
-
-            logger.info(f"🔄 Initializing Gemini model: {settings.GEMINI_VISION_MODEL}")
-            model = genai.GenerativeModel(
-                settings.GEMINI_VISION_MODEL,
-                system_instruction=VISION_SYSTEM_PROMPT,
-            )
-
+        if phash is not None:
+            reused = await VisionService.find_reusable(phash)
+            if reused is not None:
+                return reused
 
-            logger.info("🔄 Calling Gemini API for vision analysis")
-            
-            # Option 1: Use cleaned schema (recommended)
+        # Tokens, wall time and retries of the call, by model/user
+        async with track_call("vision", settings.GEMINI_VISION_MODEL) as usage:
             try:
-                response = await model.generate_content_async(
-                    contents=prompt,
-                    generation_config=genai.GenerationConfig(
-                        response_mime_type="application/json",
-                        # Don't pass schema, let Gemini generate free-form JSON
-                    ),
-                )
-            except Exception as schema_error:
-                logger.warning(f"Failed with schema approach: {schema_error}")
-                # Fallback: Generate without schema constraint
-                response = await model.generate_content_async(
+                # Ensure API is configured
+                VisionService._ensure_configured()
+            
+                logger.info(f"🔄 Building vision prompt for {len(images)} image(s)")
+                # System prompt lives on the cached model, not in the contents
+                prompt = PromptFactory.vision(images).build_contents()
+                request = LLMRequest(
+                    model=settings.GEMINI_VISION_MODEL,
                     contents=prompt,
-                    generation_config=genai.GenerationConfig(
-                        response_mime_type="application/json",
-                    ),
+                    schema=VisionResult,
+                    system_instruction=VISION_SYSTEM_PROMPT,
+                    max_output_tokens=max_output_tokens("vision"),
                 )
+                provider = get_provider()
 
-            logger.info("✅ Gemini API call successful, parsing response")
+                logger.info("🔄 Calling Gemini API for vision analysis")
             
-            # Validate response text exists
-            if not response.text:
-                raise GeminiAPIError(
-                    "Empty response from Gemini API",
-                    original_error=ValueError("response.text is empty")
+                # Acquire a cluster-wide slot; 429s are backed off and retried.
+                # Output is constrained to VisionResult's precomputed schema
+                breaker = breaker_for(settings.GEMINI_VISION_MODEL)
+                response = await breaker.guard(
+                    lambda: run_call(
+                        "vision",
+                        lambda: governor.call(
+                            settings.GEMINI_VISION_MODEL,
+                            prompt,
+                            lambda: breaker.measure(lambda: provider.generate(request)),
+                            system_instruction=VISION_SYSTEM_PROMPT,
+                        ),
+                    )
                 )
+
+                logger.info("✅ Gemini API call successful, parsing response")
+            
+                usage.add_response(response)
+
+                # Validate response text exists
+                if not response.text:
+                    raise GeminiAPIError(
+                        "Empty response from Gemini API",
+                        original_error=ValueError("response.text is empty")
+                    )
             
-            logger.info(f"📝 Response text length: {len(response.text)} chars")
-            logger.debug(f"📝 Response preview: {response.text[:200]}...")
+                logger.info(f"📝 Response text length: {len(response.text)} chars")
+                logger.debug(f"📝 Response preview: {response.text[:200]}...")
             
-            # Parse and validate with Pydantic
-            result = VisionResult.model_validate_json(response.text)
-            logger.info("✅ Vision analysis completed successfully")
+                # Parse and validate with Pydantic
+                result = VisionResult.model_validate_json(response.text)
+                logger.info("✅ Vision analysis completed successfully")
             
-            return result
+                return result
 
-        except GeminiAPIError:
-            # Re-raise custom errors as-is
-            raise
+            except GeminiError:
+                # Re-raise custom errors as-is
+                raise
             
-        except Exception as e:
-            # Wrap all other errors
-            logger.error(f"❌ Vision analysis failed: {type(e).__name__}: {str(e)}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            raise GeminiAPIError(
-                f"Vision analysis failed: {type(e).__name__}",
-                original_error=e
-            )
\ No newline at end of file
+            except Exception as e:
+                # Wrap all other errors
+                logger.error(f"❌ Vision analysis failed: {type(e).__name__}: {str(e)}")
+                import traceback
+                logger.error(f"Traceback: {traceback.format_exc()}")
+                raise GeminiAPIError(
+                    f"Vision analysis failed: {type(e).__name__}",
+                    original_error=e
+                )
\ No newline at end of file
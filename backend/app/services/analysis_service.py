@@ -1,122 +1,683 @@
 import asyncio
+import base64
+import hashlib
 import logging
+from datetime import datetime
+from uuid import UUID
 
-from app.schemas.analysis_story import AnalysisStoryResponse
-from app.schemas.analysis_branding import AnalysisBrandThemeResponse
-from app.schemas.analysis_taste import AnalysisTasteResponse
-from app.schemas.analysis_action_plan import AnalysisActionPlanResponse
-from app.schemas.analysis_marketplace import AnalysisMarketplaceResponse
-from app.schemas.analysis_packaging import AnalysisPackagingResponse
-from app.schemas.analysis_person import AnalysisPersonaResponse
-from app.schemas.analysis_pricing import AnalysisPricingResponse
-from app.schemas.analysis_seo import AnalysisSEOResponse
+from sqlalchemy import String, case, cast, exists, func, select, tuple_, type_coerce, update
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.orm import selectinload
+from pydantic import ValidationError
 
+from app.config import settings
+
+from app.services import document_cache, events
+from app.services.ai.vision_index import vision_index
 from app.services.ai.vision_service import VisionService
-from app.services.ai.prompt_builder import PromptFactory
 from app.services.ai.gemini_service import GeminiService
 from app.models.analysis.analysis import Analysis, AnalysisStatus
-from app.models.analysis.story import AnalysisStory
-from app.models.analysis.brand_theme import AnalysisBrandTheme
-from app.models.analysis.taste import AnalysisTaste
-from app.models.analysis.action_plan import AnalysisActionPlan
-from app.models.analysis.marketplace import AnalysisMarketplace
-from app.models.analysis.packaging import AnalysisPackaging
-from app.models.analysis.persona import AnalysisPersona
-from app.models.analysis.pricing import AnalysisPricing
-from app.models.analysis.seo import AnalysisSEO
+from app.services.ai.context_cache import CachedPrefix, context_cache
+from app.services.ai.deadlines import analysis_deadline, new_deadline
+from app.services.ai.usage import set_usage_tags
+from app.services.ai.prompt_builder import PromptBuilder, PromptFactory, render_vision
+from app.prompts.exceptions import CircuitOpenError, GeminiError, GeminiRateLimitError
+from app.schemas.analysis import AnalysisData, AnalysisResponse
+from app.schemas.vision import VisionResult
+from app.services.sections import (
+    CONTEXT,
+    IMAGE,
+    SECTIONS,
+    SECTIONS_BY_NAME,
+    VISION,
+    CombinedSectionsResponse,
+    Section,
+    content_columns,
+    section_graph,
+)
 
 logger = logging.getLogger(__name__)
 
+# Columns of the analyses row in an analysis document
+DOCUMENT_COLUMNS = (
+    "id",
+    "user_id",
+    "status",
+    "error",
+    "image_url",
+    "image_filename",
+    "vision_result",
+    "section_status",
+    "created_at",
+    "updated_at",
+)
+
+
+def _section_object(section: Section):
+    """The section row as a jsonb object of its response fields, NULL when absent."""
+    table = section.model.__table__
+    pairs = []
+    for name in section.schema.model_fields:
+        pairs += [cast(name, String), table.c[name]]
+    return type_coerce(
+        case((table.c.id.is_(None), None), else_=func.jsonb_build_object(*pairs)),
+        JSONB,
+    ).label(section.name)
+
+
+def _document_query():
+    """One SELECT for an analysis and its nine section rows (LEFT JOINs)."""
+    analyses = Analysis.__table__
+    joined = analyses
+    for section in SECTIONS:
+        table = section.model.__table__
+        joined = joined.outerjoin(table, table.c.analysis_id == analyses.c.id)
+    return select(
+        *(analyses.c[name] for name in DOCUMENT_COLUMNS),
+        *(_section_object(s) for s in SECTIONS),
+    ).select_from(joined)
+
+
+_DOCUMENT_QUERY = _document_query()
+
+
+def encode_cursor(created_at: datetime, analysis_id: UUID) -> str:
+    """Opaque keyset cursor: the (created_at, id) of the last item of a page."""
+    raw = f"{created_at.isoformat()}|{analysis_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Inverse of encode_cursor; ValueError on anything else."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, analysis_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(analysis_id)
+    except ValueError as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
 class AnalysisService:
 
     @staticmethod
-    async def analyze_product(db, analysis: Analysis, images: list, context: str | None = None):
-        logger.info(f"Starting product analysis for analysis_id={analysis.id}")
+    def content_key(image_sha256: str, context: str | None) -> str:
+        """
+        Key identifying the inputs of an analysis.
+
+        Two uploads with the same normalized image bytes, context and models
+        produce the same key, so a user's second upload can reuse the
+        results of the first.
+        """
+        h = hashlib.sha256()
+        for part in (
+            image_sha256,
+            context or "",
+            settings.GEMINI_VISION_MODEL,
+            settings.GEMINI_LLM_MODEL,
+        ):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    @staticmethod
+    async def find_completed_by_content_key(db, content_key: str, user_id: UUID) -> Analysis | None:
+        """
+        Return the user's most recent COMPLETED analysis with this content key.
+
+        Only the user's own analyses are reused: the generated text may
+        carry their upload context, which is not shared with other users.
+        """
+        stmt = (
+            select(Analysis)
+            .where(
+                Analysis.content_key == content_key,
+                Analysis.user_id == user_id,
+                Analysis.status == AnalysisStatus.COMPLETED.value,
+            )
+            .order_by(Analysis.created_at.desc())
+            .limit(1)
+            .options(*(selectinload(getattr(Analysis, s.name)) for s in SECTIONS))
+        )
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def fetch_document(db, analysis_id: UUID) -> dict | None:
+        """
+        An analysis with every section, as a plain dict, in one round trip.
+
+        Sections come back as jsonb objects of their response fields (None
+        when not stored), so the dict maps straight onto AnalysisData
+        without loading ORM objects. The unique analysis_id index on each
+        section table keeps the joins at one row.
+        """
+        row = (
+            await db.execute(_DOCUMENT_QUERY.where(Analysis.id == analysis_id))
+        ).one_or_none()
+        return dict(row._mapping) if row is not None else None
+
+    @staticmethod
+    async def list_page(
+        db,
+        user_id: UUID,
+        limit: int,
+        cursor: str | None = None,
+        status: str | None = None,
+    ) -> tuple[list, str | None]:
+        """
+        One page of a user's analyses, newest first, and the next cursor.
+
+        Keyset pagination in the order of ix_analyses_user_created_at_id
+        (created_at DESC, id DESC): the row comparison against the cursor is
+        an index range condition, and only covered columns are selected, so
+        any page is one index range scan regardless of its depth.
+        """
+        stmt = (
+            select(Analysis.id, Analysis.image_url, Analysis.status, Analysis.created_at)
+            .where(Analysis.user_id == user_id)
+            .order_by(Analysis.created_at.desc(), Analysis.id.desc())
+            .limit(limit + 1)
+        )
+        if status is not None:
+            stmt = stmt.where(Analysis.status == status)
+        if cursor is not None:
+            created_at, last_id = decode_cursor(cursor)
+            stmt = stmt.where(tuple_(Analysis.created_at, Analysis.id) < (created_at, last_id))
+
+        rows = (await db.execute(stmt)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+        return rows, next_cursor
+
+    @staticmethod
+    def render_document(document: dict) -> bytes:
+        """The GET /analysis/{id} response body of a fetched document."""
+        return AnalysisResponse(data=AnalysisData.model_validate(document)).model_dump_json().encode()
+
+    @staticmethod
+    async def cache_document(db, analysis_id: UUID) -> None:
+        """Render a just-completed analysis into document_cache (best effort)."""
+        try:
+            document = await AnalysisService.fetch_document(db, analysis_id)
+            if document is not None and document["status"] == AnalysisStatus.COMPLETED.value:
+                body = AnalysisService.render_document(document)
+                await document_cache.put(analysis_id, document["user_id"], body)
+        except Exception as e:
+            logger.warning(f"Could not cache document of analysis_id={analysis_id}: {e}")
+
+    @staticmethod
+    def clone_completed(db, source: Analysis, user_id: UUID) -> Analysis:
+        """
+        Create a COMPLETED copy of one of the user's analyses (and its sections).
+
+        The copy shares the source image file; no Gemini calls are made.
+        Sources come from find_completed_by_content_key, scoped to the user.
+        """
+        clone = Analysis(
+            user_id=user_id,
+            image_url=source.image_url,
+            image_filename=source.image_filename,
+            content_key=source.content_key,
+            phash=source.phash,
+            vision_result=source.vision_result,
+            section_status={},
+            status=AnalysisStatus.COMPLETED.value,
+        )
+        for section in SECTIONS:
+            record = getattr(source, section.name)
+            if record is not None:
+                setattr(clone, section.name, section.model(**content_columns(record)))
+                clone.section_status[section.name] = AnalysisStatus.COMPLETED.value
+
+        db.add(clone)
+        return clone
+
+    @staticmethod
+    async def run_vision(db, analysis: Analysis, images: list) -> dict:
+        """Run (or reuse) the vision stage and commit its result."""
+        if analysis.vision_result is not None:
+            logger.info(f"Vision result already stored for analysis_id={analysis.id}")
+            return analysis.vision_result
 
-        # -----------------------------
-        # 1. Vision Analysis
-        # -----------------------------
         logger.info(f"Running vision analysis for analysis_id={analysis.id}")
-        vision_result = await VisionService.analyze(images)
+        vision_result = await VisionService.analyze(images, phash=analysis.phash)
+        return await AnalysisService.store_vision(db, analysis, vision_result)
+
+    @staticmethod
+    async def compute_vision(images: list, phash: str | None) -> VisionResult:
+        """
+        Vision stage without touching the caller's session, so it can run
+        beside section calls (the near-duplicate lookup has its own session).
+        """
+        return await VisionService.analyze(images, phash=phash)
+
+    @staticmethod
+    async def store_vision(db, analysis: Analysis, vision_result: VisionResult) -> dict:
+        """Commit a vision result and announce it."""
         analysis.vision_result = vision_result.model_dump()
+        await db.commit()
+
+        if analysis.phash:
+            vision_index.add(analysis.id, analysis.phash)
+        await events.publish(analysis.id, "vision", analysis.vision_result)
+
         logger.info(f"Vision analysis complete for analysis_id={analysis.id}")
+        return analysis.vision_result
 
-        # -----------------------------
-        # 2. Build all prompts
-        # -----------------------------
-        logger.info(f"Building prompts for analysis_id={analysis.id}")
-        story_prompt = PromptFactory.story(images, context, vision_result.model_dump()).build()
-        brand_prompt = PromptFactory.brand_theme(images, context, vision_result.model_dump()).build()
-        taste_prompt = PromptFactory.taste(images, context, vision_result.model_dump()).build()
-        action_plan_prompt = PromptFactory.action_plan(images, context, vision_result.model_dump()).build()
-        marketplace_prompt = PromptFactory.marketplace(images, context, vision_result.model_dump()).build()
-        packaging_prompt = PromptFactory.packaging(images, context, vision_result.model_dump()).build()
-        persona_prompt = PromptFactory.persona(images, context, vision_result.model_dump()).build()
-        pricing_prompt = PromptFactory.pricing(images, context, vision_result.model_dump()).build()
-        seo_prompt = PromptFactory.seo(images, context, vision_result.model_dump()).build()
+    @staticmethod
+    async def generate_section(
+        section: Section,
+        images: list,
+        context: str | None,
+        vision: dict | str | None,
+        prefix: CachedPrefix | None = None,
+        upstream: dict[str, dict] | None = None,
+    ):
+        """
+        Build one section prompt from its declared inputs and call Gemini for it.
 
-        # -----------------------------
-        # 3. Parallel LLM calls
-        # -----------------------------
-        logger.info(f"Running parallel LLM calls for analysis_id={analysis.id}")
-        results = await asyncio.gather(
-            GeminiService.generate(story_prompt, AnalysisStoryResponse),
-            GeminiService.generate(brand_prompt, AnalysisBrandThemeResponse),
-            GeminiService.generate(taste_prompt, AnalysisTasteResponse),
-            GeminiService.generate(action_plan_prompt, AnalysisActionPlanResponse),
-            GeminiService.generate(marketplace_prompt, AnalysisMarketplaceResponse),
-            GeminiService.generate(packaging_prompt, AnalysisPackagingResponse),
-            GeminiService.generate(persona_prompt, AnalysisPersonaResponse),
-            GeminiService.generate(pricing_prompt, AnalysisPricingResponse),
-            GeminiService.generate(seo_prompt, AnalysisSEOResponse),
-            return_exceptions=True,
+        upstream holds the stored output of the sections it builds on.
+        """
+        if prefix is not None and section.shares_prefix:
+            # Image, context and vision are in the registered prefix
+            builder = section.prompt([], context, vision).with_upstream(upstream)
+            return await GeminiService.generate(
+                builder.build_suffix(), section.schema, cached_prefix=prefix, kind=section.name
+            )
+
+        builder = section.prompt(
+            images if IMAGE in section.inputs else [],
+            context if CONTEXT in section.inputs else None,
+            vision if VISION in section.inputs else None,
+        ).with_upstream(upstream)
+        return await GeminiService.generate(
+            builder.build_contents(),
+            section.schema,
+            system_instruction=builder.system_prompt,
+            kind=section.name,
+        )
+
+    @staticmethod
+    async def register_prefix(
+        images: list, context: str | None, vision: dict | str | None, cross_process: bool = False
+    ) -> CachedPrefix | None:
+        """Register the image/context/vision prefix shared by all section calls."""
+        contents = (
+            PromptBuilder().with_images(images).with_context(context).with_vision(vision).build_prefix()
+        )
+        return await context_cache.register(settings.GEMINI_LLM_MODEL, contents, cross_process)
+
+    @staticmethod
+    async def run_combined(db, analysis: Analysis, images: list, context: str | None, sections: list[Section]) -> list[Section]:
+        """
+        Generate several sections with a single Gemini call and store them.
+
+        Each key of the combined response is validated with its section's
+        own schema; sections that are missing or invalid are not stored and
+        are left for individual calls. Returns the sections that were stored.
+        """
+        # Rendered once, shared by the combined prompt and its section blocks
+        vision = render_vision(analysis.vision_result)
+        builder = PromptFactory.combined(
+            images,
+            context,
+            vision,
+            [(s.name, s.prompt([], context, vision)) for s in sections],
         )
 
-        story_res, brand_res, taste_res, action_plan_res, marketplace_res, packaging_res, persona_res, pricing_res, seo_res = results
+        logger.info(f"Running combined call for {len(sections)} section(s), analysis_id={analysis.id}")
+        try:
+            combined = await GeminiService.generate(
+                builder.build_contents(),
+                CombinedSectionsResponse,
+                system_instruction=builder.system_prompt,
+                kind="combined",
+            )
+        except (GeminiRateLimitError, CircuitOpenError):
+            raise
+        except GeminiError as e:
+            logger.warning(f"Combined call failed for analysis_id={analysis.id}, falling back: {e}")
+            return []
+
+        stored = []
+        for section in sections:
+            value = getattr(combined, section.name)
+            if value is None:
+                continue
+            try:
+                result = section.schema.model_validate(value)
+            except ValidationError as e:
+                logger.warning(f"Combined {section.name} invalid for analysis_id={analysis.id}: {e}")
+                continue
+
+            if not await AnalysisService.store_section(db, analysis.id, section, result):
+                result = None
+            await AnalysisService.set_section_status(db, analysis.id, section.name, AnalysisStatus.COMPLETED)
+            stored.append((section, result))
+
+        await db.commit()
+        for section, result in stored:
+            await AnalysisService.publish_section(analysis.id, section, AnalysisStatus.COMPLETED, result)
+        stored = [section for section, _ in stored]
+        logger.info(
+            f"Combined call stored {len(stored)}/{len(sections)} section(s) for analysis_id={analysis.id}"
+        )
+        return stored
+
+    @staticmethod
+    async def store_section(db, analysis_id: UUID, section: Section, result) -> bool:
+        """
+        Insert a section row unless one exists (caller commits).
+
+        A single INSERT ... ON CONFLICT (analysis_id) DO NOTHING, so racing
+        writers (a retried job, the combined call) cannot store a section
+        twice. Returns False when another writer got there first.
+        """
+        inserted = await db.scalar(
+            insert(section.model)
+            .values(analysis_id=analysis_id, **result.model_dump())
+            .on_conflict_do_nothing(index_elements=[section.model.analysis_id])
+            .returning(section.model.id)
+        )
+        if inserted is None:
+            logger.info(f"Section {section.name} already stored for analysis_id={analysis_id}")
+        return inserted is not None
+
+    @staticmethod
+    async def set_section_status(db, analysis_id: UUID, name: str, status: AnalysisStatus) -> None:
+        """
+        Update one entry of Analysis.section_status (caller commits).
+
+        Done as a single jsonb merge in SQL so concurrent section jobs do
+        not overwrite each other's entries.
+        """
+        await db.execute(
+            update(Analysis)
+            .where(Analysis.id == analysis_id)
+            .values(
+                section_status=func.coalesce(
+                    Analysis.section_status, func.jsonb_build_object()
+                ).op("||")(
+                    func.jsonb_build_object(cast(name, String), cast(status.value, String))
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def publish_section(analysis_id: UUID, section: Section, status: AnalysisStatus, result=None) -> None:
+        """Publish a section transition (with its payload once stored)."""
+        await events.publish(
+            analysis_id,
+            "section",
+            {
+                "name": section.name,
+                "status": status.value,
+                "data": result.model_dump(mode="json") if result is not None else None,
+            },
+        )
+
+    @staticmethod
+    async def missing_sections(db, analysis_id: UUID) -> list[Section]:
+        """Return the sections that have no stored row yet (one query)."""
+        present = (
+            await db.execute(
+                select(
+                    *(
+                        exists().where(s.model.analysis_id == analysis_id)
+                        for s in SECTIONS
+                    )
+                )
+            )
+        ).one()
+        return [s for s, p in zip(SECTIONS, present) if not p]
+
+    @staticmethod
+    async def section_outputs(db, analysis_id: UUID, names) -> dict[str, dict]:
+        """Stored content of the named sections (the upstream of a derived one)."""
+        outputs = {}
+        for name in names:
+            model = SECTIONS_BY_NAME[name].model
+            record = await db.scalar(select(model).where(model.analysis_id == analysis_id))
+            if record is not None:
+                outputs[name] = content_columns(record)
+        return outputs
+
+    @staticmethod
+    async def unblocked_sections(db, analysis: Analysis, section: Section) -> list[Section]:
+        """Missing sections that build on section and now have every input."""
+        dependents = [s for s in SECTIONS if section.name in s.upstream]
+        if not dependents:
+            return []
+        pending = {s.name for s in await AnalysisService.missing_sections(db, analysis.id)}
+        vision_ready = analysis.vision_result is not None
+        return [s for s in dependents if s.name in pending and s.ready(vision_ready, pending)]
+
+    @staticmethod
+    async def run_section(
+        db,
+        analysis: Analysis,
+        section: Section,
+        images: list,
+        context: str | None = None,
+        prefix: CachedPrefix | None = None,
+    ) -> None:
+        """
+        Generate and persist a single section (one job of the worker DAG).
+
+        Idempotent: a section whose row already exists is not regenerated,
+        and a racing writer's row is kept (see store_section).
+        """
+        existing = await db.scalar(
+            select(section.model.id).where(section.model.analysis_id == analysis.id)
+        )
+        if existing is not None:
+            logger.info(f"Section {section.name} already stored for analysis_id={analysis.id}")
+            return
+
+        await AnalysisService.set_section_status(db, analysis.id, section.name, AnalysisStatus.PROCESSING)
+        await db.commit()
+        await AnalysisService.publish_section(analysis.id, section, AnalysisStatus.PROCESSING)
+
+        try:
+            upstream = await AnalysisService.section_outputs(db, analysis.id, section.upstream)
+            result = await AnalysisService.generate_section(
+                section, images, context, analysis.vision_result, prefix, upstream
+            )
+        except Exception as e:
+            # An open circuit defers the job; the section is not failed yet
+            status = AnalysisStatus.PENDING if isinstance(e, CircuitOpenError) else AnalysisStatus.FAILED
+            await AnalysisService.set_section_status(db, analysis.id, section.name, status)
+            await db.commit()
+            await AnalysisService.publish_section(analysis.id, section, status)
+            raise
+
+        if not await AnalysisService.store_section(db, analysis.id, section, result):
+            result = None
+        await AnalysisService.set_section_status(db, analysis.id, section.name, AnalysisStatus.COMPLETED)
+        await db.commit()
+        await AnalysisService.publish_section(analysis.id, section, AnalysisStatus.COMPLETED, result)
+        logger.info(f"Section {section.name} stored for analysis_id={analysis.id}")
+
+    @staticmethod
+    async def complete_if_ready(db, analysis_id: UUID) -> bool:
+        """
+        Mark an analysis COMPLETED once every section row has landed.
+
+        Safe to call from concurrent section jobs: the status only moves
+        from PROCESSING, so a FAILED analysis is never flipped back, and
+        only the call that made the transition gets True.
+        """
+        if await AnalysisService.missing_sections(db, analysis_id):
+            return False
+
+        result = await db.execute(
+            update(Analysis)
+            .where(
+                Analysis.id == analysis_id,
+                Analysis.status == AnalysisStatus.PROCESSING.value,
+            )
+            .values(status=AnalysisStatus.COMPLETED.value, error=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        if result.rowcount:
+            logger.info(f"Analysis completed successfully for analysis_id={analysis_id}")
+            await events.publish(analysis_id, "status", {"status": AnalysisStatus.COMPLETED.value})
+            # First views of the result skip the database
+            await AnalysisService.cache_document(db, analysis_id)
+        return bool(result.rowcount)
+
+    @staticmethod
+    async def analyze_product(db, analysis: Analysis, images: list, context: str | None = None):
+        """
+        Run the whole pipeline in-process (development / Redis fallback).
+
+        Each section is committed as soon as its call returns, and only the
+        sections without a stored row are generated, so a retry after a
+        partial failure re-calls just the missing ones. Every call shares
+        one ANALYSIS_TIME_BUDGET deadline.
+        """
+        set_usage_tags(analysis.id, analysis.user_id)
+        with analysis_deadline(new_deadline()):
+            return await AnalysisService._analyze_product(db, analysis, images, context)
+
+    @staticmethod
+    async def _analyze_product(db, analysis: Analysis, images: list, context: str | None):
+        logger.info(f"Starting product analysis for analysis_id={analysis.id}")
+        missing = await AnalysisService.missing_sections(db, analysis.id)
 
         # -----------------------------
-        # 4. Handle errors
+        # 1. Combined call (optional): vision first, then one call for all
         # -----------------------------
-        for i, r in enumerate(results):
-            if isinstance(r, Exception):
-                logger.error(f"LLM call {i} failed for analysis_id={analysis.id}: {r}")
-                await db.rollback()
-                raise r
+        if settings.ANALYSIS_COMBINED_MODE and len(missing) > 1:
+            await AnalysisService.run_vision(db, analysis, images)
+            stored = await AnalysisService.run_combined(db, analysis, images, context, missing)
+            missing = [s for s in missing if s not in stored]
 
         # -----------------------------
-        # 5. Save child tables
+        # 2. Vision and the missing sections as a dependency graph
         # -----------------------------
-        logger.info(f"Saving analysis results for analysis_id={analysis.id}")
-        story_record = AnalysisStory(analysis_id=analysis.id, **story_res.model_dump())
-        brand_record = AnalysisBrandTheme(analysis_id=analysis.id, **brand_res.model_dump())
-        taste_record = AnalysisTaste(analysis_id=analysis.id, **taste_res.model_dump())
-        action_plan_record = AnalysisActionPlan(analysis_id=analysis.id, **action_plan_res.model_dump())
-        marketplace_record = AnalysisMarketplace(analysis_id=analysis.id, **marketplace_res.model_dump())
-        packaging_record = AnalysisPackaging(analysis_id=analysis.id, **packaging_res.model_dump())
-        persona_record = AnalysisPersona(analysis_id=analysis.id, **persona_res.model_dump())
-        pricing_record = AnalysisPricing(analysis_id=analysis.id, **pricing_res.model_dump())
-        seo_record = AnalysisSEO(analysis_id=analysis.id, **seo_res.model_dump())
-
-        db.add_all([
-            story_record, 
-            brand_record, 
-            taste_record,
-            action_plan_record,
-            marketplace_record,
-            packaging_record,
-            persona_record,
-            pricing_record,
-            seo_record
-        ])
+        await AnalysisService.run_graph(db, analysis, images, context, missing)
 
         # -----------------------------
-        # 6. Update status to COMPLETED
+        # 3. Update status to COMPLETED
         # -----------------------------
-        analysis.status = AnalysisStatus.COMPLETED.value
-
-        await db.commit()
+        await AnalysisService.complete_if_ready(db, analysis.id)
         await db.refresh(analysis)
-        
-        logger.info(f"Analysis completed successfully for analysis_id={analysis.id}")
 
         return analysis
+
+    @staticmethod
+    async def run_graph(db, analysis: Analysis, images: list, context: str | None, sections: list[Section]) -> None:
+        """
+        Run vision (unless stored) and sections, each as soon as its inputs are.
+
+        Image-only sections start alongside vision and derived sections right
+        after their upstream, so the critical path is the longest dependency
+        chain instead of vision plus the slowest section. Results are stored
+        as they land, from this coroutine only, so the session is never used
+        concurrently. A failed node blocks its dependents; the others still
+        run and the first error is raised at the end.
+        """
+        # Compact JSON rendered once for every section prompt
+        vision = render_vision(analysis.vision_result)
+        graph = section_graph(sections, vision_pending=vision is None)
+        names = {s.name for s in sections}
+        outputs = await AnalysisService.section_outputs(
+            db, analysis.id, {n for s in sections for n in s.upstream} - names
+        )
+        phash = analysis.phash
+        prefix = None
+        started: set[str] = set()
+        tasks: dict[asyncio.Future, str] = {}
+        errors: list[Exception] = []
+
+        async def share_prefix():
+            # Worth it once at least two calls will reference it
+            nonlocal prefix
+            waiting = [s for s in sections if s.shares_prefix and s.name not in started]
+            if len(waiting) > 1:
+                prefix = await AnalysisService.register_prefix(images, context, vision)
+
+        def start_ready():
+            for node in graph.get_ready():
+                started.add(node)
+                if node == VISION:
+                    coro = AnalysisService.compute_vision(images, phash)
+                else:
+                    section = SECTIONS_BY_NAME[node]
+                    upstream = {n: outputs[n] for n in section.upstream if n in outputs}
+                    coro = AnalysisService.generate_section(
+                        section, images, context, vision, prefix, upstream
+                    )
+                tasks[asyncio.ensure_future(coro)] = node
+
+        logger.info(
+            f"Running {len(sections) + (vision is None)} LLM call(s) for analysis_id={analysis.id}"
+        )
+        try:
+            if vision is not None:
+                await share_prefix()
+            start_ready()
+
+            # -----------------------------
+            # Persist each node as it lands, then start what it unblocked
+            # -----------------------------
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    node = tasks.pop(task)
+                    error = task.exception()
+
+                    if node == VISION:
+                        if error is not None:
+                            logger.error(f"Vision failed for analysis_id={analysis.id}: {error}")
+                            errors.append(error)
+                            continue
+                        vision = render_vision(
+                            await AnalysisService.store_vision(db, analysis, task.result())
+                        )
+                        await share_prefix()
+                        graph.done(node)
+                        continue
+
+                    section = SECTIONS_BY_NAME[node]
+                    result = None
+                    if error is not None:
+                        logger.error(f"LLM call {section.name} failed for analysis_id={analysis.id}: {error}")
+                        errors.append(error)
+                        status = AnalysisStatus.FAILED
+                    else:
+                        result = task.result()
+                        if await AnalysisService.store_section(db, analysis.id, section, result):
+                            outputs[node] = result.model_dump(mode="json")
+                        else:
+                            # Another writer won: dependents build on its row
+                            outputs.update(
+                                await AnalysisService.section_outputs(db, analysis.id, [node])
+                            )
+                            result = None
+                        status = AnalysisStatus.COMPLETED
+                    await AnalysisService.set_section_status(db, analysis.id, section.name, status)
+                    await db.commit()
+                    await AnalysisService.publish_section(analysis.id, section, status, result)
+                    if error is None:
+                        graph.done(node)
+
+                start_ready()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await context_cache.release(prefix)
+
+        if errors:
+            blocked = names - started
+            if blocked:
+                logger.warning(
+                    f"Not run after a failed input for analysis_id={analysis.id}: {sorted(blocked)}"
+                )
+            raise errors[0]
@@ -0,0 +1,116 @@
+"""
+Redis copy of rendered COMPLETED analyses.
+
+A completed analysis does not change until it is re-run, so its rendered
+GET /analysis/{id} body is kept in one hash per analysis
+(``analysis:{id}:document``) with the owner's user_id and a strong ETag.
+Repeat views are one HGETALL and no database access; the ownership check
+uses the stored user_id.
+
+The worker stores the document when an analysis completes, and the first
+reader stores it otherwise. Like the governor, the cache fails open: after
+a Redis error it is skipped for FAIL_OPEN_COOLDOWN seconds, so a missing
+Redis costs reads nothing. Any later status event other than COMPLETED
+(a re-run starting, a failure) deletes it, in the same pipeline that
+publishes the event (see app.services.events).
+"""
+import hashlib
+import logging
+import time
+from typing import Any
+from uuid import UUID
+
+from app.core.queue import get_redis_pool
+
+logger = logging.getLogger(__name__)
+
+# Seconds; an upper bound on staleness should an invalidation be missed
+DOCUMENT_TTL = 86400
+
+COMPLETED = "COMPLETED"
+
+# Skip the cache for this long after Redis errors
+FAIL_OPEN_COOLDOWN = 30.0
+
+_disabled_until = 0.0
+
+
+def key(analysis_id: UUID | str) -> str:
+    return f"analysis:{analysis_id}:document"
+
+
+def etag(body: bytes) -> str:
+    """Strong ETag of a rendered body."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def _available() -> bool:
+    return time.monotonic() >= _disabled_until
+
+
+def _fail_open(action: str, analysis_id: UUID | str, error: Exception) -> None:
+    global _disabled_until
+
+    logger.warning(
+        f"Document cache {action} failed for {analysis_id}, "
+        f"skipping the cache for {FAIL_OPEN_COOLDOWN:.0f}s: {error}"
+    )
+    _disabled_until = time.monotonic() + FAIL_OPEN_COOLDOWN
+
+
+def _text(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def invalidates(event: str, data: dict[str, Any]) -> bool:
+    """Whether a progress event makes a stored document stale."""
+    return event == "status" and data.get("status") != COMPLETED
+
+
+async def get(analysis_id: UUID | str) -> dict[str, Any] | None:
+    """Return {user_id, etag, body}, or None on a miss (or a Redis error)."""
+    if not _available():
+        return None
+    try:
+        redis = await get_redis_pool()
+        raw = await redis.hgetall(key(analysis_id))
+    except Exception as e:
+        _fail_open("read", analysis_id, e)
+        return None
+
+    fields = {_text(k): v for k, v in raw.items()}
+    if not {"user_id", "etag", "body"} <= fields.keys():
+        return None
+
+    body = fields["body"]
+    return {
+        "user_id": UUID(_text(fields["user_id"])),
+        "etag": _text(fields["etag"]),
+        "body": body if isinstance(body, bytes) else body.encode(),
+    }
+
+
+async def put(analysis_id: UUID | str, user_id: UUID, body: bytes, tag: str | None = None) -> None:
+    """Store a rendered COMPLETED document (best effort)."""
+    if not _available():
+        return
+    try:
+        redis = await get_redis_pool()
+        pipe = redis.pipeline(transaction=True)
+        pipe.hset(
+            key(analysis_id),
+            mapping={"user_id": str(user_id), "etag": tag or etag(body), "body": body},
+        )
+        pipe.expire(key(analysis_id), DOCUMENT_TTL)
+        await pipe.execute()
+    except Exception as e:
+        _fail_open("write", analysis_id, e)
+
+
+async def invalidate(analysis_id: UUID | str) -> None:
+    """Drop a stored document (best effort)."""
+    try:
+        redis = await get_redis_pool()
+        await redis.delete(key(analysis_id))
+    except Exception as e:
+        logger.warning(f"Document cache invalidation failed for {analysis_id}: {e}")
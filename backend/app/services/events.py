@@ -0,0 +1,197 @@
+"""
+Analysis progress events over Redis pub/sub.
+
+Producers (worker jobs and the in-process pipeline) publish status
+transitions and finished section payloads to ``analysis:{id}:events``.
+The API process keeps a single pattern subscription and fans messages
+out to local per-analysis queues, so any number of SSE clients share one
+Redis connection instead of holding one each.
+
+Publishing is best effort: a Redis outage never fails the pipeline, and
+SSE clients still get the current state from the database on connect.
+After a Redis error only the pub/sub message is paused; status cache
+writes and document invalidations are still attempted, so a blip cannot
+leave a stale status or document behind. They are retried briefly right
+after the error, and tried once per event during the cooldown, so a
+missing Redis never stalls the pipeline.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Any
+from uuid import UUID
+
+from app.core.queue import RedisUnavailableError, get_redis_pool
+from app.services import document_cache, status_cache
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PATTERN = "analysis:*:events"
+
+# Seconds to stop publishing after a Redis error (no Redis in dev mode)
+PUBLISH_COOLDOWN = 30
+
+# Attempts and base backoff (seconds) for status cache / invalidation writes
+STATE_WRITE_ATTEMPTS = 3
+STATE_WRITE_BACKOFF = 0.1
+
+_publish_disabled_until = 0.0
+
+
+def channel(analysis_id: UUID | str) -> str:
+    return f"analysis:{analysis_id}:events"
+
+
+def _queue_state(pipe, analysis_id: UUID | str, event: str, data: dict[str, Any]) -> bool:
+    """Queue the status cache / document cache writes of an event (False if none)."""
+    queued = False
+    fields = status_cache.fields_for_event(event, data)
+    if fields:
+        pipe.hset(status_cache.key(analysis_id), mapping=fields)
+        pipe.expire(status_cache.key(analysis_id), status_cache.STATUS_TTL)
+        queued = True
+    if document_cache.invalidates(event, data):
+        # A re-run or failure: the rendered COMPLETED document is stale
+        pipe.delete(document_cache.key(analysis_id))
+        queued = True
+    return queued
+
+
+async def _write_state(
+    analysis_id: UUID | str, event: str, data: dict[str, Any], attempts: int
+) -> None:
+    """Apply an event's cache writes without publishing, retrying briefly."""
+    for attempt in range(attempts):
+        try:
+            redis = await get_redis_pool()
+            pipe = redis.pipeline(transaction=True)
+            if not _queue_state(pipe, analysis_id, event, data):
+                return
+            await pipe.execute()
+            return
+        except Exception as e:
+            # No retry while the pool is known to be unreachable
+            if attempt == attempts - 1 or isinstance(e, RedisUnavailableError):
+                logger.warning(f"Status cache write failed for {analysis_id}: {e}")
+                return
+            await asyncio.sleep(STATE_WRITE_BACKOFF * (2 ** attempt))
+
+
+async def publish(analysis_id: UUID | str, event: str, data: dict[str, Any]) -> None:
+    """
+    Publish one event (best effort); status fields also go to status_cache,
+    and a non-COMPLETED status drops the document_cache entry.
+    """
+    global _publish_disabled_until
+
+    cooling = time.monotonic() < _publish_disabled_until
+    if not cooling:
+        try:
+            redis = await get_redis_pool()
+            pipe = redis.pipeline(transaction=True)
+            # Written before the publish, so woken listeners read the new state
+            _queue_state(pipe, analysis_id, event, data)
+            pipe.publish(
+                channel(analysis_id),
+                json.dumps({"event": event, "data": data}, default=str),
+            )
+            await pipe.execute()
+            return
+        except Exception as e:
+            logger.warning(f"Event publish failed, pausing for {PUBLISH_COOLDOWN}s: {e}")
+            _publish_disabled_until = time.monotonic() + PUBLISH_COOLDOWN
+
+    # The cache writes must not wait out the publish cooldown, but are only
+    # retried right after a failure
+    await _write_state(analysis_id, event, data, 1 if cooling else STATE_WRITE_ATTEMPTS)
+
+
+class EventHub:
+    """One Redis pattern subscription shared by every local listener."""
+
+    # Per-listener buffer; a client that falls this far behind is dropped
+    QUEUE_SIZE = 100
+
+    def __init__(self) -> None:
+        self._listeners: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self._task: asyncio.Task | None = None
+        self._ready = asyncio.Event()
+
+    async def _run(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                redis = await get_redis_pool()
+                pubsub = redis.pubsub()
+                await pubsub.psubscribe(CHANNEL_PATTERN)
+                self._ready.set()
+                async for message in pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    self._dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Event subscription lost, reconnecting: {e}")
+                await asyncio.sleep(1)
+            finally:
+                self._ready.clear()
+                if pubsub is not None:
+                    await pubsub.aclose()
+
+    def _dispatch(self, raw_channel: bytes | str, raw_data: bytes | str) -> None:
+        name = raw_channel.decode() if isinstance(raw_channel, bytes) else raw_channel
+        analysis_id = name.split(":")[1]
+        listeners = self._listeners.get(analysis_id)
+        if not listeners:
+            return
+
+        message = json.loads(raw_data)
+        for queue in list(listeners):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow client: drop it and leave a None sentinel so the
+                # stream ends and the client reconnects for a fresh snapshot
+                listeners.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def subscribe(self, analysis_id: UUID | str, timeout: float = 2.0) -> asyncio.Queue:
+        """
+        Register a listener; messages arrive as {"event", "data"} dicts.
+
+        Waits briefly for the shared subscription so events published right
+        after this returns are not missed; without Redis the queue simply
+        stays quiet.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+        queue: asyncio.Queue = asyncio.Queue(self.QUEUE_SIZE)
+        self._listeners[str(analysis_id)].add(queue)
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except TimeoutError:
+            logger.warning("Event subscription not ready, streaming snapshot only")
+        return queue
+
+    def unsubscribe(self, analysis_id: UUID | str, queue: asyncio.Queue) -> None:
+        key = str(analysis_id)
+        self._listeners[key].discard(queue)
+        if not self._listeners[key]:
+            del self._listeners[key]
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+event_hub = EventHub()
@@ -0,0 +1,149 @@
+"""
+Registry of the nine analysis sections.
+
+Each section ties together the ORM child table, the pydantic response
+schema, the prompt factory and the relationship name on Analysis, so code
+that handles "every section" iterates this registry instead of repeating
+nine near-identical lines.
+
+Sections also declare their inputs, which makes the registry a dependency
+graph: image and context are there from the start, "vision" once the
+vision stage is stored, and a section name once that section is stored.
+Image-only sections therefore run alongside vision, and derived sections
+(action_plan) build on the output of others.
+"""
+import graphlib
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic import BaseModel, create_model
+
+from app.models.analysis.action_plan import AnalysisActionPlan
+from app.models.analysis.brand_theme import AnalysisBrandTheme
+from app.models.analysis.marketplace import AnalysisMarketplace
+from app.models.analysis.packaging import AnalysisPackaging
+from app.models.analysis.persona import AnalysisPersona
+from app.models.analysis.pricing import AnalysisPricing
+from app.models.analysis.seo import AnalysisSEO
+from app.models.analysis.story import AnalysisStory
+from app.models.analysis.taste import AnalysisTaste
+from app.schemas.analysis_action_plan import AnalysisActionPlanResponse
+from app.schemas.analysis_branding import AnalysisBrandThemeResponse
+from app.schemas.analysis_marketplace import AnalysisMarketplaceResponse
+from app.schemas.analysis_packaging import AnalysisPackagingResponse
+from app.schemas.analysis_person import AnalysisPersonaResponse
+from app.schemas.analysis_pricing import AnalysisPricingResponse
+from app.schemas.analysis_seo import AnalysisSEOResponse
+from app.schemas.analysis_story import AnalysisStoryResponse
+from app.schemas.analysis_taste import AnalysisTasteResponse
+from app.services.ai.prompt_builder import PromptFactory
+
+# Inputs a section can declare besides other sections' names
+IMAGE = "image"
+CONTEXT = "context"
+VISION = "vision"
+DEFAULT_INPUTS = (IMAGE, CONTEXT, VISION)
+
+
+@dataclass(frozen=True)
+class Section:
+    """One analysis section (also the relationship name on Analysis)."""
+
+    name: str
+    model: type[Any]
+    schema: type[BaseModel]
+    prompt: Callable[..., Any]
+    # Cap on generated tokens (GEMINI_SECTION_MAX_OUTPUT_TOKENS_STR overrides)
+    max_output_tokens: int = 1024
+    # What the prompt is built from: IMAGE, CONTEXT, VISION, section names
+    inputs: tuple[str, ...] = DEFAULT_INPUTS
+
+    @property
+    def needs_vision(self) -> bool:
+        return VISION in self.inputs
+
+    @property
+    def upstream(self) -> tuple[str, ...]:
+        """Sections whose stored output this section's prompt includes."""
+        return tuple(i for i in self.inputs if i not in DEFAULT_INPUTS)
+
+    @property
+    def dependencies(self) -> tuple[str, ...]:
+        """Graph nodes that must be done first ("vision" and upstream sections)."""
+        return ((VISION,) if self.needs_vision else ()) + self.upstream
+
+    @property
+    def shares_prefix(self) -> bool:
+        """Whether the shared image/context/vision prefix matches its inputs."""
+        return set(DEFAULT_INPUTS) <= set(self.inputs)
+
+    def ready(self, vision_ready: bool, pending: set[str]) -> bool:
+        """Whether every input is available, given the sections still pending."""
+        return (vision_ready or not self.needs_vision) and not pending.intersection(self.upstream)
+
+
+SECTIONS: tuple[Section, ...] = (
+    Section("story", AnalysisStory, AnalysisStoryResponse, PromptFactory.story, 1536),
+    # Colors, taste and packaging are read off the image: no need to wait for vision
+    Section("brand_theme", AnalysisBrandTheme, AnalysisBrandThemeResponse, PromptFactory.brand_theme, 512, (IMAGE, CONTEXT)),
+    Section("taste", AnalysisTaste, AnalysisTasteResponse, PromptFactory.taste, 512, (IMAGE, CONTEXT)),
+    Section(
+        "action_plan", AnalysisActionPlan, AnalysisActionPlanResponse, PromptFactory.action_plan, 1536,
+        (*DEFAULT_INPUTS, "pricing", "persona"),
+    ),
+    Section("marketplace", AnalysisMarketplace, AnalysisMarketplaceResponse, PromptFactory.marketplace, 2048),
+    Section("packaging", AnalysisPackaging, AnalysisPackagingResponse, PromptFactory.packaging, 768, (IMAGE, CONTEXT)),
+    Section("persona", AnalysisPersona, AnalysisPersonaResponse, PromptFactory.persona, 1024),
+    Section("pricing", AnalysisPricing, AnalysisPricingResponse, PromptFactory.pricing, 768),
+    Section("seo", AnalysisSEO, AnalysisSEOResponse, PromptFactory.seo, 512),
+)
+
+SECTIONS_BY_NAME: dict[str, Section] = {s.name: s for s in SECTIONS}
+
+
+def section_graph(sections: list[Section], vision_pending: bool) -> graphlib.TopologicalSorter:
+    """
+    Prepared graph of the given sections (and vision, when still pending).
+
+    Dependencies on anything outside the graph are taken as already done.
+    """
+    nodes = {s.name for s in sections} | ({VISION} if vision_pending else set())
+    graph = graphlib.TopologicalSorter()
+    if vision_pending:
+        graph.add(VISION)
+    for s in sections:
+        graph.add(s.name, *(d for d in s.dependencies if d in nodes))
+    graph.prepare()
+    return graph
+
+
+def _check_graph() -> None:
+    """Fail at import on an unknown input or a cycle (graphlib.CycleError)."""
+    for section in SECTIONS:
+        for name in section.upstream:
+            if name not in SECTIONS_BY_NAME:
+                raise ValueError(f"Section {section.name} depends on unknown section {name}")
+    section_graph(list(SECTIONS), vision_pending=True)
+
+
+_check_graph()
+
+# Response of the combined single-call mode: one key per section, each
+# validated afterwards with the section's own schema
+CombinedSectionsResponse = create_model(
+    "CombinedSectionsResponse",
+    **{s.name: (dict[str, Any] | None, None) for s in SECTIONS},
+)
+
+# Columns that belong to the row itself rather than to the generated content
+_ROW_COLUMNS = {"id", "analysis_id", "created_at", "updated_at"}
+
+
+def content_columns(record: Any) -> dict[str, Any]:
+    """Return the generated-content columns of a section row."""
+    return {
+        c.key: getattr(record, c.key)
+        for c in record.__table__.columns
+        if c.key not in _ROW_COLUMNS
+    }
@@ -0,0 +1,123 @@
+"""
+Redis copy of each analysis' status fields.
+
+One hash per analysis (``analysis:{id}:status``) holding user_id, status,
+error and one ``section:{name}`` field per section. Progress events update
+it as they are published (see app.services.events), and status reads fill
+missing fields from the analyses row, so polling clients rarely touch the
+database.
+
+Read-through fills use HSETNX: a field written by an event is never
+overwritten by an older database read. Every write stamps ``updated_at``,
+so readers can tell a non-terminal state that stopped receiving events
+(a lost write) and re-read the row instead (see ``stale``).
+"""
+import logging
+import time
+from typing import Any
+from uuid import UUID
+
+from app.core.queue import get_redis_pool
+
+logger = logging.getLogger(__name__)
+
+# Seconds; refreshed on every update, so only idle analyses expire
+STATUS_TTL = 3600
+
+# Seconds a non-terminal state is trusted without a new write
+STALE_AFTER = 30
+
+SECTION_PREFIX = "section:"
+
+
+def key(analysis_id: UUID | str) -> str:
+    return f"analysis:{analysis_id}:status"
+
+
+def fields_for_event(event: str, data: dict[str, Any]) -> dict[str, str]:
+    """Hash fields changed by a progress event (empty if none)."""
+    if event == "status":
+        fields = {"status": data["status"], "error": data.get("error") or ""}
+    elif event == "section":
+        fields = {f"{SECTION_PREFIX}{data['name']}": data["status"]}
+    else:
+        return {}
+    fields["updated_at"] = str(time.time())
+    return fields
+
+
+def _decode(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+async def get(analysis_id: UUID | str) -> dict[str, Any] | None:
+    """
+    Return {user_id, status, error, section_status, updated_at}, or None
+    on a miss.
+
+    A hash without user_id or status (e.g. only section events seen so
+    far) counts as a miss. Redis errors count as misses too.
+    """
+    try:
+        redis = await get_redis_pool()
+        raw = await redis.hgetall(key(analysis_id))
+    except Exception as e:
+        logger.warning(f"Status cache read failed for {analysis_id}: {e}")
+        return None
+
+    fields = {_decode(k): _decode(v) for k, v in raw.items()}
+    if "user_id" not in fields or "status" not in fields:
+        return None
+
+    return {
+        "user_id": UUID(fields["user_id"]),
+        "status": fields["status"],
+        "error": fields.get("error") or None,
+        "section_status": {
+            k[len(SECTION_PREFIX):]: v
+            for k, v in fields.items()
+            if k.startswith(SECTION_PREFIX)
+        },
+        "updated_at": float(fields["updated_at"]) if "updated_at" in fields else None,
+    }
+
+
+def stale(state: dict[str, Any], terminal: set[str]) -> bool:
+    """Whether a cached non-terminal state is too old to trust."""
+    if state["status"] in terminal:
+        return False
+    updated_at = state.get("updated_at")
+    return updated_at is None or time.time() - updated_at > STALE_AFTER
+
+
+async def fill(
+    analysis_id: UUID | str,
+    user_id: UUID,
+    status: str,
+    error: str | None,
+    section_status: dict[str, str] | None,
+    replace: bool = False,
+) -> None:
+    """
+    Store fields read from the database (best effort).
+
+    Newer fields are kept unless replace is set, which is used to repair a
+    stale entry from the row.
+    """
+    fields = {"user_id": str(user_id), "status": status, "error": error or ""}
+    for name, value in (section_status or {}).items():
+        fields[f"{SECTION_PREFIX}{name}"] = value
+    fields["updated_at"] = str(time.time())
+
+    try:
+        redis = await get_redis_pool()
+        pipe = redis.pipeline(transaction=True)
+        if replace:
+            pipe.hset(key(analysis_id), mapping=fields)
+        else:
+            for field, value in fields.items():
+                pipe.hsetnx(key(analysis_id), field, value)
+        pipe.expire(key(analysis_id), STATUS_TTL)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Status cache fill failed for {analysis_id}: {e}")
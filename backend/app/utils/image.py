@@ -0,0 +1,142 @@
+"""
+Image normalization for uploaded product photos.
+
+Every upload is decoded exactly once, rotated according to its EXIF
+orientation, downscaled to a maximum edge and re-encoded as a compact
+WebP/JPEG. The normalized file is what gets stored and sent to Gemini.
+"""
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from uuid import uuid4
+
+from PIL import Image, ImageOps
+
+from app.utils.phash import dhash
+
+logger = logging.getLogger(__name__)
+
+# Output format -> (PIL format name, extension, MIME type)
+OUTPUT_FORMATS: dict[str, tuple[str, str, str]] = {
+    "webp": ("WEBP", "webp", "image/webp"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+    "jpg": ("JPEG", "jpg", "image/jpeg"),
+}
+
+_MIME_BY_EXTENSION = {
+    "webp": "image/webp",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+
+
+@dataclass
+class NormalizedImage:
+    """A normalized image written to the upload directory."""
+
+    path: Path
+    filename: str
+    mime_type: str
+    width: int
+    height: int
+    size: int
+    sha256: str
+    phash: str
+
+
+def mime_type_for(filename: str) -> str:
+    """Return the MIME type of a stored upload based on its extension."""
+    ext = filename.rsplit(".", 1)[-1].lower()
+    return _MIME_BY_EXTENSION.get(ext, "application/octet-stream")
+
+
+def _encode(img: Image.Image, pil_format: str, quality: int) -> bytes:
+    buf = io.BytesIO()
+    if pil_format == "JPEG":
+        img.save(buf, format="JPEG", quality=quality, optimize=True)
+    else:
+        img.save(buf, format=pil_format, quality=quality, method=4)
+    return buf.getvalue()
+
+
+def normalize_image(
+    src: Path,
+    dest_dir: Path,
+    max_edge: int,
+    output_format: str = "webp",
+    quality: int = 85,
+) -> NormalizedImage:
+    """
+    Decode an image once, fix orientation, downscale and re-encode it.
+
+    This is CPU bound; call it through asyncio.to_thread from async code.
+
+    Args:
+        src: Path of the raw upload
+        dest_dir: Directory where the normalized file is written
+        max_edge: Maximum width/height in pixels of the output
+        output_format: "webp" or "jpeg"
+        quality: Encoder quality (1-100)
+
+    Returns:
+        NormalizedImage describing the written file
+
+    Raises:
+        ValueError: If output_format is not supported
+        PIL.UnidentifiedImageError / OSError: If the image cannot be decoded
+    """
+    try:
+        pil_format, ext, mime = OUTPUT_FORMATS[output_format.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+    with Image.open(src) as img:
+        # Let the JPEG decoder scale down by a power of two while decoding
+        img.draft("RGB", (max_edge, max_edge))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+        has_alpha = img.mode in ("RGBA", "LA") or (
+            img.mode == "P" and "transparency" in img.info
+        )
+        if pil_format == "WEBP" and has_alpha:
+            img = img.convert("RGBA")
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        data = _encode(img, pil_format, quality)
+        width, height = img.size
+        phash = dhash(img)
+
+    filename = f"{uuid4()}.{ext}"
+    dest = dest_dir / filename
+
+    # Write to a temp file first so readers never see a partial image
+    fd, tmp_name = tempfile.mkstemp(prefix=".normalize-", suffix=".part", dir=dest_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(data)
+        os.replace(tmp_name, dest)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+    logger.debug(
+        f"Normalized {src.name} -> {filename}: {width}x{height}, {len(data)} bytes"
+    )
+
+    return NormalizedImage(
+        path=dest,
+        filename=filename,
+        mime_type=mime,
+        width=width,
+        height=height,
+        size=len(data),
+        sha256=hashlib.sha256(data).hexdigest(),
+        phash=phash,
+    )
@@ -0,0 +1,109 @@
+"""
+Perceptual hashing for near-duplicate product photos.
+
+A 64-bit difference hash (dHash) survives recompression, small crops and
+resizes, so two photos of the same product land a few bits apart. Hashes
+are stored as 16-char hex strings and searched with a BK-tree, which only
+visits the subtrees that can contain a match within the Hamming radius.
+"""
+from collections.abc import Hashable, Iterator
+from dataclasses import dataclass, field
+
+from PIL import Image
+
+HASH_SIZE = 8  # 8x8 = 64-bit hash
+
+
+def dhash(img: Image.Image, hash_size: int = HASH_SIZE) -> str:
+    """
+    Compute the difference hash of an image.
+
+    Args:
+        img: Decoded image (any mode)
+        hash_size: Side of the comparison grid (64 bits for the default 8)
+
+    Returns:
+        Hash as a zero-padded hex string
+    """
+    gray = img.convert("L").resize(
+        (hash_size + 1, hash_size), Image.Resampling.LANCZOS
+    )
+    pixels = gray.tobytes()
+    width = hash_size + 1
+
+    bits = 0
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def hamming(a: str, b: str) -> int:
+    """Number of differing bits between two hex hashes."""
+    return (int(a, 16) ^ int(b, 16)).bit_count()
+
+
+@dataclass
+class _Node:
+    hash: str
+    values: list[Hashable] = field(default_factory=list)
+    children: dict[int, "_Node"] = field(default_factory=dict)
+
+
+class BKTree:
+    """BK-tree over hex hashes using Hamming distance."""
+
+    def __init__(self) -> None:
+        self._root: _Node | None = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, hash_: str, value: Hashable) -> None:
+        """Insert a value under a hash (several values may share one hash)."""
+        self._size += 1
+        if self._root is None:
+            self._root = _Node(hash_, [value])
+            return
+
+        node = self._root
+        while True:
+            d = hamming(hash_, node.hash)
+            if d == 0:
+                node.values.append(value)
+                return
+            child = node.children.get(d)
+            if child is None:
+                node.children[d] = _Node(hash_, [value])
+                return
+            node = child
+
+    def search(self, hash_: str, max_distance: int) -> Iterator[tuple[int, Hashable]]:
+        """Yield (distance, value) for every entry within max_distance."""
+        if self._root is None:
+            return
+
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            d = hamming(hash_, node.hash)
+            if d <= max_distance:
+                for value in node.values:
+                    yield d, value
+            # Triangle inequality: only children in [d - r, d + r] can match
+            for child_d, child in node.children.items():
+                if d - max_distance <= child_d <= d + max_distance:
+                    stack.append(child)
+
+    def nearest(self, hash_: str, max_distance: int) -> tuple[int, Hashable] | None:
+        """Return the closest (distance, value) within max_distance, if any."""
+        best = None
+        for match in self.search(hash_, max_distance):
+            if best is None or match[0] < best[0]:
+                best = match
+                if best[0] == 0:
+                    break
+        return best
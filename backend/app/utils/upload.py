@@ -0,0 +1,147 @@
+"""
+Streaming upload helpers.
+
+Uploads are copied to a temporary file in fixed-size chunks so the request
+handler never holds the whole image in memory. The SHA-256 digest and the
+size limit are computed/enforced while streaming, and the image format is
+sniffed from the first bytes only.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+# Enough bytes to recognise every supported container (WebP needs 12).
+SNIFF_BYTES = 32
+
+# (format, canonical extension, MIME type) for each supported container
+_JPEG = ("JPEG", "jpg", "image/jpeg")
+_PNG = ("PNG", "png", "image/png")
+_WEBP = ("WEBP", "webp", "image/webp")
+
+
+class UploadError(Exception):
+    """Base exception for rejected uploads."""
+
+    pass
+
+
+class UploadTooLargeError(UploadError):
+    """Raised when the upload exceeds the configured size limit."""
+
+    pass
+
+
+class UnsupportedImageError(UploadError):
+    """Raised when the leading bytes do not match a supported image format."""
+
+    pass
+
+
+@dataclass
+class SpooledUpload:
+    """An upload that has been streamed to a temporary file on disk."""
+
+    path: Path
+    size: int
+    sha256: str
+    format: str
+    extension: str
+    mime_type: str
+
+    def discard(self) -> None:
+        """Remove the temporary file (idempotent)."""
+        self.path.unlink(missing_ok=True)
+
+
+def sniff_image_format(head: bytes) -> tuple[str, str, str] | None:
+    """
+    Detect the image format from the first bytes of a file.
+
+    Returns:
+        (format, extension, mime_type) or None if the format is not supported
+    """
+    if head.startswith(b"\xff\xd8\xff"):
+        return _JPEG
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return _PNG
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return _WEBP
+    return None
+
+
+async def spool_upload(
+    file: UploadFile,
+    dest_dir: Path,
+    max_size: int,
+    chunk_size: int = 1024 * 1024,
+) -> SpooledUpload:
+    """
+    Stream an UploadFile into a temporary file inside dest_dir.
+
+    Args:
+        file: Incoming upload
+        dest_dir: Directory for the temporary file (same filesystem as the
+            final destination so later renames are atomic)
+        max_size: Maximum accepted size in bytes
+        chunk_size: Read size per iteration
+
+    Returns:
+        SpooledUpload describing the temporary file
+
+    Raises:
+        UploadTooLargeError: If more than max_size bytes are received
+        UnsupportedImageError: If the leading bytes are not a supported image
+    """
+    fd, tmp_name = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=dest_dir)
+    tmp_path = Path(tmp_name)
+    hasher = hashlib.sha256()
+    size = 0
+    detected: tuple[str, str, str] | None = None
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+
+                if detected is None:
+                    detected = sniff_image_format(chunk[:SNIFF_BYTES])
+                    if detected is None:
+                        raise UnsupportedImageError("Unsupported or invalid image format")
+
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(
+                        f"Upload exceeds maximum size of {max_size} bytes"
+                    )
+
+                hasher.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+
+        if detected is None:
+            raise UnsupportedImageError("Empty upload")
+
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    fmt, ext, mime = detected
+    logger.debug(f"Spooled upload to {tmp_path.name}: {size} bytes, format={fmt}")
+
+    return SpooledUpload(
+        path=tmp_path,
+        size=size,
+        sha256=hasher.hexdigest(),
+        format=fmt,
+        extension=ext,
+        mime_type=mime,
+    )
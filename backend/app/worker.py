@@ -1,106 +1,343 @@
 """
 Async Redis Queue Worker for background image analysis processing.
 """
+import asyncio
 import logging
+import random
+import time
 from pathlib import Path
 from uuid import UUID
 
-from arq.connections import RedisSettings
-from PIL import Image
+from arq import Retry
+from arq.worker import func
 
 from app.config import settings
+from app.core.queue import build_redis_settings
 from app.database import AsyncSessionLocal
 from app.models.analysis.analysis import Analysis, AnalysisStatus
+from app.prompts.exceptions import CircuitOpenError
+from app.services import events
+from app.services.ai import model_registry, response_schemas
+from app.services.ai.context_cache import CachedPrefix, context_cache
+from app.services.ai.deadlines import analysis_deadline, new_deadline
+from app.services.ai.image_payload import load_image_payload
+from app.services.ai.usage import set_usage_tags
 from app.services.analysis_service import AnalysisService
+from app.services.sections import SECTIONS_BY_NAME
 
 logger = logging.getLogger(__name__)
 
 UPLOAD_DIR = Path("/app/uploads")
 
+# Seconds; multiplied by the try number for job retries
+RETRY_DELAY = 5
 
-async def process_analysis(ctx: dict, analysis_id: str, context_str: str | None = None) -> dict:
+# Seconds a job may outlive the analysis budget (DB writes, enqueues)
+JOB_TIMEOUT_MARGIN = 60
+
+# Errors a retry cannot fix
+PERMANENT_ERRORS = (FileNotFoundError,)
+
+
+async def _mark_failed(analysis_id: str, error: str) -> None:
+    """Set an analysis to FAILED in a fresh session."""
+    try:
+        async with AsyncSessionLocal() as db:
+            analysis = await db.get(Analysis, UUID(analysis_id))
+            if analysis:
+                analysis.status = AnalysisStatus.FAILED.value
+                analysis.error = error
+                await db.commit()
+        await events.publish(
+            analysis_id, "status", {"status": AnalysisStatus.FAILED.value, "error": error}
+        )
+    except Exception as commit_error:
+        logger.error(f"Failed to update error status: {commit_error}")
+
+
+async def _defer(
+    ctx: dict, function: str, error: CircuitOpenError, deadline: float | None, *args
+) -> dict:
+    """
+    Re-enqueue a job after an open circuit's cooldown instead of retrying.
+
+    ARQ retries are kept for real failures. The jittered delay spreads the
+    deferred jobs out so they don't all hit the half-open probe at once.
     """
-    Background task to process image analysis.
+    delay = error.retry_after * random.uniform(1.0, 1.5)
+    if deadline is not None and time.time() + delay > deadline:
+        await _mark_failed(args[0], f"Gemini unavailable: {error}")
+        return {"status": "error", "message": str(error)}
+
+    await ctx["redis"].enqueue_job(function, *args, _defer_by=delay)
+    logger.warning(f"{function} for {args[0]} deferred {delay:.0f}s: {error}")
+    return {"status": "deferred", "message": str(error)}
+
+
+async def _enqueue_sections(
+    ctx: dict,
+    analysis_id: str,
+    sections,
+    context_str: str | None,
+    prefix: CachedPrefix | None,
+    deadline: float | None,
+) -> None:
+    """
+    Queue section jobs; fixed job ids make a repeated enqueue a no-op.
+
+    Section results are not kept (see WorkerSettings), so an id is free
+    again once its job finished and a re-run of the analysis can reuse it;
+    a late duplicate finds the section stored and does nothing.
+    """
+    for section in sections:
+        await ctx["redis"].enqueue_job(
+            "process_section",
+            analysis_id,
+            section.name,
+            context_str,
+            prefix if section.shares_prefix else None,
+            deadline,
+            _job_id=f"analysis:{analysis_id}:{section.name}",
+        )
+
+
+async def _load_image(analysis: Analysis):
+    """Load the analysis' normalized upload as an ImagePayload."""
+    image_path = UPLOAD_DIR / analysis.image_filename
+    if not image_path.exists():
+        raise FileNotFoundError(f"Image file not found: {image_path}")
+    return await asyncio.to_thread(load_image_payload, image_path)
+
+
+async def process_analysis(
+    ctx: dict,
+    analysis_id: str,
+    context_str: str | None = None,
+    deadline: float | None = None,
+) -> dict:
+    """
+    Root job of the analysis DAG: fan out section jobs along the section graph.
+
+    Sections that only need the image are queued before vision runs, the
+    ones that need vision right after it is stored, and derived sections
+    (action_plan) by the job of their last upstream section. Each section
+    job runs independently on any worker; the last one to land marks the
+    analysis COMPLETED. All jobs of an analysis share one absolute
+    ANALYSIS_TIME_BUDGET deadline, passed along to the section jobs.
+
+    While the Gemini circuit is open the job is deferred, not failed.
+    Other errors are retried while tries and budget remain; retries are
+    re-enqueued with this run's deadline, so the budget is never renewed.
 
     Args:
         ctx: ARQ context dictionary
         analysis_id: UUID of the analysis record
         context_str: Optional context string for analysis
+        deadline: Budget of a deferred or retried run (a new one otherwise)
 
     Returns:
         dict with status and message
     """
     logger.info(f"Starting analysis processing for ID: {analysis_id}")
+    deadline = deadline or new_deadline()
 
-    async with AsyncSessionLocal() as db:
-        try:
-            # Fetch the analysis record
-            analysis = await db.get(Analysis, UUID(analysis_id))
-            if not analysis:
-                logger.error(f"Analysis {analysis_id} not found")
-                return {"status": "error", "message": "Analysis not found"}
-
-            # Update status to PROCESSING
-            analysis.status = AnalysisStatus.PROCESSING.value
-            await db.commit()
-            await db.refresh(analysis)
-
-            # Locate the image file
-            image_path = UPLOAD_DIR / analysis.image_filename
-            if not image_path.exists():
-                raise FileNotFoundError(f"Image file not found: {image_path}")
-
-            # Load the image
-            image = Image.open(image_path)
-            logger.info(f"Loaded image: {image_path}")
-
-            # Execute the analysis pipeline
-            await AnalysisService.analyze_product(
-                db=db,
-                analysis=analysis,
-                images=[image],
-                context=context_str,
-            )
-
-            # Status will be updated to COMPLETED by analyze_product
-            # But let's ensure it's committed
-            await db.commit()
-
-            logger.info(f"Analysis {analysis_id} completed successfully")
-            return {"status": "success", "analysis_id": analysis_id}
-
-        except Exception as e:
-            logger.exception(f"Error processing analysis {analysis_id}: {e}")
-
-            # Update status to FAILED and save error message
+    with analysis_deadline(deadline):
+        async with AsyncSessionLocal() as db:
+            try:
+                # Fetch the analysis record
+                analysis = await db.get(Analysis, UUID(analysis_id))
+                if not analysis:
+                    logger.error(f"Analysis {analysis_id} not found")
+                    return {"status": "error", "message": "Analysis not found"}
+                set_usage_tags(analysis.id, analysis.user_id)
+
+                # Update status to PROCESSING
+                analysis.status = AnalysisStatus.PROCESSING.value
+                await db.commit()
+                await db.refresh(analysis)
+                await events.publish(analysis_id, "status", {"status": AnalysisStatus.PROCESSING.value})
+
+                image = await _load_image(analysis)
+                missing = await AnalysisService.missing_sections(db, analysis.id)
+                queued: set[str] = set()
+
+                if settings.ANALYSIS_COMBINED_MODE and len(missing) > 1:
+                    await AnalysisService.run_vision(db, analysis, [image])
+                    stored = await AnalysisService.run_combined(
+                        db, analysis, [image], context_str, missing
+                    )
+                    missing = [s for s in missing if s not in stored]
+                elif analysis.vision_result is None:
+                    # Image-only sections overlap with the vision call
+                    pending = {s.name for s in missing}
+                    early = [s for s in missing if s.ready(False, pending)]
+                    await _enqueue_sections(ctx, analysis_id, early, context_str, None, deadline)
+                    queued.update(s.name for s in early)
+
+                await AnalysisService.run_vision(db, analysis, [image])
+
+                # Re-read: early sections may have landed meanwhile
+                missing = await AnalysisService.missing_sections(db, analysis.id)
+                if not missing:
+                    await AnalysisService.complete_if_ready(db, analysis.id)
+                    logger.info(f"Analysis {analysis_id} completed without fan-out")
+                    return {"status": "success", "analysis_id": analysis_id}
+
+                pending = {s.name for s in missing}
+                ready = [
+                    s for s in missing if s.name not in queued and s.ready(True, pending)
+                ]
+
+                # Shared image/context/vision prefix, referenced by the section
+                # jobs (derived sections get it from their upstream's job)
+                prefix = None
+                if len([s for s in missing if s.shares_prefix]) > 1:
+                    prefix = await AnalysisService.register_prefix(
+                        [image], context_str, analysis.vision_result, cross_process=True
+                    )
+
+            except CircuitOpenError as e:
+                return await _defer(
+                    ctx, "process_analysis", e, deadline, analysis_id, context_str, deadline
+                )
+
+            except Exception as e:
+                job_try = ctx.get("job_try", 1)
+                logger.exception(f"Error processing analysis {analysis_id} (try {job_try}): {e}")
+                defer = job_try * RETRY_DELAY
+                in_budget = time.time() + defer < deadline
+                if (
+                    not isinstance(e, PERMANENT_ERRORS)
+                    and job_try < WorkerSettings.max_tries
+                    and in_budget
+                ):
+                    # Not Retry: ARQ would re-run with the original args, and
+                    # a first run's deadline=None would start a new budget
+                    await ctx["redis"].enqueue_job(
+                        "process_analysis",
+                        analysis_id,
+                        context_str,
+                        deadline,
+                        _defer_by=defer,
+                        _job_try=job_try + 1,
+                    )
+                    return {"status": "retrying", "message": str(e)}
+
+                await _mark_failed(analysis_id, str(e))
+                return {"status": "error", "message": str(e)}
+
+    await _enqueue_sections(ctx, analysis_id, ready, context_str, prefix, deadline)
+
+    logger.info(f"Analysis {analysis_id}: enqueued {len(queued) + len(ready)} section jobs")
+    return {"status": "success", "analysis_id": analysis_id}
+
+
+async def process_section(
+    ctx: dict,
+    analysis_id: str,
+    section_name: str,
+    context_str: str | None = None,
+    prefix: CachedPrefix | None = None,
+    deadline: float | None = None,
+) -> dict:
+    """
+    Generate and store one analysis section, then try to complete the analysis.
+
+    Failures are retried by ARQ (only this section is re-run); once retries
+    are exhausted the analysis is marked FAILED. An open Gemini circuit
+    defers the job without using up a retry.
+
+    Args:
+        ctx: ARQ context dictionary
+        analysis_id: UUID of the analysis record
+        section_name: Name of the section (see app.services.sections)
+        context_str: Optional context string for analysis
+        prefix: Shared context prefix registered by process_analysis
+        deadline: Epoch seconds by which the analysis must finish
+
+    Returns:
+        dict with status and message
+    """
+    section = SECTIONS_BY_NAME[section_name]
+    job_try = ctx.get("job_try", 1)
+
+    # The prefix may have expired or been the cause of the failure; retries
+    # send the image inline
+    use_prefix = prefix if job_try == 1 and section.shares_prefix else None
+
+    with analysis_deadline(deadline):
+        async with AsyncSessionLocal() as db:
             try:
-                # Safely fetch analysis even if it wasn't set earlier
-                if 'analysis' not in locals() or analysis is None:
-                    analysis = await db.get(Analysis, UUID(analysis_id))
-                
-                if analysis:
-                    analysis.status = AnalysisStatus.FAILED.value
-                    analysis.error = str(e)
-                    await db.commit()
-            except Exception as commit_error:
-                logger.error(f"Failed to update error status: {commit_error}")
+                analysis = await db.get(Analysis, UUID(analysis_id))
+                if not analysis:
+                    logger.error(f"Analysis {analysis_id} not found")
+                    return {"status": "error", "message": "Analysis not found"}
+                set_usage_tags(analysis.id, analysis.user_id)
+
+                if analysis.status == AnalysisStatus.FAILED.value:
+                    return {"status": "skipped", "message": "Analysis already failed"}
 
-            return {"status": "error", "message": str(e)}
+                images = [] if use_prefix else [await _load_image(analysis)]
+                await AnalysisService.run_section(
+                    db, analysis, section, images, context_str, use_prefix
+                )
+
+                # Sections waiting on this one's output
+                unblocked = await AnalysisService.unblocked_sections(db, analysis, section)
+                await _enqueue_sections(ctx, analysis_id, unblocked, context_str, prefix, deadline)
+
+                if await AnalysisService.complete_if_ready(db, analysis.id):
+                    await context_cache.release(prefix)
+
+                return {"status": "success", "analysis_id": analysis_id, "section": section_name}
+
+            except CircuitOpenError as e:
+                # Same job id is still taken by this run, so a new job is queued
+                return await _defer(
+                    ctx,
+                    "process_section",
+                    e,
+                    deadline,
+                    analysis_id,
+                    section_name,
+                    context_str,
+                    prefix,
+                    deadline,
+                )
+
+            except Exception as e:
+                logger.exception(
+                    f"Error processing section {section_name} of {analysis_id} (try {job_try}): {e}"
+                )
+                defer = job_try * RETRY_DELAY
+                # No retry that could only start after the budget is spent
+                in_budget = deadline is None or time.time() + defer < deadline
+                if (
+                    not isinstance(e, PERMANENT_ERRORS)
+                    and job_try < WorkerSettings.max_tries
+                    and in_budget
+                ):
+                    raise Retry(defer=defer)
+
+                await _mark_failed(analysis_id, f"{section_name}: {e}")
+                await context_cache.release(prefix)
+                return {"status": "error", "message": str(e)}
 
 
 class WorkerSettings:
     """ARQ Worker Settings."""
 
-    functions = [process_analysis]
+    # Section results are dropped so their fixed job ids can be reused
+    functions = [process_analysis, func(process_section, keep_result=0)]
 
-    redis_settings = RedisSettings(
-        host=settings.REDIS_HOST,
-        port=settings.REDIS_PORT,
-    )
+    redis_settings = build_redis_settings()
 
     # Concurrency and job settings
-    max_jobs = 5  # Limit concurrent jobs to avoid overload
-    job_timeout = 600  # 10 minutes timeout for analysis jobs
+    # Section jobs are a single Gemini call, so this bounds per-worker call concurrency
+    max_jobs = settings.WORKER_MAX_JOBS
+    # process_analysis may run vision plus the combined call; every call of
+    # an analysis is bounded by its budget
+    job_timeout = settings.ANALYSIS_TIME_BUDGET + JOB_TIMEOUT_MARGIN
     max_tries = 3  # Retry failed jobs up to 3 times
     
     # Use default ARQ queue (arq:queue)
@@ -128,6 +365,10 @@ class WorkerSettings:
             error_msg = "Worker configuration validation failed: " + ", ".join(errors)
             logger.error(error_msg)
             raise RuntimeError(error_msg)
+
+        # Vision + section models and their response schemas are reused by every job
+        model_registry.warm_up()
+        response_schemas.warm_up()
         
         logger.info("ARQ Worker started successfully")
         logger.info(f"Environment: {settings.ENVIRONMENT}")
@@ -0,0 +1,89 @@
+import asyncio
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.analysis_service import AnalysisService, decode_cursor, encode_cursor
+
+Row = namedtuple("Row", "id image_url status created_at")
+
+
+class FakeSession:
+    """Returns canned rows and keeps the statement it was given."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statement = None
+
+    async def execute(self, statement):
+        self.statement = statement
+        rows = self.rows
+
+        class Result:
+            def all(self):
+                return rows
+
+        return Result()
+
+    def sql(self) -> str:
+        return str(
+            self.statement.compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+        )
+
+
+def _rows(count: int) -> list[Row]:
+    start = datetime(2026, 10, 17, 12, 0, 0)
+    return [
+        Row(uuid.uuid4(), f"/uploads/{i}.webp", "COMPLETED", start - timedelta(minutes=i))
+        for i in range(count)
+    ]
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 10, 17, 12, 30, 5, 123456)
+    analysis_id = uuid.uuid4()
+    cursor = encode_cursor(created_at, analysis_id)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, analysis_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", encode_cursor(datetime.now(), uuid.uuid4())[:-4]])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_list_page_returns_next_cursor_when_more_rows():
+    rows = _rows(4)
+    db = FakeSession(rows)
+    page, cursor = asyncio.run(AnalysisService.list_page(db, uuid.uuid4(), limit=3))
+
+    assert page == rows[:3]
+    assert decode_cursor(cursor) == (rows[2].created_at, rows[2].id)
+    sql = db.sql()
+    assert "ORDER BY analyses.created_at DESC, analyses.id DESC" in sql
+    assert "LIMIT 4" in sql
+
+
+def test_list_page_last_page_has_no_cursor():
+    rows = _rows(2)
+    page, cursor = asyncio.run(AnalysisService.list_page(FakeSession(rows), uuid.uuid4(), limit=3))
+    assert page == rows
+    assert cursor is None
+
+
+def test_list_page_continues_after_the_cursor():
+    last_id = uuid.uuid4()
+    db = FakeSession([])
+    cursor = encode_cursor(datetime(2026, 10, 17, 12, 0, 0), last_id)
+    asyncio.run(AnalysisService.list_page(db, uuid.uuid4(), limit=3, cursor=cursor, status="COMPLETED"))
+
+    sql = db.sql()
+    assert "(analyses.created_at, analyses.id) < ('2026-10-17 12:00:00'" in sql
+    assert str(last_id) in sql
+    assert "analyses.status = 'COMPLETED'" in sql
@@ -0,0 +1,254 @@
+import asyncio
+import copy
+import pickle
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from app.config import settings
+from app.prompts.exceptions import CircuitOpenError, GeminiTimeoutError
+from app.services.ai import circuit_breaker as breaker_module
+from app.services.ai.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breaker_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def breaker_settings(monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_ENABLED", True)
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_BACKEND", "local")
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_MIN_CALLS", 4)
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_FAILURE_RATE", 0.5)
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_SLOW_RATE", 0.8)
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_SLOW_CALL", 45.0)
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_OPEN_SECONDS", 30.0)
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_HALF_OPEN_CALLS", 2)
+
+
+async def _ok():
+    return "ok"
+
+
+async def _fail():
+    raise ValueError("provider error")
+
+
+def _call(breaker: CircuitBreaker, request) -> str:
+    """One guarded call whose provider request is measured."""
+    return asyncio.run(breaker.guard(lambda: breaker.measure(request)))
+
+
+def _outcome(breaker: CircuitBreaker, request) -> None:
+    try:
+        _call(breaker, request)
+    except ValueError:
+        pass
+
+
+def _open(breaker: CircuitBreaker) -> None:
+    for _ in range(settings.GEMINI_BREAKER_MIN_CALLS):
+        _outcome(breaker, _fail)
+    assert breaker.state == OPEN
+
+
+def test_stays_closed_below_min_calls(clock):
+    breaker = CircuitBreaker("flash")
+    for _ in range(settings.GEMINI_BREAKER_MIN_CALLS - 1):
+        _outcome(breaker, _fail)
+    assert breaker.state == CLOSED
+
+
+def test_opens_on_failure_rate_and_fails_fast(clock):
+    breaker = CircuitBreaker("flash")
+    _outcome(breaker, _ok)
+    _outcome(breaker, _fail)
+    _outcome(breaker, _ok)
+    assert breaker.state == CLOSED
+    _outcome(breaker, _fail)
+    assert breaker.state == OPEN
+
+    called = []
+
+    async def request():
+        called.append(1)
+        return "ok"
+
+    with pytest.raises(CircuitOpenError) as info:
+        _call(breaker, request)
+    assert not called
+    assert info.value.retry_after == pytest.approx(30.0)
+
+
+def test_opens_on_slow_calls(clock, monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_WINDOW", 600.0)
+    breaker = CircuitBreaker("flash")
+
+    async def slow():
+        clock.now += 50
+        return "ok"
+
+    for _ in range(settings.GEMINI_BREAKER_MIN_CALLS):
+        _call(breaker, slow)
+    assert breaker.state == OPEN
+
+
+def test_old_outcomes_leave_the_window(clock, monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_WINDOW", 60.0)
+    breaker = CircuitBreaker("flash")
+    for _ in range(3):
+        _outcome(breaker, _fail)
+    clock.now += 61
+    _outcome(breaker, _fail)
+    assert breaker.state == CLOSED
+
+
+def test_errors_outside_the_request_are_not_outcomes(clock):
+    breaker = CircuitBreaker("flash")
+
+    async def budget_exhausted():
+        raise GeminiTimeoutError("Analysis time budget exhausted before call")
+
+    async def rate_limited():
+        raise google_exceptions.ResourceExhausted("429")
+
+    for _ in range(10):
+        with pytest.raises(GeminiTimeoutError):
+            asyncio.run(breaker.guard(budget_exhausted))
+        with pytest.raises(google_exceptions.ResourceExhausted):
+            _call(breaker, rate_limited)
+
+    assert breaker.state == CLOSED
+    assert not breaker._outcomes
+
+
+def test_half_open_probes_close_on_success(clock):
+    breaker = CircuitBreaker("flash")
+    _open(breaker)
+
+    clock.now += 31
+    _call(breaker, _ok)
+    assert breaker.state == HALF_OPEN
+    _call(breaker, _ok)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_failure_reopens(clock):
+    breaker = CircuitBreaker("flash")
+    _open(breaker)
+
+    clock.now += 31
+    _outcome(breaker, _fail)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        _call(breaker, _ok)
+
+
+def test_half_open_limits_probes_in_flight(clock):
+    breaker = CircuitBreaker("flash")
+    _open(breaker)
+    clock.now += 31
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def held():
+            await gate.wait()
+            return "ok"
+
+        probes = [
+            asyncio.ensure_future(breaker.guard(lambda: breaker.measure(held)))
+            for _ in range(settings.GEMINI_BREAKER_HALF_OPEN_CALLS)
+        ]
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            await breaker.guard(lambda: breaker.measure(_ok))
+        gate.set()
+        await asyncio.gather(*probes)
+
+    asyncio.run(scenario())
+    assert breaker.state == CLOSED
+
+
+def test_unmeasured_probe_gives_its_slot_back(clock):
+    breaker = CircuitBreaker("flash")
+    _open(breaker)
+    clock.now += 31
+
+    async def budget_exhausted():
+        raise GeminiTimeoutError("Analysis time budget exhausted before call")
+
+    for _ in range(settings.GEMINI_BREAKER_HALF_OPEN_CALLS + 1):
+        with pytest.raises(GeminiTimeoutError):
+            asyncio.run(breaker.guard(budget_exhausted))
+    assert breaker.state == HALF_OPEN
+    assert breaker._probes == 0
+
+
+def test_disabled_breaker_passes_through(clock, monkeypatch):
+    breaker = CircuitBreaker("flash")
+    _open(breaker)
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_ENABLED", False)
+    assert _call(breaker, _ok) == "ok"
+
+
+def test_shared_flag_is_polled_not_read_per_call(clock, monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_BACKEND", "redis")
+    reads = []
+
+    class FakeRedis:
+        async def pttl(self, key):
+            reads.append(key)
+            return -2
+
+    async def pool():
+        return FakeRedis()
+
+    monkeypatch.setattr(breaker_module, "get_redis_pool", pool)
+    breaker = CircuitBreaker("flash")
+
+    for _ in range(5):
+        _call(breaker, _ok)
+    assert reads == ["gemini:breaker:flash:open"]
+
+    clock.now += breaker_module.SHARED_POLL_INTERVAL
+    _call(breaker, _ok)
+    assert len(reads) == 2
+
+
+def test_shared_open_flag_fails_fast(clock, monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_BACKEND", "redis")
+
+    class FakeRedis:
+        async def pttl(self, key):
+            return 12_000
+
+    async def pool():
+        return FakeRedis()
+
+    monkeypatch.setattr(breaker_module, "get_redis_pool", pool)
+    breaker = CircuitBreaker("flash")
+
+    with pytest.raises(CircuitOpenError) as info:
+        _call(breaker, _ok)
+    assert info.value.retry_after == pytest.approx(12.0)
+
+
+@pytest.mark.parametrize("clone", [lambda e: pickle.loads(pickle.dumps(e)), copy.copy, copy.deepcopy])
+def test_circuit_open_error_pickles_and_copies(clone):
+    error = clone(CircuitOpenError("Circuit for flash is open", 7.5))
+    assert isinstance(error, CircuitOpenError)
+    assert error.retry_after == 7.5
+    assert error.message == str(error) == "Circuit for flash is open"
@@ -0,0 +1,148 @@
+import asyncio
+import io
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy.dialects import postgresql
+
+import app.models  # noqa: F401  (registers every mapper)
+from app.config import settings
+from app.core.auth import get_current_user
+from app.database import get_db
+from app.models.analysis.analysis import Analysis, AnalysisStatus
+from app.routers import analysis_router
+from app.services.analysis_service import AnalysisService
+from app.services.sections import SECTIONS_BY_NAME
+
+USER_ID = uuid.uuid4()
+
+
+class FakeSession:
+    """Keeps the executed statement and what the route adds/commits."""
+
+    def __init__(self):
+        self.statement = None
+        self.added = []
+
+    async def execute(self, statement):
+        self.statement = statement
+        return SimpleNamespace(scalar_one_or_none=lambda: None)
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def commit(self):
+        pass
+
+    async def refresh(self, obj):
+        obj.id = obj.id or uuid.uuid4()
+
+
+def test_content_key_covers_image_context_and_models(monkeypatch):
+    key = AnalysisService.content_key("a" * 64, "halal snack")
+    assert key == AnalysisService.content_key("a" * 64, "halal snack")
+    assert len(key) == 64
+    assert key != AnalysisService.content_key("b" * 64, "halal snack")
+    assert key != AnalysisService.content_key("a" * 64, None)
+    # Part boundaries are kept: moving text between parts changes the key
+    assert AnalysisService.content_key("a" * 64, None) != AnalysisService.content_key("a" * 63, "a")
+
+    monkeypatch.setattr(settings, "GEMINI_LLM_MODEL", "another-model")
+    assert key != AnalysisService.content_key("a" * 64, "halal snack")
+
+
+def test_find_completed_by_content_key_is_scoped_to_the_user():
+    db = FakeSession()
+
+    assert asyncio.run(AnalysisService.find_completed_by_content_key(db, "k" * 64, USER_ID)) is None
+
+    sql = str(db.statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    assert f"analyses.content_key = '{'k' * 64}'" in sql
+    assert f"analyses.user_id = '{USER_ID}'" in sql
+    assert "analyses.status = 'COMPLETED'" in sql
+
+
+def _completed() -> Analysis:
+    source = Analysis(
+        id=uuid.uuid4(),
+        user_id=USER_ID,
+        image_url="/uploads/a.webp",
+        image_filename="a.webp",
+        content_key="k" * 64,
+        phash="0" * 16,
+        vision_result={"labels": ["tea"]},
+        status=AnalysisStatus.COMPLETED.value,
+    )
+    source.pricing = SECTIONS_BY_NAME["pricing"].model(recommended_price=12.5, reasoning="cheap")
+    return source
+
+
+def test_clone_completed_copies_the_stored_sections():
+    source = _completed()
+    db = FakeSession()
+
+    clone = AnalysisService.clone_completed(db, source, USER_ID)
+
+    assert db.added == [clone]
+    assert clone.user_id == USER_ID
+    assert clone.status == AnalysisStatus.COMPLETED.value
+    assert (clone.image_filename, clone.content_key, clone.vision_result) == (
+        "a.webp",
+        "k" * 64,
+        {"labels": ["tea"]},
+    )
+    assert clone.pricing is not source.pricing
+    assert (clone.pricing.recommended_price, clone.pricing.reasoning) == (12.5, "cheap")
+    assert clone.section_status == {"pricing": AnalysisStatus.COMPLETED.value}
+    assert clone.story is None
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(analysis_router, "UPLOAD_DIR", tmp_path)
+    app = FastAPI()
+    app.include_router(analysis_router.router)
+    db = FakeSession()
+
+    async def current_user():
+        return SimpleNamespace(id=USER_ID)
+
+    async def session():
+        yield db
+
+    app.dependency_overrides[get_current_user] = current_user
+    app.dependency_overrides[get_db] = session
+    return TestClient(app), db
+
+
+def _png() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (32, 32), "teal").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_upload_reuses_only_the_users_own_analysis(client, monkeypatch, tmp_path):
+    client, db = client
+    (tmp_path / "a.webp").write_bytes(b"shared")
+    existing = _completed()
+    lookups = []
+
+    async def find(db, content_key, user_id):
+        lookups.append((content_key, user_id))
+        return existing
+
+    monkeypatch.setattr(AnalysisService, "find_completed_by_content_key", staticmethod(find))
+
+    response = client.post("/analysis", files={"file": ("p.png", _png(), "image/png")})
+
+    assert response.status_code == 202
+    assert response.json()["data"]["status"] == AnalysisStatus.COMPLETED.value
+    assert lookups[0][1] == USER_ID
+    (clone,) = db.added
+    assert clone.user_id == USER_ID
+    # The freshly normalized duplicate is dropped; the source file is shared
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.webp"]
@@ -0,0 +1,202 @@
+import asyncio
+import time
+
+import pytest
+
+from app import worker
+from app.config import settings
+from app.prompts.exceptions import GeminiTimeoutError
+from app.services.ai import deadlines
+from app.services.ai.deadlines import analysis_deadline, hedged, remaining, run_call
+
+
+class Calls:
+    """Coroutine factory whose Nth call sleeps delays[N] and returns N (or raises)."""
+
+    def __init__(self, *delays: float, fail: set[int] = frozenset()) -> None:
+        self.delays = delays
+        self.fail = fail
+        self.started = 0
+        self.cancelled: list[int] = []
+
+    async def __call__(self) -> int:
+        n = self.started
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delays[n])
+        except asyncio.CancelledError:
+            self.cancelled.append(n)
+            raise
+        if n in self.fail:
+            raise RuntimeError(f"call {n} failed")
+        return n
+
+
+@pytest.fixture(autouse=True)
+def fresh_latency(monkeypatch):
+    monkeypatch.setattr(deadlines, "latency", deadlines.LatencyTracker())
+    monkeypatch.setattr(deadlines, "note_hedge", lambda: None)
+
+
+def test_analysis_deadline_keeps_the_earlier_one():
+    now = time.time()
+    assert remaining() is None
+    with analysis_deadline(now + 100):
+        with analysis_deadline(now + 500):
+            assert remaining() <= 100
+        with analysis_deadline(None):
+            assert remaining() <= 100
+        with analysis_deadline(now + 10):
+            assert remaining() <= 10
+    assert remaining() is None
+
+
+def test_hedged_without_delay_makes_one_call():
+    calls = Calls(0.01)
+    assert asyncio.run(hedged(calls, None)) == 0
+    assert calls.started == 1
+
+
+def test_hedged_fast_call_is_not_duplicated():
+    calls = Calls(0.0, 0.0)
+    assert asyncio.run(hedged(calls, 0.5)) == 0
+    assert calls.started == 1
+
+
+def test_hedged_returns_first_success_and_cancels_the_other():
+    calls = Calls(1.0, 0.01)
+    assert asyncio.run(hedged(calls, 0.01)) == 1
+    assert calls.started == 2
+    assert calls.cancelled == [0]
+
+
+def test_hedged_falls_back_when_one_call_fails():
+    calls = Calls(0.05, 0.0, fail={1})
+    assert asyncio.run(hedged(calls, 0.01)) == 0
+
+
+def test_hedged_raises_when_every_call_fails():
+    calls = Calls(0.05, 0.0, fail={0, 1})
+    with pytest.raises(RuntimeError):
+        asyncio.run(hedged(calls, 0.01))
+
+
+def test_run_call_records_latency(monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_HEDGE_MIN_SAMPLES", 1)
+    assert asyncio.run(run_call("story", Calls(0.0))) == 0
+    assert deadlines.latency.p95("story") is not None
+    assert deadlines.latency.p95("seo") is None
+
+
+def test_run_call_times_out(monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_CALL_TIMEOUT", 0.01)
+    with pytest.raises(GeminiTimeoutError):
+        asyncio.run(run_call("story", Calls(1.0)))
+    assert deadlines.latency.p95("story") is None
+
+
+def test_run_call_is_capped_by_the_analysis_budget():
+    async def scenario():
+        with analysis_deadline(time.time() + 0.01):
+            return await run_call("story", Calls(1.0))
+
+    started = time.monotonic()
+    with pytest.raises(GeminiTimeoutError):
+        asyncio.run(scenario())
+    assert time.monotonic() - started < 0.5
+
+
+def test_run_call_skips_the_call_once_the_budget_is_spent():
+    calls = Calls(0.0)
+
+    async def scenario():
+        with analysis_deadline(time.time() - 1):
+            return await run_call("story", calls)
+
+    with pytest.raises(GeminiTimeoutError, match="budget exhausted"):
+        asyncio.run(scenario())
+    assert calls.started == 0
+
+
+def test_run_call_hedges_after_p95(monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_HEDGE_ENABLED", True)
+    monkeypatch.setattr(settings, "GEMINI_HEDGE_MIN_SAMPLES", 1)
+    deadlines.latency.record("story", 0.01)
+    calls = Calls(1.0, 0.0)
+    assert asyncio.run(run_call("story", calls)) == 1
+    assert calls.cancelled == [0]
+
+
+class FailingSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get(self, model, key):
+        raise RuntimeError("database went away")
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.jobs: list[tuple[tuple, dict]] = []
+
+    async def enqueue_job(self, *args, **kwargs):
+        self.jobs.append((args, kwargs))
+
+
+@pytest.fixture
+def failing_worker(monkeypatch):
+    failed: list[str] = []
+
+    async def mark_failed(analysis_id, message):
+        failed.append(analysis_id)
+
+    monkeypatch.setattr(worker, "AsyncSessionLocal", FailingSession)
+    monkeypatch.setattr(worker, "_mark_failed", mark_failed)
+    return failed
+
+
+def test_retry_keeps_the_first_runs_deadline(failing_worker):
+    redis = FakeRedis()
+    analysis_id = "00000000-0000-0000-0000-000000000001"
+    before = time.time()
+
+    result = asyncio.run(worker.process_analysis({"redis": redis, "job_try": 1}, analysis_id, "ctx"))
+
+    assert result["status"] == "retrying"
+    (args, kwargs), = redis.jobs
+    assert args[:3] == ("process_analysis", analysis_id, "ctx")
+    assert before + settings.ANALYSIS_TIME_BUDGET <= args[3] <= time.time() + settings.ANALYSIS_TIME_BUDGET
+    assert kwargs == {"_defer_by": worker.RETRY_DELAY, "_job_try": 2}
+
+    # The retried run re-enqueues with the same deadline again
+    asyncio.run(worker.process_analysis({"redis": redis, "job_try": 2}, *args[1:]))
+    assert redis.jobs[1][0][3] == args[3]
+    assert not failing_worker
+
+
+def test_no_retry_past_the_deadline(failing_worker):
+    redis = FakeRedis()
+    analysis_id = "00000000-0000-0000-0000-000000000001"
+
+    result = asyncio.run(
+        worker.process_analysis({"redis": redis, "job_try": 1}, analysis_id, None, time.time() + 1)
+    )
+
+    assert result["status"] == "error"
+    assert not redis.jobs
+    assert failing_worker == [analysis_id]
+
+
+def test_no_retry_after_max_tries(failing_worker):
+    redis = FakeRedis()
+    job_try = worker.WorkerSettings.max_tries
+
+    result = asyncio.run(
+        worker.process_analysis({"redis": redis, "job_try": job_try}, "00000000-0000-0000-0000-000000000001")
+    )
+
+    assert result["status"] == "error"
+    assert not redis.jobs
@@ -0,0 +1,123 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.auth import get_current_user_id
+from app.database import get_db
+from app.routers import analysis_router
+from app.services import document_cache
+
+USER_ID = uuid.uuid4()
+BODY = b'{"success":true,"data":{"status":"COMPLETED"}}'
+ETAG = document_cache.etag(BODY)
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(analysis_router.router)
+
+    async def user_id():
+        return USER_ID
+
+    async def db():
+        yield None
+
+    app.dependency_overrides[get_current_user_id] = user_id
+    app.dependency_overrides[get_db] = db
+    return TestClient(app)
+
+
+@pytest.fixture
+def cached(monkeypatch):
+    """Serve every document from a stub document_cache."""
+    entries = {}
+
+    async def get(analysis_id):
+        return entries.get(analysis_id)
+
+    monkeypatch.setattr(document_cache, "get", get)
+    return entries
+
+
+def test_cached_document_carries_an_etag(client, cached):
+    analysis_id = uuid.uuid4()
+    cached[analysis_id] = {"user_id": USER_ID, "etag": ETAG, "body": BODY}
+
+    response = client.get(f"/analysis/{analysis_id}")
+
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["etag"] == ETAG
+    assert response.headers["cache-control"] == "private, no-cache"
+
+
+@pytest.mark.parametrize("header", [ETAG, f"W/{ETAG}", f'"other", {ETAG}', "*"])
+def test_matching_if_none_match_is_not_modified(client, cached, header):
+    analysis_id = uuid.uuid4()
+    cached[analysis_id] = {"user_id": USER_ID, "etag": ETAG, "body": BODY}
+
+    response = client.get(f"/analysis/{analysis_id}", headers={"If-None-Match": header})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == ETAG
+
+
+def test_stale_if_none_match_gets_the_body(client, cached):
+    analysis_id = uuid.uuid4()
+    cached[analysis_id] = {"user_id": USER_ID, "etag": ETAG, "body": BODY}
+
+    response = client.get(f"/analysis/{analysis_id}", headers={"If-None-Match": '"old"'})
+    assert response.status_code == 200
+    assert response.content == BODY
+
+
+def test_cached_document_of_another_user_is_not_found(client, cached):
+    analysis_id = uuid.uuid4()
+    cached[analysis_id] = {"user_id": uuid.uuid4(), "etag": ETAG, "body": BODY}
+
+    assert client.get(f"/analysis/{analysis_id}").status_code == 404
+
+
+def test_miss_renders_stores_and_revalidates(client, cached, monkeypatch):
+    analysis_id = uuid.uuid4()
+    stored = []
+
+    async def fetch_document(db, requested):
+        return {"id": requested, "user_id": USER_ID, "status": "COMPLETED"}
+
+    async def put(analysis_id, user_id, body, tag=None):
+        stored.append((analysis_id, user_id, body, tag))
+
+    monkeypatch.setattr(analysis_router.AnalysisService, "fetch_document", fetch_document)
+    monkeypatch.setattr(analysis_router.AnalysisService, "render_document", lambda document: BODY)
+    monkeypatch.setattr(document_cache, "put", put)
+
+    response = client.get(f"/analysis/{analysis_id}")
+    assert response.status_code == 200
+    assert response.headers["etag"] == ETAG
+    assert stored == [(analysis_id, USER_ID, BODY, ETAG)]
+
+    response = client.get(f"/analysis/{analysis_id}", headers={"If-None-Match": ETAG})
+    assert response.status_code == 304
+
+
+def test_cache_fails_open_after_a_redis_error(monkeypatch):
+    monkeypatch.setattr(document_cache, "_disabled_until", 0.0)
+    calls = []
+
+    async def pool():
+        calls.append(1)
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(document_cache, "get_redis_pool", pool)
+
+    assert asyncio.run(document_cache.get(uuid.uuid4())) is None
+    assert asyncio.run(document_cache.get(uuid.uuid4())) is None
+    asyncio.run(document_cache.put(uuid.uuid4(), USER_ID, BODY))
+    # Only the first call reached Redis; the rest skipped the cache
+    assert len(calls) == 1
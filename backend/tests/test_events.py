@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.queue import RedisUnavailableError
+from app.services import events
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis") -> None:
+        self.redis = redis
+        self.commands: list[tuple] = []
+
+    def hset(self, key, mapping):
+        self.commands.append(("hset", key, mapping))
+
+    def expire(self, key, ttl):
+        self.commands.append(("expire", key, ttl))
+
+    def delete(self, key):
+        self.commands.append(("delete", key))
+
+    def publish(self, channel, message):
+        self.commands.append(("publish", channel, json.loads(message)))
+
+    async def execute(self):
+        self.redis.executed += 1
+        if self.redis.failures:
+            self.redis.failures -= 1
+            raise ConnectionError("redis down")
+        self.redis.applied.extend(self.commands)
+
+
+class FakeRedis:
+    def __init__(self, failures: int = 0) -> None:
+        self.failures = failures
+        self.executed = 0
+        self.applied: list[tuple] = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+@pytest.fixture(autouse=True)
+def no_cooldown(monkeypatch):
+    monkeypatch.setattr(events, "_publish_disabled_until", 0.0)
+    monkeypatch.setattr(events, "STATE_WRITE_BACKOFF", 0.0)
+
+
+def _use(monkeypatch, redis):
+    async def pool():
+        if isinstance(redis, Exception):
+            raise redis
+        return redis
+
+    monkeypatch.setattr(events, "get_redis_pool", pool)
+
+
+def _kinds(redis: FakeRedis) -> list[str]:
+    return [command[0] for command in redis.applied]
+
+
+def test_publish_writes_state_then_publishes_in_one_pipeline(monkeypatch):
+    redis = FakeRedis()
+    _use(monkeypatch, redis)
+
+    asyncio.run(events.publish("a1", "status", {"status": "FAILED", "error": "boom"}))
+
+    assert redis.executed == 1
+    assert _kinds(redis) == ["hset", "expire", "delete", "publish"]
+    assert redis.applied[0][1] == "analysis:a1:status"
+    assert redis.applied[0][2]["status"] == "FAILED"
+    assert redis.applied[2][1] == "analysis:a1:document"
+    assert redis.applied[3][1] == "analysis:a1:events"
+
+
+def test_failed_publish_still_writes_state(monkeypatch):
+    redis = FakeRedis(failures=1)
+    _use(monkeypatch, redis)
+
+    asyncio.run(events.publish("a1", "status", {"status": "COMPLETED"}))
+
+    # The publish pipeline failed; the cache write went through on its own
+    assert _kinds(redis) == ["hset", "expire"]
+    assert events._publish_disabled_until > 0
+
+
+def test_cooldown_skips_publish_and_retries(monkeypatch):
+    redis = FakeRedis(failures=1)
+    _use(monkeypatch, redis)
+    monkeypatch.setattr(events, "_publish_disabled_until", float("inf"))
+
+    asyncio.run(events.publish("a1", "section", {"name": "story", "status": "COMPLETED"}))
+
+    # One attempt only, and no publish while cooling down
+    assert redis.executed == 1
+    assert redis.applied == []
+
+    asyncio.run(events.publish("a1", "section", {"name": "story", "status": "COMPLETED"}))
+    assert _kinds(redis) == ["hset", "expire"]
+
+
+def test_unreachable_redis_is_not_retried(monkeypatch):
+    calls = []
+
+    async def pool():
+        calls.append(1)
+        raise RedisUnavailableError("Redis unavailable")
+
+    monkeypatch.setattr(events, "get_redis_pool", pool)
+
+    asyncio.run(events.publish("a1", "status", {"status": "PROCESSING"}))
+    # The publish attempt and a single cache write attempt
+    assert len(calls) == 2
+
+
+def test_events_without_state_only_publish(monkeypatch):
+    redis = FakeRedis()
+    _use(monkeypatch, redis)
+
+    asyncio.run(events.publish("a1", "vision", {"product": "coffee"}))
+    assert _kinds(redis) == ["publish"]
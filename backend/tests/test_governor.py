@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from app.config import settings
+from app.prompts.exceptions import GeminiRateLimitError
+from app.services.ai import governor as governor_module
+from app.services.ai.governor import (
+    CHARS_PER_TOKEN,
+    IMAGE_TOKENS,
+    GeminiGovernor,
+    ModelLimits,
+    estimate_input_tokens,
+    estimate_tokens,
+    limits_for,
+)
+
+
+class FakeGovernor(GeminiGovernor):
+    """Governor with the Redis side replaced by counters."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.leases: list[str] = []
+        self.released: list[str] = []
+        self.penalties = 0
+
+    async def acquire(self, model, tokens):
+        lease = f"lease-{len(self.leases)}"
+        self.leases.append(lease)
+        return lease
+
+    async def release(self, model, lease):
+        self.released.append(lease)
+
+    async def penalize(self, model):
+        self.penalties += 1
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_BACKOFF_BASE", 0.0)
+    monkeypatch.setattr(settings, "GEMINI_RATE_LIMIT_RETRIES", 2)
+
+
+def test_limits_for_uses_override_then_defaults(monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_MODEL_LIMITS_STR", "flash=10:2000:3")
+    assert limits_for("flash") == ModelLimits(10, 2000, 3)
+    assert limits_for("other") == ModelLimits(
+        settings.GEMINI_RPM, settings.GEMINI_TPM, settings.GEMINI_MAX_CONCURRENCY
+    )
+
+
+def test_estimate_tokens_counts_text_and_images(monkeypatch):
+    contents = [{"role": "user", "parts": [object(), {"text": "x" * 400}]}]
+    assert estimate_input_tokens(contents, "y" * 40) == IMAGE_TOKENS + 400 // CHARS_PER_TOKEN + 10
+
+    monkeypatch.setattr(settings, "GEMINI_OUTPUT_TOKEN_ESTIMATE", 500)
+    assert estimate_tokens(contents) == IMAGE_TOKENS + 100 + 500
+
+
+def test_call_returns_and_releases_lease():
+    gov = FakeGovernor()
+
+    async def fn():
+        return "ok"
+
+    assert asyncio.run(gov.call("flash", [], fn)) == "ok"
+    assert gov.released == gov.leases == ["lease-0"]
+    assert gov.penalties == 0
+
+
+def test_call_retries_rate_limits_then_succeeds():
+    gov = FakeGovernor()
+    attempts = []
+
+    async def fn():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise google_exceptions.ResourceExhausted("429")
+        return "ok"
+
+    assert asyncio.run(gov.call("flash", [], fn)) == "ok"
+    assert len(attempts) == 3
+    assert gov.penalties == 2
+    # Every attempt held its own lease and gave it back
+    assert gov.released == gov.leases == ["lease-0", "lease-1", "lease-2"]
+
+
+def test_call_gives_up_after_retries():
+    gov = FakeGovernor()
+
+    async def fn():
+        raise google_exceptions.ResourceExhausted("429")
+
+    with pytest.raises(GeminiRateLimitError):
+        asyncio.run(gov.call("flash", [], fn))
+    assert len(gov.leases) == settings.GEMINI_RATE_LIMIT_RETRIES + 1
+    assert gov.released == gov.leases
+
+
+def test_call_does_not_retry_other_errors():
+    gov = FakeGovernor()
+
+    async def fn():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        asyncio.run(gov.call("flash", [], fn))
+    assert gov.leases == ["lease-0"]
+    assert gov.released == ["lease-0"]
+    assert gov.penalties == 0
+
+
+def _scripted(gov: GeminiGovernor, waits: list[int], monkeypatch) -> list[dict]:
+    """Stand in for Redis: the acquire script answers with the given waits (ms)."""
+    calls = []
+
+    async def script(keys, args):
+        calls.append({"keys": keys, "args": args})
+        return waits.pop(0)
+
+    async def redis():
+        return object()
+
+    gov._acquire_script = script
+    monkeypatch.setattr(gov, "_redis", redis)
+    monkeypatch.setattr(settings, "GEMINI_GOVERNOR_ENABLED", True)
+    return calls
+
+
+def test_acquire_waits_for_the_bucket(monkeypatch):
+    gov = GeminiGovernor()
+    calls = _scripted(gov, [20, 0], monkeypatch)
+    monkeypatch.setattr(governor_module.random, "uniform", lambda a, b: 1.0)
+
+    lease = asyncio.run(gov.acquire("flash", 123))
+
+    assert lease is not None
+    assert len(calls) == 2
+    assert calls[0]["keys"] == ["gemini:governor:flash:bucket", "gemini:governor:flash:leases"]
+    # rpm, tpm, concurrency, tokens, lease id
+    assert calls[0]["args"][3] == 123
+    assert calls[1]["args"][4] == lease
+
+
+def test_acquire_gives_up_past_max_wait(monkeypatch):
+    gov = GeminiGovernor()
+    _scripted(gov, [10_000_000], monkeypatch)
+    monkeypatch.setattr(settings, "GEMINI_GOVERNOR_MAX_WAIT", 1)
+
+    with pytest.raises(GeminiRateLimitError):
+        asyncio.run(gov.acquire("flash", 1))
+
+
+def test_acquire_fails_open_on_redis_errors(monkeypatch):
+    gov = GeminiGovernor()
+    monkeypatch.setattr(settings, "GEMINI_GOVERNOR_ENABLED", True)
+
+    async def redis():
+        return object()
+
+    async def broken(keys, args):
+        raise ConnectionError("redis down")
+
+    gov._acquire_script = broken
+    monkeypatch.setattr(gov, "_redis", redis)
+
+    assert asyncio.run(gov.acquire("flash", 1)) is None
+    assert gov._disabled_until > 0
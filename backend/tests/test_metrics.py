@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.core.auth import get_current_user
+from app.routers import metrics_router
+from app.services.ai import usage
+
+
+class DownRedis:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def smembers(self, key):
+        self.calls += 1
+        raise ConnectionError("redis is down")
+
+
+class FakeRedis:
+    async def smembers(self, key):
+        return {b"story|flash"}
+
+    async def hgetall(self, key):
+        assert key == f"{usage.PREFIX}:story:flash"
+        return {b"calls": b"2", b"ok": b"2", b"seconds_sum": b"3.0", b"le:1": b"1", b"le:2": b"1"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ADMIN_EMAILS_STR", "Ops@example.com")
+    app = FastAPI()
+    app.include_router(metrics_router.router)
+    user = SimpleNamespace(id=None, email="someone@example.com")
+
+    async def current_user():
+        return user
+
+    app.dependency_overrides[get_current_user] = current_user
+    return TestClient(app), user
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    """Serve usage.stats from a given Redis stub, without a cooldown."""
+    monkeypatch.setattr(usage, "_redis_disabled_until", 0.0)
+    holder = {}
+
+    async def get_redis_pool():
+        return holder["redis"]
+
+    monkeypatch.setattr(usage, "get_redis_pool", get_redis_pool)
+    return holder
+
+
+@pytest.mark.parametrize("path", ["/metrics/llm-cache", "/metrics/llm-usage"])
+def test_deployment_metrics_need_a_metrics_admin(client, path):
+    client, user = client
+    assert client.get(path).status_code == 403
+
+    user.email = "ops@example.com"
+    assert client.get(path).status_code == 200
+
+
+def test_usage_stats_are_empty_while_redis_is_down(client, redis):
+    client, user = client
+    user.email = "ops@example.com"
+    redis["redis"] = DownRedis()
+
+    response = client.get("/metrics/llm-usage")
+    assert response.status_code == 200
+    assert response.json() == {"data": []}
+
+    # Cooling down: Redis is not tried again
+    assert client.get("/metrics/llm-usage").json() == {"data": []}
+    assert redis["redis"].calls == 1
+
+
+def test_usage_stats_aggregate_the_counters(redis):
+    redis["redis"] = FakeRedis()
+
+    (group,) = asyncio.run(usage.stats())
+
+    assert (group["kind"], group["model"], group["calls"]) == ("story", "flash", 2)
+    assert group["avg_seconds"] == 1.5
+    assert group["latency_histogram"]["1"] == 1
+    assert group["latency_histogram"]["2"] == 2
+    assert group["latency_histogram"]["+Inf"] == 2
@@ -0,0 +1,65 @@
+from PIL import Image, ImageDraw
+
+from app.utils.phash import BKTree, dhash, hamming
+
+
+def _photo(size=(256, 256), shift=0) -> Image.Image:
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((40 + shift, 60, 180 + shift, 200), fill="navy")
+    draw.ellipse((120, 20, 230, 130), fill="orange")
+    return img
+
+
+def test_dhash_is_64_bit_hex():
+    value = dhash(_photo())
+    assert len(value) == 16
+    int(value, 16)
+
+
+def test_dhash_survives_resize_and_recompression():
+    original = dhash(_photo())
+    assert hamming(original, dhash(_photo().resize((128, 128)))) <= 6
+    assert hamming(original, dhash(_photo().convert("L"))) <= 6
+
+
+def test_dhash_separates_different_photos():
+    flipped = _photo().transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+    assert hamming(dhash(_photo()), dhash(flipped)) > 6
+
+
+def test_hamming():
+    assert hamming("0" * 16, "0" * 16) == 0
+    assert hamming("0" * 16, "f" * 16) == 64
+    assert hamming("00000000000000ff", "000000000000000f") == 4
+
+
+def test_bktree_nearest_within_radius():
+    tree = BKTree()
+    tree.add("0000000000000000", "zero")
+    tree.add("000000000000000f", "four")
+    tree.add("00000000000000ff", "eight")
+    tree.add("ffffffffffffffff", "all")
+
+    assert len(tree) == 4
+    assert tree.nearest("0000000000000001", 3) == (1, "zero")
+    assert tree.nearest("00000000000000fe", 1) == (1, "eight")
+    assert tree.nearest("0f0f0f0f00000000", 6) is None
+
+
+def test_bktree_search_matches_brute_force():
+    hashes = [f"{(i * 0x9E3779B97F4A7C15) & (2**64 - 1):016x}" for i in range(200)]
+    tree = BKTree()
+    for i, h in enumerate(hashes):
+        tree.add(h, i)
+
+    query = hashes[17]
+    expected = {i for i, h in enumerate(hashes) if hamming(query, h) <= 20}
+    assert {value for _, value in tree.search(query, 20)} == expected
+
+
+def test_bktree_keeps_values_sharing_a_hash():
+    tree = BKTree()
+    tree.add("00000000000000aa", "a")
+    tree.add("00000000000000aa", "b")
+    assert sorted(v for _, v in tree.search("00000000000000aa", 0)) == ["a", "b"]
@@ -0,0 +1,44 @@
+from app.services.ai import prompt_builder
+from app.services.ai.prompt_builder import TRIM_MARKER, fit_context, render_json
+
+
+def test_fit_context_keeps_short_text():
+    assert fit_context("fresh coffee beans", 100) == "fresh coffee beans"
+
+
+def test_fit_context_cuts_at_a_word_boundary():
+    text = "single origin arabica roasted weekly in small batches"
+    cut = fit_context(text, 30)
+    assert len(cut) <= 30
+    assert cut.endswith(TRIM_MARKER)
+    assert text.startswith(cut[: -len(TRIM_MARKER)])
+    assert cut[: -len(TRIM_MARKER)].split()[-1] in text.split()
+
+
+def test_fit_context_without_room_is_none():
+    assert fit_context("some context", len(TRIM_MARKER)) is None
+
+
+def test_shared_text_keeps_vision_and_trims_context():
+    vision = '{"product":"coffee"}'
+    text = prompt_builder._shared_text("word " * 200, vision, 200)
+    assert len(text) <= 200
+    assert text.endswith(f"Vision analysis:\n{vision}")
+    assert text.startswith("Additional context: word")
+    assert TRIM_MARKER in text
+
+
+def test_shared_text_unlimited_budget():
+    text = prompt_builder._shared_text("context", "vision", 0)
+    assert text == "Additional context: context\n\nVision analysis:\nvision"
+
+
+def test_shared_text_drops_context_when_vision_fills_the_budget():
+    vision = "v" * 100
+    assert prompt_builder._shared_text("context", vision, 50) == f"Vision analysis:\n{vision}"
+
+
+def test_render_json_is_canonical():
+    assert render_json({"b": 1, "a": None, "c": {"d": None, "e": "é"}}) == '{"b":1,"c":{"e":"é"}}'
+    assert render_json({"a": None}) is None
+    assert render_json("already text") == "already text"
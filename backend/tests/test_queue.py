@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.core import queue
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool(monkeypatch):
+    monkeypatch.setattr(queue, "_pool", None)
+    monkeypatch.setattr(queue, "_unavailable_until", 0.0)
+    monkeypatch.setattr(queue, "_last_error", None)
+    monkeypatch.setattr(queue, "_lock", asyncio.Lock())
+    monkeypatch.setattr(settings, "REDIS_RETRY_BACKOFF", 10.0)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _create_pool(monkeypatch, outcomes):
+    """Stand in for arq.create_pool: pops an exception to raise or a pool to return."""
+    calls = []
+
+    async def create_pool(redis_settings):
+        calls.append(redis_settings)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(queue, "create_pool", create_pool)
+    return calls
+
+
+def test_failure_is_cached_for_the_backoff(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(queue.time, "monotonic", clock)
+    pool = object()
+    calls = _create_pool(monkeypatch, [ConnectionError("refused"), pool])
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(queue.get_redis_pool())
+    for _ in range(3):
+        with pytest.raises(queue.RedisUnavailableError):
+            asyncio.run(queue.get_redis_pool())
+    assert len(calls) == 1
+
+    clock.now += settings.REDIS_RETRY_BACKOFF
+    assert asyncio.run(queue.get_redis_pool()) is pool
+    # The retry after a failure is a single attempt
+    assert calls[0].conn_retries == settings.REDIS_CONN_RETRIES
+    assert calls[1].conn_retries == 0
+
+
+def test_pool_is_created_once(monkeypatch):
+    pool = object()
+    calls = _create_pool(monkeypatch, [pool])
+
+    async def scenario():
+        return await asyncio.gather(*(queue.get_redis_pool() for _ in range(5)))
+
+    assert all(p is pool for p in asyncio.run(scenario()))
+    assert len(calls) == 1
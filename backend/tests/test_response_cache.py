@@ -0,0 +1,131 @@
+import asyncio
+import os
+
+import google.generativeai as genai
+import pytest
+
+from app.config import settings
+from app.services.ai import response_cache as cache_module
+from app.services.ai.response_cache import ResponseCache, fingerprint
+
+IMAGE = b"\x89PNG fake image bytes"
+
+
+def _contents(text: str = "Describe the product", image: bytes = IMAGE):
+    return [
+        {
+            "role": "user",
+            "parts": [{"inline_data": {"mime_type": "image/png", "data": image}}, {"text": text}],
+        }
+    ]
+
+
+def test_fingerprint_is_stable():
+    assert fingerprint("flash", "Story", "system", _contents()) == fingerprint(
+        "flash", "Story", "system", _contents()
+    )
+
+
+@pytest.mark.parametrize(
+    "changed",
+    [
+        ("pro", "Story", "system", _contents()),
+        ("flash", "Seo", "system", _contents()),
+        ("flash", "Story", "other system", _contents()),
+        ("flash", "Story", "system", _contents(text="Describe the bottle")),
+        ("flash", "Story", "system", _contents(image=b"another image")),
+    ],
+)
+def test_fingerprint_changes_with_every_input(changed):
+    assert fingerprint(*changed) != fingerprint("flash", "Story", "system", _contents())
+
+
+def test_fingerprint_treats_proto_and_dict_parts_alike():
+    proto = [
+        {
+            "role": "user",
+            "parts": [
+                genai.protos.Part(inline_data=genai.protos.Blob(mime_type="image/png", data=IMAGE)),
+                genai.protos.Part(text="Describe the product"),
+            ],
+        }
+    ]
+    assert fingerprint("flash", "Story", None, proto) == fingerprint("flash", "Story", None, _contents())
+
+
+def test_fingerprint_separates_parts():
+    # Part boundaries are part of the key, not just the concatenated text
+    one = [{"role": "user", "parts": [{"text": "ab"}]}]
+    two = [{"role": "user", "parts": [{"text": "a"}, {"text": "b"}]}]
+    assert fingerprint("flash", "Story", None, one) != fingerprint("flash", "Story", None, two)
+
+
+@pytest.fixture
+def disk_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "LLM_CACHE_BACKEND", "disk")
+    monkeypatch.setattr(settings, "LLM_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "LLM_CACHE_MAX_ENTRIES", 2)
+    return ResponseCache()
+
+
+def test_hit_and_miss(disk_cache):
+    async def scenario():
+        assert await disk_cache.get("k1") is None
+        await disk_cache.set("k1", '{"story":"x"}')
+        assert await disk_cache.get("k1") == '{"story":"x"}'
+        return await disk_cache.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_expired_entries_miss(disk_cache, monkeypatch):
+    asyncio.run(disk_cache.set("k1", "v"))
+    monkeypatch.setattr(settings, "LLM_CACHE_TTL", -1)
+    assert asyncio.run(disk_cache.get("k1")) is None
+
+
+def test_oldest_entries_are_evicted(disk_cache, tmp_path):
+    async def scenario():
+        for i, key in enumerate(("k1", "k2", "k3")):
+            await disk_cache.set(key, "v")
+            os.utime(tmp_path / f"{key}.json", (1000 + i, 1000 + i))
+        await disk_cache.set("k4", "v")
+
+    asyncio.run(scenario())
+    assert sorted(p.stem for p in tmp_path.glob("*.json")) == ["k3", "k4"]
+
+
+def test_disabled_backend(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_BACKEND", "none")
+    cache = ResponseCache()
+    assert not cache.enabled
+    asyncio.run(cache.set("k1", "v"))
+    assert asyncio.run(cache.get("k1")) is None
+    assert asyncio.run(cache.stats()) == {"backend": "none"}
+
+
+def test_redis_errors_fail_open(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_BACKEND", "redis")
+    calls = []
+
+    async def pool():
+        calls.append(1)
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(cache_module, "get_redis_pool", pool)
+    cache = ResponseCache()
+
+    async def scenario():
+        assert await cache.get("k1") is None
+        await cache.set("k1", "v")
+        assert await cache.get("k1") is None
+        return await cache.stats()
+
+    stats = asyncio.run(scenario())
+    # The cache and its stats went quiet after the first error
+    assert len(calls) == 1
+    assert stats == {"backend": "redis", "available": False}
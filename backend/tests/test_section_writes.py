@@ -0,0 +1,148 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models.analysis.analysis import AnalysisStatus
+from app.services import analysis_service
+from app.services.analysis_service import AnalysisService
+from app.services.sections import SECTIONS_BY_NAME
+
+PRICING = SECTIONS_BY_NAME["pricing"]
+
+
+def _sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+class FakeSession:
+    """Answers scalar/execute with canned values and keeps the statements."""
+
+    def __init__(self, scalar=None, rowcount=0):
+        self._scalar = scalar
+        self.rowcount = rowcount
+        self.statements = []
+        self.commits = 0
+
+    async def scalar(self, statement):
+        self.statements.append(statement)
+        return self._scalar
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return SimpleNamespace(rowcount=self.rowcount)
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.mark.parametrize("returned, stored", [(uuid.uuid4(), True), (None, False)])
+def test_store_section_inserts_once(returned, stored):
+    db = FakeSession(scalar=returned)
+    result = PRICING.schema(recommended_price=10.0)
+
+    assert asyncio.run(AnalysisService.store_section(db, uuid.uuid4(), PRICING, result)) is stored
+
+    sql = _sql(db.statements[0])
+    assert sql.startswith("INSERT INTO analysis_pricings")
+    assert "ON CONFLICT (analysis_id) DO NOTHING RETURNING analysis_pricings.id" in sql
+    assert db.commits == 0
+
+
+@pytest.fixture
+def completion(monkeypatch):
+    """Stub what complete_if_ready announces; returns the published statuses."""
+    published = []
+
+    async def missing_sections(db, analysis_id):
+        return []
+
+    async def publish(analysis_id, event, data):
+        published.append(data["status"])
+
+    async def cache_document(db, analysis_id):
+        pass
+
+    monkeypatch.setattr(AnalysisService, "missing_sections", staticmethod(missing_sections))
+    monkeypatch.setattr(AnalysisService, "cache_document", staticmethod(cache_document))
+    monkeypatch.setattr(analysis_service.events, "publish", publish)
+    return published
+
+
+def test_complete_if_ready_only_moves_from_processing(completion):
+    db = FakeSession(rowcount=1)
+
+    assert asyncio.run(AnalysisService.complete_if_ready(db, uuid.uuid4()))
+
+    sql = _sql(db.statements[0])
+    assert sql.startswith("UPDATE analyses SET status='COMPLETED'")
+    assert "analyses.status = 'PROCESSING'" in sql
+    assert completion == [AnalysisStatus.COMPLETED.value]
+
+
+def test_complete_if_ready_loses_to_another_job_or_a_failure(completion):
+    # The guarded UPDATE matched nothing: already COMPLETED or FAILED
+    db = FakeSession(rowcount=0)
+
+    assert not asyncio.run(AnalysisService.complete_if_ready(db, uuid.uuid4()))
+    assert completion == []
+
+
+def test_complete_if_ready_waits_for_missing_sections(completion, monkeypatch):
+    async def missing_sections(db, analysis_id):
+        return [PRICING]
+
+    monkeypatch.setattr(AnalysisService, "missing_sections", staticmethod(missing_sections))
+    db = FakeSession(rowcount=1)
+
+    assert not asyncio.run(AnalysisService.complete_if_ready(db, uuid.uuid4()))
+    assert db.statements == []
+
+
+def test_run_graph_builds_on_the_stored_row_after_a_duplicate(monkeypatch):
+    """A pricing row written by another delivery wins over this run's result."""
+    stored_pricing = {"recommended_price": 99.0, "reasoning": "stored first"}
+    upstream_seen = {}
+    published = []
+
+    async def generate_section(section, images, context, vision, prefix, upstream):
+        upstream_seen[section.name] = upstream
+        if section.name == "pricing":
+            return section.schema(recommended_price=1.0, reasoning="lost the race")
+        return section.schema.model_construct()
+
+    async def store_section(db, analysis_id, section, result):
+        return section.name != "pricing"
+
+    async def section_outputs(db, analysis_id, names):
+        return {"pricing": stored_pricing} if "pricing" in names else {}
+
+    async def set_section_status(db, analysis_id, name, status):
+        pass
+
+    async def publish_section(analysis_id, section, status, result=None):
+        published.append((section.name, result))
+
+    async def register_prefix(*args, **kwargs):
+        return None
+
+    for name, fn in {
+        "generate_section": generate_section,
+        "store_section": store_section,
+        "section_outputs": section_outputs,
+        "set_section_status": set_section_status,
+        "publish_section": publish_section,
+        "register_prefix": register_prefix,
+    }.items():
+        monkeypatch.setattr(AnalysisService, name, staticmethod(fn))
+
+    analysis = SimpleNamespace(id=uuid.uuid4(), vision_result={"labels": ["tea"]}, phash=None)
+    sections = [SECTIONS_BY_NAME[n] for n in ("pricing", "persona", "action_plan")]
+
+    asyncio.run(AnalysisService.run_graph(FakeSession(), analysis, [], None, sections))
+
+    assert upstream_seen["action_plan"]["pricing"] == stored_pricing
+    # The duplicate is announced without a payload; clients read the stored row
+    assert ("pricing", None) in published
@@ -0,0 +1,77 @@
+import graphlib
+
+import pytest
+
+from app.services.sections import (
+    DEFAULT_INPUTS,
+    SECTIONS,
+    SECTIONS_BY_NAME,
+    VISION,
+    Section,
+    section_graph,
+)
+
+
+def _order(graph: graphlib.TopologicalSorter) -> list[str]:
+    order = []
+    while graph.is_active():
+        ready = sorted(graph.get_ready())
+        order.extend(ready)
+        graph.done(*ready)
+    return order
+
+
+def test_dependencies():
+    assert SECTIONS_BY_NAME["brand_theme"].dependencies == ()
+    assert SECTIONS_BY_NAME["story"].dependencies == (VISION,)
+    assert SECTIONS_BY_NAME["action_plan"].dependencies == (VISION, "pricing", "persona")
+
+
+def test_ready():
+    action_plan = SECTIONS_BY_NAME["action_plan"]
+    assert SECTIONS_BY_NAME["taste"].ready(False, {"taste"})
+    assert not SECTIONS_BY_NAME["story"].ready(False, {"story"})
+    assert not action_plan.ready(True, {"pricing", "action_plan"})
+    assert action_plan.ready(True, {"action_plan", "seo"})
+
+
+def test_shares_prefix():
+    assert SECTIONS_BY_NAME["story"].shares_prefix
+    assert SECTIONS_BY_NAME["action_plan"].shares_prefix
+    assert not SECTIONS_BY_NAME["taste"].shares_prefix
+
+
+def test_full_graph_runs_vision_then_sections_then_derived():
+    graph = section_graph(list(SECTIONS), vision_pending=True)
+    first = set(graph.get_ready())
+    # Image-only sections start beside vision
+    assert first == {VISION, "brand_theme", "taste", "packaging"}
+
+    graph.done(*first)
+    second = set(graph.get_ready())
+    assert second == {"story", "marketplace", "persona", "pricing", "seo"}
+
+    graph.done(*second)
+    assert set(graph.get_ready()) == {"action_plan"}
+
+
+def test_graph_with_stored_vision_and_upstream():
+    # Vision done and pricing already stored: action_plan only waits for persona
+    sections = [SECTIONS_BY_NAME["action_plan"], SECTIONS_BY_NAME["persona"]]
+    graph = section_graph(sections, vision_pending=False)
+    assert _order(graph) == ["persona", "action_plan"]
+
+
+def test_graph_order_respects_every_dependency():
+    order = _order(section_graph(list(SECTIONS), vision_pending=True))
+    assert sorted(order) == sorted([VISION, *SECTIONS_BY_NAME])
+    for section in SECTIONS:
+        for dependency in section.dependencies:
+            assert order.index(dependency) < order.index(section.name)
+
+
+def test_graph_rejects_cycles():
+    a = Section("a", None, None, None, inputs=(*DEFAULT_INPUTS, "b"))
+    b = Section("b", None, None, None, inputs=(*DEFAULT_INPUTS, "a"))
+    with pytest.raises(graphlib.CycleError):
+        section_graph([a, b], vision_pending=True)
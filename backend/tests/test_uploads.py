@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+from PIL import Image
+
+from app.utils.image import normalize_image
+from app.utils.upload import UnsupportedImageError, UploadTooLargeError, spool_upload
+
+
+class FakeUpload:
+    """UploadFile stand-in serving bytes in read(size) chunks."""
+
+    def __init__(self, data: bytes) -> None:
+        self._buffer = io.BytesIO(data)
+        self.reads = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        self.reads += 1
+        return self._buffer.read(size)
+
+
+def _encoded(size=(64, 48), fmt="PNG", mode="RGB", color="teal") -> bytes:
+    buf = io.BytesIO()
+    Image.new(mode, size, color).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def _leftovers(directory):
+    return [p.name for p in directory.iterdir()]
+
+
+def test_spool_upload_streams_in_chunks(tmp_path):
+    data = _encoded()
+    upload = FakeUpload(data)
+
+    spooled = asyncio.run(spool_upload(upload, tmp_path, max_size=len(data), chunk_size=16))
+
+    assert spooled.path.read_bytes() == data
+    assert spooled.size == len(data)
+    assert spooled.sha256 == hashlib.sha256(data).hexdigest()
+    assert (spooled.format, spooled.extension, spooled.mime_type) == ("PNG", "png", "image/png")
+    assert upload.reads > len(data) // 16
+
+    spooled.discard()
+    spooled.discard()
+    assert _leftovers(tmp_path) == []
+
+
+@pytest.mark.parametrize(
+    "data, error",
+    [
+        (b"GIF89a" + b"\x00" * 64, UnsupportedImageError),
+        (b"", UnsupportedImageError),
+        (_encoded(size=(512, 512), fmt="BMP"), UnsupportedImageError),
+    ],
+)
+def test_spool_upload_rejects_other_formats(tmp_path, data, error):
+    with pytest.raises(error):
+        asyncio.run(spool_upload(FakeUpload(data), tmp_path, max_size=10**7))
+    assert _leftovers(tmp_path) == []
+
+
+def test_spool_upload_enforces_the_size_limit(tmp_path):
+    data = _encoded(size=(256, 256), fmt="JPEG")
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(spool_upload(FakeUpload(data), tmp_path, max_size=len(data) - 1, chunk_size=64))
+    assert _leftovers(tmp_path) == []
+
+
+def test_normalize_image_downscales_and_reencodes(tmp_path):
+    src = tmp_path / "raw.png"
+    src.write_bytes(_encoded(size=(400, 200)))
+
+    normalized = normalize_image(src, tmp_path, max_edge=100, output_format="webp")
+
+    data = normalized.path.read_bytes()
+    assert normalized.filename.endswith(".webp")
+    assert normalized.mime_type == "image/webp"
+    assert (normalized.width, normalized.height) == (100, 50)
+    assert normalized.size == len(data)
+    assert normalized.sha256 == hashlib.sha256(data).hexdigest()
+    assert len(normalized.phash) == 16
+    with Image.open(normalized.path) as img:
+        assert img.format == "WEBP"
+        assert img.size == (100, 50)
+    # No temp file is left next to the output
+    assert sorted(_leftovers(tmp_path)) == sorted(["raw.png", normalized.filename])
+
+
+def test_normalize_image_applies_exif_orientation(tmp_path):
+    img = Image.new("RGB", (80, 40), "white")
+    exif = img.getexif()
+    exif[0x0112] = 6  # Rotate 90 CW on display
+    src = tmp_path / "raw.jpg"
+    img.save(src, format="JPEG", exif=exif)
+
+    normalized = normalize_image(src, tmp_path, max_edge=200, output_format="jpeg")
+
+    assert normalized.filename.endswith(".jpg")
+    assert (normalized.width, normalized.height) == (40, 80)
+
+
+def test_normalize_image_keeps_alpha_only_for_webp(tmp_path):
+    src = tmp_path / "raw.png"
+    src.write_bytes(_encoded(mode="RGBA", color=(0, 128, 128, 100)))
+
+    with Image.open(normalize_image(src, tmp_path, max_edge=64, output_format="webp").path) as img:
+        assert img.mode == "RGBA"
+    with Image.open(normalize_image(src, tmp_path, max_edge=64, output_format="jpeg").path) as img:
+        assert img.mode == "RGB"
+
+
+def test_normalize_image_is_deterministic_for_the_content_key(tmp_path):
+    src = tmp_path / "raw.png"
+    src.write_bytes(_encoded())
+
+    first = normalize_image(src, tmp_path, max_edge=64)
+    second = normalize_image(src, tmp_path, max_edge=64)
+
+    assert first.filename != second.filename
+    assert first.sha256 == second.sha256
+
+
+def test_normalize_image_rejects_unknown_output_format(tmp_path):
+    src = tmp_path / "raw.png"
+    src.write_bytes(_encoded())
+    with pytest.raises(ValueError):
+        normalize_image(src, tmp_path, max_edge=64, output_format="gif")